@@ -0,0 +1,30 @@
+"""orders keyset pagination indexes
+
+Revision ID: 3f1a9c2d7b10
+Revises: 696d0e30efea
+Create Date: 2026-10-19 09:12:31.482113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2d7b10'
+down_revision: Union[str, Sequence[str], None] = '696d0e30efea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+    op.create_index('ix_orders_customer_id_created_at', 'orders', ['customer_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_customer_id_created_at', table_name='orders')
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
@@ -0,0 +1,36 @@
+"""store resolved location on addresses
+
+Revision ID: 8b2e4d6f1a35
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-19 10:04:52.913377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a35'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('addresses', sa.Column('governorate', sa.String(), nullable=True))
+    op.add_column('addresses', sa.Column('area', sa.String(), nullable=True))
+    op.add_column('addresses', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('addresses', sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_index(op.f('ix_addresses_governorate'), 'addresses', ['governorate'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_addresses_governorate'), table_name='addresses')
+    op.drop_column('addresses', 'longitude')
+    op.drop_column('addresses', 'latitude')
+    op.drop_column('addresses', 'area')
+    op.drop_column('addresses', 'governorate')
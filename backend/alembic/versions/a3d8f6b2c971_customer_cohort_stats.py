@@ -0,0 +1,79 @@
+"""monthly customer cohort stats
+
+Revision ID: a3d8f6b2c971
+Revises: f1c6a8e2d539
+Create Date: 2026-10-19 19:12:45.630218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d8f6b2c971'
+down_revision: Union[str, Sequence[str], None] = 'f1c6a8e2d539'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('customer_cohort_stats',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('cohort_month', sa.Date(), nullable=False),
+    sa.Column('month_offset', sa.Integer(), nullable=False),
+    sa.Column('activity_month', sa.Date(), nullable=False),
+    sa.Column('cohort_size', sa.Integer(), nullable=False),
+    sa.Column('active_customers', sa.Integer(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('cumulative_revenue', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id', 'cohort_month', 'month_offset')
+    )
+    op.create_index('ix_customer_cohort_stats_client_id_activity_month', 'customer_cohort_stats',
+                    ['client_id', 'activity_month'], unique=False)
+
+    op.execute("""
+        WITH activity AS (
+            SELECT f.client_id,
+                   date_trunc('month', f.first_order_at)::date AS cohort_month,
+                   date_trunc('month', o.created_at)::date AS activity_month,
+                   COUNT(DISTINCT o.customer_id) AS active_customers,
+                   COUNT(*) AS orders_count,
+                   COALESCE(SUM(o.total_amount), 0) AS revenue
+            FROM orders o
+            JOIN customer_features f ON f.customer_id = o.customer_id
+            WHERE o.status IN ('completed', 'processing')
+            GROUP BY 1, 2, 3
+        ),
+        cohort_sizes AS (
+            SELECT client_id, date_trunc('month', first_order_at)::date AS cohort_month, COUNT(*) AS cohort_size
+            FROM customer_features
+            GROUP BY 1, 2
+        )
+        INSERT INTO customer_cohort_stats (client_id, cohort_month, month_offset, activity_month, cohort_size,
+                                           active_customers, orders_count, revenue, cumulative_revenue, updated_at)
+        SELECT a.client_id,
+               a.cohort_month,
+               ((EXTRACT(YEAR FROM a.activity_month) - EXTRACT(YEAR FROM a.cohort_month)) * 12
+                + EXTRACT(MONTH FROM a.activity_month) - EXTRACT(MONTH FROM a.cohort_month))::int,
+               a.activity_month,
+               s.cohort_size,
+               a.active_customers,
+               a.orders_count,
+               a.revenue,
+               SUM(a.revenue) OVER (PARTITION BY a.client_id, a.cohort_month ORDER BY a.activity_month),
+               NOW()
+        FROM activity a
+        JOIN cohort_sizes s ON s.client_id = a.client_id AND s.cohort_month = a.cohort_month
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_customer_cohort_stats_client_id_activity_month', table_name='customer_cohort_stats')
+    op.drop_table('customer_cohort_stats')
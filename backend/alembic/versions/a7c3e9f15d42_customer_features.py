@@ -0,0 +1,60 @@
+"""customer rfm features table
+
+Revision ID: a7c3e9f15d42
+Revises: f4a9d2b61c57
+Create Date: 2026-10-19 14:52:07.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e9f15d42'
+down_revision: Union[str, Sequence[str], None] = 'f4a9d2b61c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('customer_features',
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('frequency', sa.Integer(), nullable=False),
+    sa.Column('monetary', sa.Float(), nullable=False),
+    sa.Column('first_order_at', sa.DateTime(), nullable=False),
+    sa.Column('last_order_at', sa.DateTime(), nullable=False),
+    sa.Column('avg_gap_days', sa.Float(), nullable=True),
+    sa.Column('gap_variance', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('customer_id')
+    )
+    op.create_index(op.f('ix_customer_features_client_id'), 'customer_features', ['client_id'], unique=False)
+
+    op.execute("""
+        INSERT INTO customer_features (customer_id, client_id, frequency, monetary, first_order_at,
+                                       last_order_at, avg_gap_days, gap_variance, updated_at)
+        SELECT customer_id, client_id, COUNT(*), COALESCE(SUM(total_amount), 0), MIN(created_at),
+               MAX(created_at), AVG(gap_days), VAR_POP(gap_days), NOW()
+        FROM (
+            SELECT c.id AS customer_id, c.client_id, o.total_amount, o.created_at,
+                   EXTRACT(EPOCH FROM o.created_at - LAG(o.created_at) OVER (
+                       PARTITION BY c.id ORDER BY o.created_at, o.id
+                   )) / 86400.0 AS gap_days
+            FROM customers c
+            JOIN orders o ON o.customer_id = c.id
+            WHERE o.status IN ('completed', 'processing')
+        ) customer_orders
+        GROUP BY customer_id, client_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_customer_features_client_id'), table_name='customer_features')
+    op.drop_table('customer_features')
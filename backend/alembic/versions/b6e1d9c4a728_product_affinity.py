@@ -0,0 +1,51 @@
+"""product co-occurrence matrices and bought-together affinities
+
+Revision ID: b6e1d9c4a728
+Revises: a3d8f6b2c971
+Create Date: 2026-10-19 19:58:03.274911
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1d9c4a728'
+down_revision: Union[str, Sequence[str], None] = 'a3d8f6b2c971'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled by update_product_affinity_task (after the next sync with new orders, or the weekly rebuild)
+    op.create_table('product_cooccurrence_matrices',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('matrix', sa.LargeBinary(), nullable=False),
+    sa.Column('product_ids', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('last_order_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+    op.create_table('product_affinities',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.BigInteger(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('neighbor_id', sa.BigInteger(), nullable=False),
+    sa.Column('co_orders', sa.Integer(), nullable=False),
+    sa.Column('confidence', sa.Float(), nullable=False),
+    sa.Column('lift', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id', 'product_id', 'rank')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_affinities')
+    op.drop_table('product_cooccurrence_matrices')
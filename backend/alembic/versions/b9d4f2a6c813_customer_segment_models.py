@@ -0,0 +1,40 @@
+"""persisted customer segment models
+
+Revision ID: b9d4f2a6c813
+Revises: a7c3e9f15d42
+Create Date: 2026-10-19 15:41:26.508913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d4f2a6c813'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e9f15d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('customer_segment_models',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('scaler_mean', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('scaler_scale', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('centroids', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('segment_names', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('mean_distance', sa.Float(), nullable=False),
+    sa.Column('n_samples', sa.Integer(), nullable=False),
+    sa.Column('fitted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('customer_segment_models')
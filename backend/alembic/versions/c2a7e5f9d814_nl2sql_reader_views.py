@@ -0,0 +1,95 @@
+"""nl2sql schema of tenant-scoped views and the nl2sql_reader role
+
+Revision ID: c2a7e5f9d814
+Revises: b6e1d9c4a728
+Create Date: 2026-10-19 21:04:37.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a7e5f9d814'
+down_revision: Union[str, Sequence[str], None] = 'b6e1d9c4a728'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# The tenant comes from the transaction-local nl2sql.client_id setting; when it is unset
+# current_setting(..., true) is NULL and every view is empty.
+CLIENT_ID = "NULLIF(current_setting('nl2sql.client_id', true), '')::integer"
+
+VIEWS = {
+    "customers": f"""
+        SELECT c.id, c.first_name, c.last_name, c.email, c.phone
+        FROM public.customers c
+        WHERE c.client_id = {CLIENT_ID}
+    """,
+    "addresses": f"""
+        SELECT a.id, a.customer_id, a.address_1, a.address_2, a.city, a.state, a.country,
+               a.governorate, a.area
+        FROM public.addresses a
+        JOIN public.customers c ON c.id = a.customer_id
+        WHERE c.client_id = {CLIENT_ID}
+    """,
+    "orders": f"""
+        SELECT o.id, o.external_id, o.customer_id, o.status, o.total_amount,
+               o.created_at, o.payment_method, o.attribution_referrer, o.attribution_channel, o.device_type
+        FROM public.orders o
+        JOIN public.customers c ON c.id = o.customer_id
+        WHERE c.client_id = {CLIENT_ID}
+    """,
+    "order_items": f"""
+        SELECT oi.id, oi.order_id, oi.product_id, oi.product_name, oi.quantity, oi.price
+        FROM public.order_items oi
+        JOIN public.orders o ON o.id = oi.order_id
+        JOIN public.customers c ON c.id = o.customer_id
+        WHERE c.client_id = {CLIENT_ID}
+    """,
+    "products": f"""
+        SELECT p.id, p.external_id, p.name, p.regular_price, p.sales_price,
+               p.categories, p.stock_status
+        FROM public.products p
+        WHERE p.client_id = {CLIENT_ID}
+    """,
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SCHEMA IF NOT EXISTS nl2sql")
+    for name, sql in VIEWS.items():
+        # security_barrier keeps user predicates from being evaluated before the tenant filter
+        op.execute(f"CREATE OR REPLACE VIEW nl2sql.{name} WITH (security_barrier) AS {sql}")
+
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'nl2sql_reader') THEN
+                CREATE ROLE nl2sql_reader NOLOGIN;
+            END IF;
+        END
+        $$
+    """)
+    op.execute("REVOKE ALL ON SCHEMA nl2sql FROM PUBLIC")
+    op.execute("GRANT USAGE ON SCHEMA nl2sql TO nl2sql_reader")
+    op.execute("GRANT SELECT ON ALL TABLES IN SCHEMA nl2sql TO nl2sql_reader")
+    # The application user switches to the role with SET LOCAL ROLE for each NL2SQL query
+    op.execute("GRANT nl2sql_reader TO CURRENT_USER")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP SCHEMA IF EXISTS nl2sql CASCADE")
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'nl2sql_reader') THEN
+                REVOKE nl2sql_reader FROM CURRENT_USER;
+                DROP ROLE nl2sql_reader;
+            END IF;
+        END
+        $$
+    """)
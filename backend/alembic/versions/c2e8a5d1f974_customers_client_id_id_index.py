@@ -0,0 +1,30 @@
+"""customers (client_id, id) index for keyset streaming
+
+Revision ID: c2e8a5d1f974
+Revises: b9d4f2a6c813
+Create Date: 2026-10-19 16:20:45.873129
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8a5d1f974'
+down_revision: Union[str, Sequence[str], None] = 'b9d4f2a6c813'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_customers_client_id_id', 'customers', ['client_id', 'id'], unique=False)
+    op.drop_index(op.f('ix_customers_client_id'), table_name='customers')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_customers_client_id'), 'customers', ['client_id'], unique=False)
+    op.drop_index('ix_customers_client_id_id', table_name='customers')
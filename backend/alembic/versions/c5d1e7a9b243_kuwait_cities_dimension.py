@@ -0,0 +1,457 @@
+"""kuwait cities dimension and address city_id
+
+Revision ID: c5d1e7a9b243
+Revises: 8b2e4d6f1a35
+Create Date: 2026-10-19 11:26:08.517204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d1e7a9b243'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d6f1a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Seed rows as utils.kuwait_cities.kuwait_city_rows() returned them at this revision;
+# snapshotted so later dictionary changes do not alter what this migration inserts.
+KUWAIT_CITY_ROWS = [
+    {
+        'name': 'Abdullah Al Mubarak', 'governorate': 'Farwaniya',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['abdulla al-mubarak', 'abdullah al mubarak', 'ضاحية عبدالله المبارك'],
+    },
+    {
+        'name': 'Abdullah Al Salem', 'governorate': 'Capital',
+        'longitude': 47.97806, 'latitude': 29.26917,
+        'aliases': ['abdullah al salem', 'ضاحية عبدالله السالم'],
+    },
+    {
+        'name': 'Abu Fatira', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 48.08, 'latitude': 29.2,
+        'aliases': ['abu fatera', 'abu fatira', 'أبو فطيرة'],
+    },
+    {
+        'name': 'Adailiya', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['adailiya', 'العديلية'],
+    },
+    {
+        'name': 'Ahmadi City', 'governorate': 'Ahmadi',
+        'longitude': 48.0838, 'latitude': 29.0769,
+        'aliases': ['ahmadi city', 'مدينة الأحمدي'],
+    },
+    {
+        'name': 'Ahmadi Desert', 'governorate': 'Ahmadi',
+        'longitude': 47.9, 'latitude': 28.9,
+        'aliases': ['ahmadi desert', 'بر محافظة الأحمدي'],
+    },
+    {
+        'name': 'Al Abdali', 'governorate': 'Jahra',
+        'longitude': 47.73, 'latitude': 30.0,
+        'aliases': ['al abdali', 'al-abdilee', 'العبدلي'],
+    },
+    {
+        'name': 'Al Adan', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al adan', 'العدان'],
+    },
+    {
+        'name': 'Al Qasr', 'governorate': 'Jahra',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al qasr', 'القصر'],
+    },
+    {
+        'name': 'Al Qurain', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al qurain', 'القرين'],
+    },
+    {
+        'name': 'Al Qusour', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al qusour', 'al-qosour', 'القصور'],
+    },
+    {
+        'name': 'Al Rai', 'governorate': 'Farwaniya',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al rai', 'الري'],
+    },
+    {
+        'name': 'Al Riqqa', 'governorate': 'Ahmadi',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al riqqa', 'الرقة'],
+    },
+    {
+        'name': 'Ali Sabah Al Salem', 'governorate': 'Ahmadi',
+        'longitude': 48.07, 'latitude': 28.97,
+        'aliases': ['ali sabah al salem', 'علي صباح السالم   (ام الهيمان)', 'علي صباح السالم (ام الهيمان)'],
+    },
+    {
+        'name': 'Andalus', 'governorate': 'Farwaniya',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['andalus', 'الاندلس'],
+    },
+    {
+        'name': 'Ardiya', 'governorate': 'Farwaniya',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['ardiya', 'العارضية'],
+    },
+    {
+        'name': 'Bayan', 'governorate': 'Hawalli',
+        'longitude': 48.04881, 'latitude': 29.3032,
+        'aliases': ['bayan', 'بيان'],
+    },
+    {
+        'name': 'Camel & Horse Racing', 'governorate': 'Jahra',
+        'longitude': 47.75, 'latitude': 29.15,
+        'aliases': ['camel & horse racing', 'سباق الهجن وسباق الفروسية'],
+    },
+    {
+        'name': 'Dasma', 'governorate': 'Capital',
+        'longitude': 48.00139, 'latitude': 29.365,
+        'aliases': ['dasma', 'الدسمة'],
+    },
+    {
+        'name': 'Dhaher', 'governorate': 'Ahmadi',
+        'longitude': 48.03, 'latitude': 29.15,
+        'aliases': ['dhaher', 'الظهر'],
+    },
+    {
+        'name': 'Doha', 'governorate': 'Capital',
+        'longitude': 47.93306, 'latitude': 29.295,
+        'aliases': ['al-doha', 'doha', 'الدوحة'],
+    },
+    {
+        'name': 'Eqaila', 'governorate': 'Ahmadi',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['eqaila', 'العقيلة'],
+    },
+    {
+        'name': 'Fahad Al Ahmad', 'governorate': 'Ahmadi',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['fahad al ahmad', 'فهد الأحمد'],
+    },
+    {
+        'name': 'Fahaheel', 'governorate': 'Ahmadi',
+        'longitude': 48.12361, 'latitude': 29.09889,
+        'aliases': ['fahaheel', 'الفحيحيل'],
+    },
+    {
+        'name': 'Farwaniya', 'governorate': 'Farwaniya',
+        'longitude': 47.95861, 'latitude': 29.2775,
+        'aliases': ['al-farwaniya', 'farwaniya', 'الفروانية'],
+    },
+    {
+        'name': 'Fintas', 'governorate': 'Ahmadi',
+        'longitude': 48.12111, 'latitude': 29.17389,
+        'aliases': ['fintas', 'الفنطاس'],
+    },
+    {
+        'name': 'Firdous', 'governorate': 'Farwaniya',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['firdous', 'الفردوس'],
+    },
+    {
+        'name': 'Fnaitees', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['fnaitees', 'الفنيطيس'],
+    },
+    {
+        'name': 'Hadiya', 'governorate': 'Ahmadi',
+        'longitude': 48.09, 'latitude': 29.14,
+        'aliases': ['hadiya', 'هدية'],
+    },
+    {
+        'name': 'Hateen', 'governorate': 'Hawalli',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['hateen', 'حطين'],
+    },
+    {
+        'name': 'Hawally', 'governorate': 'Hawalli',
+        'longitude': 48.02861, 'latitude': 29.33278,
+        'aliases': ['hawally', 'حولي'],
+    },
+    {
+        'name': 'Ishbiliya', 'governorate': 'Farwaniya',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['ishbiliya', 'أشبيلية'],
+    },
+    {
+        'name': 'Jaber Al Ahmad', 'governorate': 'Jahra',
+        'longitude': 47.9, 'latitude': 29.3,
+        'aliases': ['jaber al ahmad', 'جابر الأحمد'],
+    },
+    {
+        'name': 'Jaber Al Ali', 'governorate': 'Ahmadi',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['jaber al ali', 'جابر العلي'],
+    },
+    {
+        'name': 'Jabriya', 'governorate': 'Hawalli',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al-jabriya', 'jabriya', 'الجابرية'],
+    },
+    {
+        'name': 'Jahra', 'governorate': 'Jahra',
+        'longitude': 47.65806, 'latitude': 29.3375,
+        'aliases': ['jahra', 'الجهراء'],
+    },
+    {
+        'name': 'Jleeb Al Shuyoukh', 'governorate': 'Farwaniya',
+        'longitude': 47.9, 'latitude': 29.25,
+        'aliases': ['jleeb al shuyoukh', 'جليب الشيوخ'],
+    },
+    {
+        'name': 'Kabad', 'governorate': 'Jahra',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['kabad', 'كبد'],
+    },
+    {
+        'name': 'Keifan', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['keifan', 'كيفان'],
+    },
+    {
+        'name': 'Khaitan', 'governorate': 'Farwaniya',
+        'longitude': 47.97, 'latitude': 29.29,
+        'aliases': ['khaitan', 'خيطان'],
+    },
+    {
+        'name': 'Mahboula', 'governorate': 'Ahmadi',
+        'longitude': 48.13028, 'latitude': 29.145,
+        'aliases': ['mahboula', 'المهبولة'],
+    },
+    {
+        'name': 'Mangaf', 'governorate': 'Ahmadi',
+        'longitude': 48.13278, 'latitude': 29.09611,
+        'aliases': ['mangaf', 'المنقف'],
+    },
+    {
+        'name': 'Mansouriya', 'governorate': 'Capital',
+        'longitude': 47.993, 'latitude': 29.357,
+        'aliases': ['mansouriya', 'المنصورية'],
+    },
+    {
+        'name': 'Mishref', 'governorate': 'Hawalli',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['mishref', 'مشرف'],
+    },
+    {
+        'name': 'Mubarak Al Kabeer', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 47.65806, 'latitude': 29.3375,
+        'aliases': ['mubarak al kabeer', 'مبارك الكبير'],
+    },
+    {
+        'name': 'Nahda - East Sulaibikhat', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['nahda - east sulaibikhat', 'النهضة - شرق الصليبخات'],
+    },
+    {
+        'name': 'Naseem', 'governorate': 'Jahra',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['naseem', 'النسيم'],
+    },
+    {
+        'name': 'New Khairan City', 'governorate': 'Ahmadi',
+        'longitude': 48.25, 'latitude': 28.66,
+        'aliases': ['al-kheeran and al-kheeran pearl', 'new khairan city', 'مدينة الخيران الجديدة'],
+    },
+    {
+        'name': 'North Shuaiba', 'governorate': 'Ahmadi',
+        'longitude': 48.15, 'latitude': 29.05,
+        'aliases': ['north of al-shuaiba -al-ahmadi port', 'north shuaiba'],
+    },
+    {
+        'name': 'Nuzha', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['nuzha', 'النزهة'],
+    },
+    {
+        'name': 'Qadsiya', 'governorate': 'Capital',
+        'longitude': 48.0, 'latitude': 29.35,
+        'aliases': ['qadsiya', 'القادسية'],
+    },
+    {
+        'name': 'Qurtuba', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['qurtuba', 'قرطبة'],
+    },
+    {
+        'name': 'Rabiya', 'governorate': 'Farwaniya',
+        'longitude': 47.93, 'latitude': 29.295,
+        'aliases': ['rabiya', 'الرابية'],
+    },
+    {
+        'name': 'Rawda', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['rawda', 'الروضة'],
+    },
+    {
+        'name': 'Rehab', 'governorate': 'Farwaniya',
+        'longitude': 47.93, 'latitude': 29.28,
+        'aliases': ['rehab', 'الرحاب'],
+    },
+    {
+        'name': 'Rumaithiya', 'governorate': 'Hawalli',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['al-rumaithiya', 'rumaithiya', 'الرميثية'],
+    },
+    {
+        'name': 'Saad Al Abdullah City', 'governorate': 'Jahra',
+        'longitude': 47.7, 'latitude': 29.32,
+        'aliases': ['saad al abdullah city', 'مدينة سعد العبدالله'],
+    },
+    {
+        'name': 'Sabah Al Ahmad City', 'governorate': 'Ahmadi',
+        'longitude': 48.15, 'latitude': 28.75,
+        'aliases': ['sabah al ahmad city', 'مدينة صباح الأحمد'],
+    },
+    {
+        'name': 'Sabah Al Salem', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 48.05722, 'latitude': 29.25722,
+        'aliases': ['sabah al salem', 'sabah al-salem', 'صباح السالم'],
+    },
+    {
+        'name': 'Sabahiya', 'governorate': 'Ahmadi',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['sabahiya', 'الصباحية'],
+    },
+    {
+        'name': 'Sabhan Industrial', 'governorate': 'Mubarak Al-Kabeer',
+        'longitude': 47.9, 'latitude': 29.25,
+        'aliases': ['sabhan industrial', 'صبحان الصناعية'],
+    },
+    {
+        'name': 'Salam', 'governorate': 'Hawalli',
+        'longitude': 48.02, 'latitude': 29.29,
+        'aliases': ['salam', 'السلام'],
+    },
+    {
+        'name': 'Salmiya', 'governorate': 'Hawalli',
+        'longitude': 48.08333, 'latitude': 29.33333,
+        'aliases': ['salmiya', 'السالمية'],
+    },
+    {
+        'name': 'Salwa', 'governorate': 'Hawalli',
+        'longitude': 48.08, 'latitude': 29.295,
+        'aliases': ['salwa', 'سلوى'],
+    },
+    {
+        'name': 'Shamiya', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['shamiya', 'الشامية'],
+    },
+    {
+        'name': 'Shuaiba Industrial', 'governorate': 'Ahmadi',
+        'longitude': 48.15, 'latitude': 29.03,
+        'aliases': ['abdulla port and industrial shuaiba', 'shuaiba industrial'],
+    },
+    {
+        'name': 'Shuhada', 'governorate': 'Hawalli',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['shuhada', 'الشهداء'],
+    },
+    {
+        'name': 'Siddiq', 'governorate': 'Hawalli',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['siddiq', 'الصديق'],
+    },
+    {
+        'name': 'South Doha - Qairawan', 'governorate': 'Capital',
+        'longitude': 47.87, 'latitude': 29.3,
+        'aliases': ['south doha - qairawan', 'جنوب الدوحة  - القيروان'],
+    },
+    {
+        'name': 'Sulaibikhat', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['sulaibikhat', 'الصليبخات'],
+    },
+    {
+        'name': 'Sulaibiya', 'governorate': 'Jahra',
+        'longitude': 47.82, 'latitude': 29.27,
+        'aliases': ['al-sulaibia traditional accommodations', 'sulaibiya'],
+    },
+    {
+        'name': 'Sulaibiya Agriculture', 'governorate': 'Jahra',
+        'longitude': 47.78, 'latitude': 29.23,
+        'aliases': ['sulaibiya agriculture', 'الصليبية الزراعية 1'],
+    },
+    {
+        'name': 'Surra', 'governorate': 'Capital',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['surra', 'السرة'],
+    },
+    {
+        'name': 'Tayma', 'governorate': 'Jahra',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['tayma', 'تيماء'],
+    },
+    {
+        'name': 'Wafra Farms', 'governorate': 'Ahmadi',
+        'longitude': 47.93056, 'latitude': 28.63917,
+        'aliases': ['wafra farms', 'جواخيرالوفرة', 'مزارع الوفرة'],
+    },
+    {
+        'name': 'Waha', 'governorate': 'Jahra',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['waha', 'الواحة'],
+    },
+    {
+        'name': 'Yarmouk', 'governorate': 'Capital',
+        'longitude': 47.97, 'latitude': 29.31,
+        'aliases': ['yarmouk', 'اليرموك'],
+    },
+    {
+        'name': 'Zahra', 'governorate': 'Hawalli',
+        'longitude': 47.95, 'latitude': 29.3,
+        'aliases': ['zahra', 'الزهراء'],
+    },
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    kuwait_cities = op.create_table('kuwait_cities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('governorate', sa.String(), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('aliases', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_kuwait_cities_id'), 'kuwait_cities', ['id'], unique=False)
+    op.create_index(op.f('ix_kuwait_cities_governorate'), 'kuwait_cities', ['governorate'], unique=False)
+    op.bulk_insert(kuwait_cities, KUWAIT_CITY_ROWS)
+
+    op.add_column('addresses', sa.Column('city_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('addresses_city_id_fkey', 'addresses', 'kuwait_cities', ['city_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_addresses_customer_id_city_id', 'addresses', ['customer_id', 'city_id'], unique=False)
+    op.create_index(op.f('ix_customers_client_id'), 'customers', ['client_id'], unique=False)
+
+    # Backfill existing addresses by raw city spelling
+    op.execute("""
+        UPDATE addresses a
+        SET city_id = k.id
+        FROM kuwait_cities k
+        WHERE a.city IS NOT NULL
+          AND k.aliases ? lower(trim(a.city))
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_customers_client_id'), table_name='customers')
+    op.drop_index('ix_addresses_customer_id_city_id', table_name='addresses')
+    op.drop_constraint('addresses_city_id_fkey', 'addresses', type_='foreignkey')
+    op.drop_column('addresses', 'city_id')
+    op.drop_index(op.f('ix_kuwait_cities_governorate'), table_name='kuwait_cities')
+    op.drop_index(op.f('ix_kuwait_cities_id'), table_name='kuwait_cities')
+    op.drop_table('kuwait_cities')
@@ -0,0 +1,38 @@
+"""reorder reminder cooldown state
+
+Revision ID: d5b1c7e3a286
+Revises: c2e8a5d1f974
+Create Date: 2026-10-19 16:58:12.640275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b1c7e3a286'
+down_revision: Union[str, Sequence[str], None] = 'c2e8a5d1f974'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reorder_reminders',
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('last_reminded_on', sa.Date(), nullable=False),
+    sa.Column('reminders_sent', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('customer_id')
+    )
+    op.create_index(op.f('ix_reorder_reminders_client_id'), 'reorder_reminders', ['client_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_reorder_reminders_client_id'), table_name='reorder_reminders')
+    op.drop_table('reorder_reminders')
@@ -0,0 +1,103 @@
+"""attribution channel on orders and daily channel rollup
+
+Revision ID: d8f3a1c6e920
+Revises: c5d1e7a9b243
+Create Date: 2026-10-19 12:03:44.209761
+
+"""
+from typing import Optional, Sequence, Union
+from urllib.parse import urlparse
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f3a1c6e920'
+down_revision: Union[str, Sequence[str], None] = 'c5d1e7a9b243'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Classification rules of utils.referrer_channels as they stood at this revision, so the
+# backfill does not change with later edits (reclassify_attribution_channels_task applies those)
+REFERRER_MAPPINGS = {
+    'google.com': 'google',
+    'instagram.com': 'instagram',
+    'l.instagram.com': 'instagram',
+    'souqalsultan.com': 'souqalsultan',
+    'linktr.ee': 'linktree',
+    'kpay.com.kw': 'knet',
+    'facebook.com': 'facebook',
+    'l.facebook.com': 'facebook',
+    'fbclid=': 'facebook',
+}
+
+
+def classify_referrer(ref: Optional[str]) -> str:
+    if not ref or ref.lower() == "unknown":
+        return "Unknown"
+    if 'fbclid=' in ref:
+        return 'facebook'
+    domain = urlparse(ref).netloc.lower()
+    for key, label in REFERRER_MAPPINGS.items():
+        if key in domain:
+            return label
+    return domain or "Unknown"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('attribution_channel', sa.String(), nullable=True))
+    op.create_index(op.f('ix_orders_attribution_channel'), 'orders', ['attribution_channel'], unique=False)
+    op.create_table('daily_channel_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('channel', sa.String(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('client_id', 'day', 'channel', name='uq_daily_channel_stat')
+    )
+    op.create_index(op.f('ix_daily_channel_stats_id'), 'daily_channel_stats', ['id'], unique=False)
+
+    # Classify each distinct referrer once, then apply them all with one joined UPDATE
+    # (referrers carry fbclid/utm params, so there are nearly as many as orders)
+    conn = op.get_bind()
+    referrers = [row[0] for row in conn.execute(sa.text(
+        "SELECT DISTINCT attribution_referrer FROM orders WHERE attribution_referrer IS NOT NULL"
+    ))]
+    op.execute("CREATE TEMP TABLE referrer_channel_map (referrer text PRIMARY KEY, channel text NOT NULL)")
+    referrer_channel_map = sa.table('referrer_channel_map', sa.column('referrer', sa.Text), sa.column('channel', sa.Text))
+    op.bulk_insert(referrer_channel_map, [{"referrer": ref, "channel": classify_referrer(ref)} for ref in referrers])
+    op.execute("ANALYZE referrer_channel_map")
+    op.execute("""
+        UPDATE orders o
+        SET attribution_channel = m.channel
+        FROM referrer_channel_map m
+        WHERE o.attribution_referrer = m.referrer
+    """)
+    op.execute(
+        sa.text("UPDATE orders SET attribution_channel = :channel WHERE attribution_referrer IS NULL")
+        .bindparams(channel=classify_referrer(None))
+    )
+    op.execute("DROP TABLE referrer_channel_map")
+
+    op.execute("""
+        INSERT INTO daily_channel_stats (client_id, day, channel, orders_count, revenue)
+        SELECT c.client_id, o.created_at::date, COALESCE(o.attribution_channel, 'Unknown'),
+               COUNT(*), COALESCE(SUM(o.total_amount), 0)
+        FROM orders o
+        JOIN customers c ON c.id = o.customer_id
+        GROUP BY c.client_id, o.created_at::date, COALESCE(o.attribution_channel, 'Unknown')
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_daily_channel_stats_id'), table_name='daily_channel_stats')
+    op.drop_table('daily_channel_stats')
+    op.drop_index(op.f('ix_orders_attribution_channel'), table_name='orders')
+    op.drop_column('orders', 'attribution_channel')
@@ -0,0 +1,64 @@
+"""daily product sales rollup and order item indexes
+
+Revision ID: e2b7c4f90d18
+Revises: d8f3a1c6e920
+Create Date: 2026-10-19 12:48:19.660352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c4f90d18'
+down_revision: Union[str, Sequence[str], None] = 'd8f3a1c6e920'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_order_items_order_id_covering', 'order_items', ['order_id'], unique=False,
+                    postgresql_include=['product_id', 'quantity', 'price'])
+    op.create_index('ix_order_items_product_id', 'order_items', ['product_id'], unique=False)
+
+    op.create_table('daily_product_sales',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.BigInteger(), nullable=True),
+    sa.Column('product_name', sa.String(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('orders_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_daily_product_sales_id'), 'daily_product_sales', ['id'], unique=False)
+    op.create_index('ix_daily_product_sales_client_id_day', 'daily_product_sales', ['client_id', 'day'], unique=False)
+    op.create_index('ix_daily_product_sales_client_id_product_id_day', 'daily_product_sales',
+                    ['client_id', 'product_id', 'day'], unique=False)
+
+    op.execute("""
+        INSERT INTO daily_product_sales (client_id, day, product_id, product_name, quantity, revenue, orders_count)
+        SELECT c.client_id, o.created_at::date, oi.product_id, MAX(oi.product_name),
+               SUM(oi.quantity), COALESCE(SUM(oi.quantity * oi.price), 0), COUNT(DISTINCT o.id)
+        FROM orders o
+        JOIN customers c ON c.id = o.customer_id
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.status IN ('completed', 'wc-completed')
+        GROUP BY c.client_id, o.created_at::date, oi.product_id,
+                 CASE WHEN oi.product_id IS NULL THEN oi.product_name END
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_daily_product_sales_client_id_product_id_day', table_name='daily_product_sales')
+    op.drop_index('ix_daily_product_sales_client_id_day', table_name='daily_product_sales')
+    op.drop_index(op.f('ix_daily_product_sales_id'), table_name='daily_product_sales')
+    op.drop_table('daily_product_sales')
+    op.drop_index('ix_order_items_product_id', table_name='order_items')
+    op.drop_index('ix_order_items_order_id_covering', table_name='order_items')
@@ -0,0 +1,38 @@
+"""address location_resolved_at
+
+Revision ID: e3b8c1f7a046
+Revises: c2a7e5f9d814
+Create Date: 2026-10-19 22:17:52.906314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b8c1f7a046'
+down_revision: Union[str, Sequence[str], None] = 'c2a7e5f9d814'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('addresses', sa.Column('location_resolved_at', sa.DateTime(), nullable=True))
+    # Fully resolved addresses need no backfill; the rest are attempted once by backfill_address_locations_task
+    op.execute("""
+        UPDATE addresses
+        SET location_resolved_at = NOW()
+        WHERE governorate IS NOT NULL AND city_id IS NOT NULL
+    """)
+    op.create_index('ix_addresses_id_location_unresolved', 'addresses', ['id'], unique=False,
+                    postgresql_where=sa.text('location_resolved_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_addresses_id_location_unresolved', table_name='addresses',
+                  postgresql_where=sa.text('location_resolved_at IS NULL'))
+    op.drop_column('addresses', 'location_resolved_at')
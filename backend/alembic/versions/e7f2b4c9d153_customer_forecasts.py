@@ -0,0 +1,42 @@
+"""batch customer purchase forecasts
+
+Revision ID: e7f2b4c9d153
+Revises: d5b1c7e3a286
+Create Date: 2026-10-19 17:44:38.915027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f2b4c9d153'
+down_revision: Union[str, Sequence[str], None] = 'd5b1c7e3a286'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('customer_forecasts',
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('next_purchase_on', sa.Date(), nullable=False),
+    sa.Column('expected_gap_days', sa.Float(), nullable=False),
+    sa.Column('purchase_probability', sa.Float(), nullable=False),
+    sa.Column('horizon_days', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('customer_id')
+    )
+    op.create_index('ix_customer_forecasts_client_id_next_purchase_on', 'customer_forecasts',
+                    ['client_id', 'next_purchase_on'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_customer_forecasts_client_id_next_purchase_on', table_name='customer_forecasts')
+    op.drop_table('customer_forecasts')
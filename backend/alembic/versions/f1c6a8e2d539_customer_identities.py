@@ -0,0 +1,74 @@
+"""per-client customer identity index
+
+Revision ID: f1c6a8e2d539
+Revises: e7f2b4c9d153
+Create Date: 2026-10-19 18:26:11.407352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c6a8e2d539'
+down_revision: Union[str, Sequence[str], None] = 'e7f2b4c9d153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('customer_identities',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id', 'kind', 'value')
+    )
+    op.create_index(op.f('ix_customer_identities_customer_id'), 'customer_identities', ['customer_id'], unique=False)
+
+    # Same customer phone may now exist once per client
+    op.drop_index(op.f('ix_customers_phone'), table_name='customers')
+    op.create_index(op.f('ix_customers_phone'), 'customers', ['phone'], unique=False)
+
+    # Backfill with the rules of utils.identity_normalizer; duplicates resolve to the oldest customer
+    # until dedupe_all_clients_customers_task merges them
+    op.execute("""
+        INSERT INTO customer_identities (client_id, kind, value, customer_id)
+        SELECT DISTINCT ON (client_id, kind, value) client_id, kind, value, customer_id
+        FROM (
+            SELECT client_id, 'phone' AS kind, '+' || digits AS value, id AS customer_id
+            FROM (
+                SELECT id, client_id,
+                       CASE
+                           WHEN btrim(phone) LIKE '+%' THEN regexp_replace(phone, '\\D', '', 'g')
+                           WHEN regexp_replace(phone, '\\D', '', 'g') LIKE '00%'
+                               THEN substr(regexp_replace(phone, '\\D', '', 'g'), 3)
+                           WHEN length(regexp_replace(phone, '\\D', '', 'g')) = 8
+                               THEN '965' || regexp_replace(phone, '\\D', '', 'g')
+                           ELSE regexp_replace(phone, '\\D', '', 'g')
+                       END AS digits
+                FROM customers
+                WHERE phone IS NOT NULL
+            ) phones
+            WHERE length(digits) BETWEEN 8 AND 15
+            UNION ALL
+            SELECT client_id, 'email', lower(btrim(email)), id
+            FROM customers
+            WHERE btrim(COALESCE(email, '')) <> ''
+        ) identities
+        ORDER BY client_id, kind, value, customer_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fails if the same phone was synced for several clients since the upgrade
+    op.drop_index(op.f('ix_customers_phone'), table_name='customers')
+    op.create_index(op.f('ix_customers_phone'), 'customers', ['phone'], unique=True)
+    op.drop_index(op.f('ix_customer_identities_customer_id'), table_name='customer_identities')
+    op.drop_table('customer_identities')
@@ -0,0 +1,68 @@
+"""products per client with trigram name index
+
+Revision ID: f4a9d2b61c57
+Revises: e2b7c4f90d18
+Create Date: 2026-10-19 13:37:52.114870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a9d2b61c57'
+down_revision: Union[str, Sequence[str], None] = 'e2b7c4f90d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    op.add_column('products', sa.Column('client_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('products_client_id_fkey', 'products', 'clients', ['client_id'], ['id'], ondelete='CASCADE')
+
+    # Existing products belong to the client whose orders sold them most
+    op.execute("""
+        UPDATE products p
+        SET client_id = s.client_id
+        FROM (
+            SELECT DISTINCT ON (oi.product_id) oi.product_id, c.client_id
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            JOIN customers c ON c.id = o.customer_id
+            WHERE oi.product_id IS NOT NULL
+            GROUP BY oi.product_id, c.client_id
+            ORDER BY oi.product_id, COUNT(*) DESC
+        ) s
+        WHERE p.external_id = s.product_id
+    """)
+    # Unsold products: only attributable when a single store is connected
+    op.execute("""
+        UPDATE products
+        SET client_id = (SELECT id FROM clients WHERE store_url IS NOT NULL)
+        WHERE client_id IS NULL
+          AND (SELECT COUNT(*) FROM clients WHERE store_url IS NOT NULL) = 1
+    """)
+
+    # order_items.product_id keeps the raw WooCommerce id; external_id is only unique per client
+    op.drop_constraint('order_items_product_id_fkey', 'order_items', type_='foreignkey')
+    op.drop_index(op.f('ix_products_external_id'), table_name='products')
+    op.create_index(op.f('ix_products_external_id'), 'products', ['external_id'], unique=False)
+    op.create_unique_constraint('uq_products_client_id_external_id', 'products', ['client_id', 'external_id'])
+    op.create_index('ix_products_name_trgm', 'products', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_name_trgm', table_name='products', postgresql_using='gin')
+    op.drop_constraint('uq_products_client_id_external_id', 'products', type_='unique')
+    op.drop_index(op.f('ix_products_external_id'), table_name='products')
+    op.create_index(op.f('ix_products_external_id'), 'products', ['external_id'], unique=True)
+    op.create_foreign_key('order_items_product_id_fkey', 'order_items', 'products', ['product_id'], ['external_id'], ondelete='SET NULL')
+    op.drop_constraint('products_client_id_fkey', 'products', type_='foreignkey')
+    op.drop_column('products', 'client_id')
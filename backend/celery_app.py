@@ -6,7 +6,7 @@ load_dotenv()
 from celery import Celery, shared_task, chain
 from celery.schedules import crontab
 # from tasks.fetch_products import fetch_and_save_products
-from customers.operation_helper import function_get_dead_customers
+from customers.db_helper import stream_customer_class_data
 from tasks.sending_to_dead_customers import send_whatsapp_dead_customer_message
 from tasks.whatsapp_msg_after_one_month import send_whatsapp_message_after_one_month
 from tasks.sending_to_low_churn_customers import helper_function_to_sending_message_to_low_churn_risk_customers, send_whatsapp_forecast_message
@@ -14,6 +14,13 @@ from database import SessionLocal
 from models import Client
 from tasks.fetch_orders import fetch_orders_task
 from tasks.fetch_products import fetch_products_task
+from tasks.backfill_address_locations import backfill_address_locations_task
+from tasks.reclassify_attribution import reclassify_attribution_channels_task
+from tasks.refit_customer_segments import refit_customer_segments_task, refit_all_customer_segments_task
+from tasks.reorder_messaging import run_reorder_prediction_task
+from tasks.forecast_customer_purchases import forecast_customer_purchases_task, forecast_all_clients_purchases_task
+from tasks.dedupe_customers import dedupe_customers_task, dedupe_all_clients_customers_task
+from tasks.product_affinity import update_product_affinity_task, rebuild_all_product_affinity_task
 from datetime import datetime
 
 # Get Redis URL from environment, or construct it with fallback defaults
@@ -221,29 +228,31 @@ def send_forecast_messages_to_low_churn_task():
 
 @celery.task(name="send_dead_customers_messages")
 def send_dead_customers_messages():
-
+    """
+    Message every client's dead customers in one pass, streaming them in chunks.
+    """
     db = SessionLocal()
     results = []
 
     try:
-        dead_customers = function_get_dead_customers(db)
-        for customer in dead_customers:
-            phone = customer.get("phone")
-            if not phone:
-                results.append({"customer_id": customer["customer_id"], "status": "Failed - No phone"})
-                continue
-            customer_results = {"customer_id": customer["customer_id"], "statuses": {}}
-            for lang in ["en", "ar"]:
-                try:
-                    status_code, resp = send_whatsapp_dead_customer_message(
-                        phone_number=phone,
-                        customer_name=customer["customer_name"],
-                        language=lang,
-                    )
-                    customer_results["statuses"][lang] = "Success" if status_code == 200 else f"Failed - {resp}"
-                except Exception as e:
-                    customer_results["statuses"][lang] = f"Failed - {str(e)}"
-            results.append(customer_results)
+        for chunk in stream_customer_class_data(db, "dead"):
+            for customer in chunk:
+                phone = customer.get("phone")
+                if not phone:
+                    results.append({"customer_id": customer["customer_id"], "status": "Failed - No phone"})
+                    continue
+                customer_results = {"customer_id": customer["customer_id"], "statuses": {}}
+                for lang in ["en", "ar"]:
+                    try:
+                        status_code, resp = send_whatsapp_dead_customer_message(
+                            phone_number=phone,
+                            customer_name=customer["customer_name"],
+                            language=lang,
+                        )
+                        customer_results["statuses"][lang] = "Success" if status_code == 200 else f"Failed - {resp}"
+                    except Exception as e:
+                        customer_results["statuses"][lang] = f"Failed - {str(e)}"
+                results.append(customer_results)
     finally:
         db.close()
     return results
@@ -272,6 +281,30 @@ celery.conf.beat_schedule = {
         }
     },
 
+    # 🧹 Merge duplicate customers (shared phone/email) nightly, before the models below are refit
+    "dedupe-customers-daily": {
+        "task": "dedupe_all_clients_customers_task",
+        "schedule": crontab(minute=0, hour=2),
+    },
+
+    # 🧮 Refit per-client customer segment models nightly
+    "refit-customer-segments-daily": {
+        "task": "refit_all_customer_segments_task",
+        "schedule": crontab(minute=30, hour=2),
+    },
+
+    # 🛍️ Rebuild bought-together product affinity from all orders weekly (Sunday 03:30)
+    "rebuild-product-affinity-weekly": {
+        "task": "rebuild_all_product_affinity_task",
+        "schedule": crontab(minute=30, hour=3, day_of_week=0),
+    },
+
+    # 🔮 Batch next-purchase forecasts for every client nightly
+    "forecast-customer-purchases-daily": {
+        "task": "forecast_all_clients_purchases_task",
+        "schedule": crontab(minute=0, hour=3),
+    },
+
     # 📲 Send WhatsApp messages daily at 10 AM (if re-enabled)
     # "send-whatsapp-daily": {
     #     "task": "send_whatsapp_broadcast",
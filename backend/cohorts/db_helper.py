@@ -0,0 +1,91 @@
+from sqlalchemy.orm import Session
+from models import *
+from typing import List, Optional
+from sqlalchemy import text
+from datetime import date, datetime
+from customers.db_helper import CLASSIFIED_ORDER_STATUSES
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+def refresh_cohort_stats_data(db: Session, client_id: int, since: Optional[date] = None) -> None:
+    """
+    Rebuild a client's customer_cohort_stats rows for activity months from since's month
+    onwards (all months when omitted) from its counted orders. Earlier months are kept and
+    their cumulative revenue is carried into the rebuilt ones, so syncing new orders only
+    touches recent months. customer_features must be current. Does not commit.
+    """
+    params = {"client_id": client_id, "statuses": list(CLASSIFIED_ORDER_STATUSES)}
+    stat_filter = ""
+    order_filter = ""
+    if since:
+        params["since_month"] = month_start(since)
+        stat_filter += " AND activity_month >= :since_month"
+        order_filter += " AND o.created_at >= :since_month"
+
+    db.execute(text(f"DELETE FROM customer_cohort_stats WHERE client_id = :client_id{stat_filter}"), params)
+    db.execute(text(f"""
+        WITH activity AS (
+            SELECT date_trunc('month', f.first_order_at)::date AS cohort_month,
+                   date_trunc('month', o.created_at)::date AS activity_month,
+                   COUNT(DISTINCT o.customer_id) AS active_customers,
+                   COUNT(*) AS orders_count,
+                   COALESCE(SUM(o.total_amount), 0) AS revenue
+            FROM orders o
+            JOIN customer_features f ON f.customer_id = o.customer_id
+            WHERE f.client_id = :client_id
+              AND o.status = ANY(:statuses){order_filter}
+            GROUP BY 1, 2
+        ),
+        cohort_sizes AS (
+            SELECT date_trunc('month', first_order_at)::date AS cohort_month, COUNT(*) AS cohort_size
+            FROM customer_features
+            WHERE client_id = :client_id
+            GROUP BY 1
+        ),
+        carried AS (
+            SELECT DISTINCT ON (cohort_month) cohort_month, cumulative_revenue
+            FROM customer_cohort_stats
+            WHERE client_id = :client_id
+            ORDER BY cohort_month, activity_month DESC
+        )
+        INSERT INTO customer_cohort_stats (client_id, cohort_month, month_offset, activity_month, cohort_size,
+                                           active_customers, orders_count, revenue, cumulative_revenue, updated_at)
+        SELECT :client_id,
+               a.cohort_month,
+               ((EXTRACT(YEAR FROM a.activity_month) - EXTRACT(YEAR FROM a.cohort_month)) * 12
+                + EXTRACT(MONTH FROM a.activity_month) - EXTRACT(MONTH FROM a.cohort_month))::int,
+               a.activity_month,
+               s.cohort_size,
+               a.active_customers,
+               a.orders_count,
+               a.revenue,
+               COALESCE(cr.cumulative_revenue, 0)
+                   + SUM(a.revenue) OVER (PARTITION BY a.cohort_month ORDER BY a.activity_month),
+               NOW()
+        FROM activity a
+        JOIN cohort_sizes s ON s.cohort_month = a.cohort_month
+        LEFT JOIN carried cr ON cr.cohort_month = a.cohort_month
+    """), params)
+
+def get_cohort_stats_data(
+    db: Session,
+    client_id: int,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
+    max_months: int = 12
+) -> List[CustomerCohortStat]:
+    """
+    A client's cohort rows with month_offset <= max_months, ordered by cohort and offset.
+    start_month/end_month bound the cohort months (inclusive).
+    """
+    query = db.query(CustomerCohortStat).filter(
+        CustomerCohortStat.client_id == client_id,
+        CustomerCohortStat.month_offset <= max_months
+    )
+    if start_month:
+        query = query.filter(CustomerCohortStat.cohort_month >= month_start(start_month))
+    if end_month:
+        query = query.filter(CustomerCohortStat.cohort_month <= month_start(end_month))
+
+    return query.order_by(CustomerCohortStat.cohort_month, CustomerCohortStat.month_offset).all()
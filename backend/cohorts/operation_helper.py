@@ -0,0 +1,63 @@
+from cohorts.db_helper import *
+
+def months_between(start: date, end: date) -> int:
+    return (end.year - start.year) * 12 + end.month - start.month
+
+def function_get_cohort_analysis(db, client_id: int, start_month=None, end_month=None, max_months: int = 12, today=None):
+    """
+    Retention curve and cumulative LTV per monthly acquisition cohort, from customer_cohort_stats.
+
+    Each cohort gets one value per month offset from 0 up to the current month (capped at
+    max_months): retention = active customers / cohort size, cumulative_ltv = revenue so far /
+    cohort size. The averages weight cohorts by size, over the cohorts old enough for each offset.
+    """
+    today = today or date.today()
+    rows = get_cohort_stats_data(db, client_id, start_month, end_month, max_months)
+
+    stats_by_cohort = {}
+    for row in rows:
+        stats_by_cohort.setdefault(row.cohort_month, []).append(row)
+
+    cohorts = []
+    retained_by_offset = [0] * (max_months + 1)
+    ltv_by_offset = [0.0] * (max_months + 1)
+    customers_by_offset = [0] * (max_months + 1)
+
+    for cohort_month, cohort_rows in stats_by_cohort.items():
+        cohort_size = cohort_rows[0].cohort_size
+        offsets = min(months_between(cohort_month, month_start(today)), max_months) + 1
+        by_offset = {row.month_offset: row for row in cohort_rows}
+
+        active_customers, revenue, cumulative_revenue = [], [], []
+        running_revenue = 0.0
+        for offset in range(offsets):
+            row = by_offset.get(offset)
+            # Months without orders have no row: nobody active, cumulative revenue unchanged
+            if row:
+                running_revenue = row.cumulative_revenue
+            active_customers.append(row.active_customers if row else 0)
+            revenue.append(round(row.revenue, 3) if row else 0.0)
+            cumulative_revenue.append(running_revenue)
+
+            retained_by_offset[offset] += active_customers[-1]
+            ltv_by_offset[offset] += running_revenue
+            customers_by_offset[offset] += cohort_size
+
+        cohorts.append({
+            "cohort_month": cohort_month.strftime("%Y-%m"),
+            "customers": cohort_size,
+            "active_customers": active_customers,
+            "revenue": revenue,
+            "retention": [round(active / cohort_size, 4) for active in active_customers],
+            "cumulative_ltv": [round(total / cohort_size, 3) for total in cumulative_revenue],
+        })
+
+    return {
+        "cohorts": cohorts,
+        "average_retention": [
+            round(retained_by_offset[offset] / count, 4) for offset, count in enumerate(customers_by_offset) if count
+        ],
+        "average_ltv": [
+            round(ltv_by_offset[offset] / count, 3) for offset, count in enumerate(customers_by_offset) if count
+        ],
+    }
@@ -1,10 +1,22 @@
 from sqlalchemy.orm import Session
 from models import *
-from typing import List, Dict
-from sqlalchemy import func, desc, text, and_, case
+from typing import List, Dict, Optional, Iterable, Iterator
+from sqlalchemy import func, desc, text, and_, or_, case, tuple_
 from datetime import date, timedelta, datetime
 from sqlalchemy.orm import Session, joinedload
 from utils.location_normalizer import normalize_address
+from orders.db_helper import encode_orders_cursor, decode_orders_cursor
+from utils.identity_normalizer import PHONE_IDENTITY, EMAIL_IDENTITY, customer_identities
+
+# Orders that count towards a customer's classification features
+CLASSIFIED_ORDER_STATUSES = ("completed", "processing")
+
+# Classification thresholds, shared by the vectorized rules in operation_helper and CUSTOMER_CLASS_FILTERS
+DEAD_CUTOFF_DATE = datetime(2025, 1, 1)   # single-order customers whose order is older than this are 'Dead'
+CHURN_RISK_DAYS = (30, 90)                # days since last order: < 30 Low, < 90 Medium, otherwise High
+SPENDING_TIERS = (50, 200, 1000)          # total spent: < 50 Low, < 200 Medium, < 1000 High, otherwise VIP
+
+CLASS_STREAM_CHUNK_SIZE = 500
 
 def customers_table_data(db: Session, client_id) -> List[dict]:
     # First get customer data with orders
@@ -52,19 +64,20 @@ def customers_table_data(db: Session, client_id) -> List[dict]:
         # Get address for this customer
         address = address_map.get(row.id)
         
-        # Extract governorate from all address fields
-        governorate = None
-        try:
-            normalized_addr = normalize_address(
-                address_1=address.address_1 if address else None,
-                address_2=address.address_2 if address else None,
-                city=address.city if address else None,
-                state=address.state if address else None
-            )
-            governorate = normalized_addr.get("governorate")
-        except Exception:
-            # Silently handle errors - governorate will be None
-            pass
+        # Governorate is resolved at write time; rows not yet backfilled fall back to the normalizer
+        governorate = address.governorate if address else None
+        if address and governorate is None:
+            try:
+                normalized_addr = normalize_address(
+                    address_1=address.address_1,
+                    address_2=address.address_2,
+                    city=address.city,
+                    state=address.state
+                )
+                governorate = normalized_addr.get("governorate")
+            except Exception:
+                # Silently handle errors - governorate will be None
+                pass
         
         customer_list.append({
             "id": row.id,
@@ -78,20 +91,22 @@ def customers_table_data(db: Session, client_id) -> List[dict]:
     
     return customer_list
 
-def get_customer_order_data_for_analysis(db: Session, id: int) -> dict:
-    customer = db.query(Customer).options(
-        joinedload(Customer.orders).joinedload(Order.items).joinedload(OrderItem.product)
-    ).filter(Customer.id == id).first()
+CUSTOMER_ORDERS_PAGE_MAX_LIMIT = 200
 
+def get_customer_info_data(db: Session, id: int) -> dict:
+    """
+    Base info of a customer with its first address; {} if the customer does not exist.
+    """
+    customer = db.query(Customer).filter(Customer.id == id).first()
     if not customer:
         return {}
 
     # Get the first address for this customer (handle multiple addresses)
     address = db.query(Address).filter(Address.customer_id == id).first()
 
-    # Build customer base info (no repetition)
-    customer_info = {
+    return {
         "customer_id": customer.id,
+        "client_id": customer.client_id,
         "first_name": customer.first_name,
         "last_name": customer.last_name,
         "email": customer.email,
@@ -105,48 +120,114 @@ def get_customer_order_data_for_analysis(db: Session, id: int) -> dict:
         "country": address.country if address else None
     }
 
-    # Build orders with nested items
-    orders_list = []
-    all_records = []
+def get_customer_orders_page_data(
+    db: Session,
+    customer_id: int,
+    client_id: int,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    One page of a customer's orders with their items, newest first.
+    Keyset pagination on (created_at, id) with the same cursor format as the
+    orders list; only the page's items and their products are loaded.
+    """
+    limit = max(1, min(limit, CUSTOMER_ORDERS_PAGE_MAX_LIMIT))
 
-    for order in customer.orders:
-        items_list = []
+    query = db.query(Order).filter(Order.customer_id == customer_id)
+    total_orders = query.count()
 
-        for item in order.items:
-            product = item.product
-            item_record = {
+    if cursor:
+        cursor_created_at, cursor_id = decode_orders_cursor(cursor)
+        query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(cursor_created_at, cursor_id))
+
+    # One extra row tells us whether there is a next page
+    orders = (
+        query.order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+
+    # Items of the page with their product of the customer's client (order_items.product_id = products.external_id)
+    items_by_order = {order.id: [] for order in orders}
+    if orders:
+        items = (
+            db.query(
+                OrderItem.order_id,
+                OrderItem.product_id,
+                OrderItem.product_name,
+                OrderItem.quantity,
+                OrderItem.price,
+                Product.categories,
+                Product.stock_status,
+                Product.weight
+            )
+            .outerjoin(Product, and_(
+                Product.client_id == client_id,
+                Product.external_id == OrderItem.product_id
+            ))
+            .filter(OrderItem.order_id.in_(list(items_by_order)))
+            .order_by(OrderItem.id)
+            .all()
+        )
+        for item in items:
+            items_by_order[item.order_id].append({
                 "product_id": item.product_id,
                 "product_name": item.product_name,
                 "product_quantity": item.quantity,
                 "product_price": item.price,
-                "product_category": product.categories if product else None,
-                "product_stock_status": product.stock_status if product else None,
-                "product_weight": product.weight if product else None,
-            }
-            items_list.append(item_record)
-
-            # Used for pandas aggregation
-            all_records.append({
-                **item_record,
-                "order_status": order.status
+                "product_category": item.categories,
+                "product_stock_status": item.stock_status,
+                "product_weight": item.weight,
             })
 
-        orders_list.append({
-            "order_id": order.id,
-            "external_order_id": order.external_id,
-            "order_status": order.status,
-            "order_total": order.total_amount,
-            "order_date": order.created_at.isoformat(),
-            "payment_method": order.payment_method,
-            "items": items_list
-        })
-
     return {
-        "customer": customer_info,
-        "orders": orders_list,
-        "raw_records": all_records  # Needed for analysis
+        "orders": [
+            {
+                "order_id": order.id,
+                "external_order_id": order.external_id,
+                "order_status": order.status,
+                "order_total": order.total_amount,
+                "order_date": order.created_at.isoformat(),
+                "payment_method": order.payment_method,
+                "items": items_by_order[order.id]
+            }
+            for order in orders
+        ],
+        "next_cursor": encode_orders_cursor(orders[-1].created_at, orders[-1].id) if has_more else None,
+        "has_more": has_more,
+        "total_orders": total_orders,
     }
 
+def get_customer_product_summary_data(db: Session, customer_id: int) -> List[dict]:
+    """
+    Total quantity per product over the customer's completed orders, by product name.
+    Items without a WooCommerce product id are keyed by their name.
+    """
+    rows = (
+        db.query(
+            OrderItem.product_id,
+            OrderItem.product_name,
+            func.sum(OrderItem.quantity).label("total_quantity")
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.customer_id == customer_id, Order.status == "completed")
+        .group_by(OrderItem.product_id, OrderItem.product_name)
+        .order_by(OrderItem.product_name)
+        .all()
+    )
+
+    return [
+        {
+            "product_id": row.product_id if row.product_id is not None else row.product_name,
+            "product_name": row.product_name,
+            "total_quantity": int(row.total_quantity or 0),
+        }
+        for row in rows
+    ]
+
 def get_customer_order_items_summary_data(db: Session, customer_id: int) -> List[Dict]:
     customer = db.query(Customer).options(
         joinedload(Customer.orders).joinedload(Order.items)
@@ -194,32 +275,38 @@ def get_customer_product_orders_data(db: Session, customer_id: int, product_exte
 
     return [{"date": order.created_at.strftime("%Y-%m-%d"), "quantity": order.quantity} for order in results]
 
-def get_customer_classification_data(db: Session):
+def get_customer_classification_data(db: Session, client_id: int):
+    """
+    Order count and last order date of every customer of a client, read from customer_features.
+    """
     data = (
         db.query(
             Customer.id.label("customer_id"),
             func.concat(Customer.first_name, ' ', Customer.last_name).label("customer_name"),
-            func.count(Order.id).label("order_count"),
-            func.max(Order.created_at).label("last_order_date")  # Get latest order date
+            func.coalesce(CustomerFeature.frequency, 0).label("order_count"),
+            CustomerFeature.last_order_at.label("last_order_date")
         )
-        .outerjoin(Order, (Customer.id == Order.customer_id) & Order.status.in_(["completed", "processing"]))
-        .group_by(Customer.id, Customer.first_name, Customer.last_name)
+        .outerjoin(CustomerFeature, CustomerFeature.customer_id == Customer.id)
+        .filter(Customer.client_id == client_id)
         .all()
     )
 
     return data
 
-def get_spending_customer_classification_data(db: Session):
+def get_spending_customer_classification_data(db: Session, client_id: int):
+    """
+    Order count, total spent and last order date of every customer of a client, read from customer_features.
+    """
     data = (
         db.query(
             Customer.id.label("customer_id"),
             func.concat(Customer.first_name, ' ', Customer.last_name).label("customer_name"),
-            func.count(Order.id).label("order_count"),
-            func.coalesce(func.sum(Order.total_amount), 0).label("total_spent"),
-            func.max(Order.created_at).label("last_order_date")
+            func.coalesce(CustomerFeature.frequency, 0).label("order_count"),
+            func.coalesce(CustomerFeature.monetary, 0).label("total_spent"),
+            CustomerFeature.last_order_at.label("last_order_date")
         )
-        .outerjoin(Order, (Customer.id == Order.customer_id) & Order.status.in_(["completed", "processing"]))
-        .group_by(Customer.id, Customer.first_name, Customer.last_name)
+        .outerjoin(CustomerFeature, CustomerFeature.customer_id == Customer.id)
+        .filter(Customer.client_id == client_id)
         .all()
     )
     return data
@@ -234,25 +321,399 @@ def get_full_customer_classification_data(db: Session, client_id: int):
     - order_count
     - total_spent
     - last_order_date
-    Filters only 'completed' and 'processing' orders.
+    Read from customer_features ('completed' and 'processing' orders); customers
+    without a features row have no such orders.
     """
     data = (
         db.query(
             Customer.id.label("customer_id"),
             func.concat(Customer.first_name, ' ', Customer.last_name).label("customer_name"),
             Customer.phone.label("phone"),
-            func.count(Order.id).label("order_count"),
-            func.coalesce(func.sum(Order.total_amount), 0).label("total_spent"),
-            func.max(Order.created_at).label("last_order_date")
-        )
-        .outerjoin(
-            Order,
-            (Customer.id == Order.customer_id) &
-            Order.status.in_(["completed", "processing"])
+            func.coalesce(CustomerFeature.frequency, 0).label("order_count"),
+            func.coalesce(CustomerFeature.monetary, 0).label("total_spent"),
+            CustomerFeature.last_order_at.label("last_order_date")
         )
+        .outerjoin(CustomerFeature, CustomerFeature.customer_id == Customer.id)
         .filter(Customer.client_id == client_id)  # ✅ Only current client’s customers
-        .group_by(Customer.id, Customer.first_name, Customer.last_name, Customer.phone)
         .all()
     )
 
-    return data
\ No newline at end of file
+    return data
+
+def refresh_customer_features_data(
+    db: Session,
+    client_id: Optional[int] = None,
+    customer_ids: Optional[Iterable[int]] = None
+) -> None:
+    """
+    Rebuild customer_features rows from orders for the given customers (or all customers
+    of a client, or everyone when both are omitted). Does not commit.
+    """
+    params = {"statuses": list(CLASSIFIED_ORDER_STATUSES)}
+    feature_filter = ""
+    customer_filter = ""
+    if client_id is not None:
+        params["client_id"] = client_id
+        feature_filter += " AND client_id = :client_id"
+        customer_filter += " AND c.client_id = :client_id"
+    if customer_ids is not None:
+        params["customer_ids"] = list(customer_ids)
+        feature_filter += " AND customer_id = ANY(:customer_ids)"
+        customer_filter += " AND c.id = ANY(:customer_ids)"
+
+    db.execute(text(f"DELETE FROM customer_features WHERE TRUE{feature_filter}"), params)
+    db.execute(text(f"""
+        INSERT INTO customer_features (customer_id, client_id, frequency, monetary, first_order_at,
+                                       last_order_at, avg_gap_days, gap_variance, updated_at)
+        SELECT customer_id, client_id, COUNT(*), COALESCE(SUM(total_amount), 0), MIN(created_at),
+               MAX(created_at), AVG(gap_days), VAR_POP(gap_days), NOW()
+        FROM (
+            SELECT c.id AS customer_id, c.client_id, o.total_amount, o.created_at,
+                   EXTRACT(EPOCH FROM o.created_at - LAG(o.created_at) OVER (
+                       PARTITION BY c.id ORDER BY o.created_at, o.id
+                   )) / 86400.0 AS gap_days
+            FROM customers c
+            JOIN orders o ON o.customer_id = c.id
+            WHERE o.status = ANY(:statuses){customer_filter}
+        ) customer_orders
+        GROUP BY customer_id, client_id
+    """), params)
+
+# Welford update of the gap mean/variance with the gap to the new last order
+_NEW_GAP = "(EXTRACT(EPOCH FROM EXCLUDED.last_order_at - f.last_order_at) / 86400.0)"
+_OLD_MEAN = "COALESCE(f.avg_gap_days, 0)"
+_NEW_MEAN = f"({_OLD_MEAN} + ({_NEW_GAP} - {_OLD_MEAN}) / f.frequency)"
+
+def record_customer_order_features(
+    db: Session,
+    customer_id: int,
+    client_id: int,
+    created_at: datetime,
+    total_amount: float
+) -> None:
+    """
+    Add one new counted order to a customer's features in place. Orders older than the
+    customer's last order can't be folded in incrementally, so the customer is rebuilt
+    from its orders instead (the order must already be flushed). Does not commit.
+    """
+    appended = db.execute(text(f"""
+        INSERT INTO customer_features AS f (customer_id, client_id, frequency, monetary, first_order_at,
+                                            last_order_at, avg_gap_days, gap_variance, updated_at)
+        VALUES (:customer_id, :client_id, 1, :total_amount, :created_at, :created_at, NULL, NULL, NOW())
+        ON CONFLICT (customer_id) DO UPDATE SET
+            frequency = f.frequency + 1,
+            monetary = f.monetary + EXCLUDED.monetary,
+            last_order_at = EXCLUDED.last_order_at,
+            avg_gap_days = {_NEW_MEAN},
+            gap_variance = (COALESCE(f.gap_variance, 0) * (f.frequency - 1)
+                            + ({_NEW_GAP} - {_OLD_MEAN}) * ({_NEW_GAP} - {_NEW_MEAN})) / f.frequency,
+            updated_at = NOW()
+        WHERE f.last_order_at <= EXCLUDED.last_order_at
+        RETURNING f.customer_id
+    """), {
+        "customer_id": customer_id,
+        "client_id": client_id,
+        "created_at": created_at,
+        "total_amount": total_amount,
+    }).first()
+
+    if appended is None:
+        refresh_customer_features_data(db, customer_ids=[customer_id])
+
+def get_segment_features_data(db: Session, client_id: int):
+    """
+    (order_count, last_order_date) of a client's customers with counted orders, for fitting segments.
+    """
+    return (
+        db.query(
+            CustomerFeature.frequency.label("order_count"),
+            CustomerFeature.last_order_at.label("last_order_date")
+        )
+        .filter(CustomerFeature.client_id == client_id)
+        .all()
+    )
+
+def get_segment_model_data(db: Session, client_id: int) -> Optional[CustomerSegmentModel]:
+    return db.query(CustomerSegmentModel).filter(CustomerSegmentModel.client_id == client_id).first()
+
+def save_segment_model_data(db: Session, client_id: int, model: dict) -> CustomerSegmentModel:
+    """
+    Insert or replace a client's fitted segment model. Does not commit.
+    """
+    row = get_segment_model_data(db, client_id)
+    if row is None:
+        row = CustomerSegmentModel(client_id=client_id)
+        db.add(row)
+    for field, value in model.items():
+        setattr(row, field, value)
+    row.fitted_at = datetime.utcnow()
+    db.flush()
+    return row
+
+def _churn_since(today: datetime, days: int) -> datetime:
+    # (today - last_order).days < days  <=>  last_order > today - days
+    return today - timedelta(days=days)
+
+# Customer classes as SQL predicates over customers LEFT JOIN customer_features
+CUSTOMER_CLASS_FILTERS = {
+    # Behaviour (classify_behavior)
+    "dead": lambda today: and_(CustomerFeature.frequency == 1, CustomerFeature.last_order_at < DEAD_CUTOFF_DATE),
+    "new": lambda today: and_(CustomerFeature.frequency == 1, CustomerFeature.last_order_at >= DEAD_CUTOFF_DATE),
+    "occasional": lambda today: CustomerFeature.frequency.between(2, 5),
+    "frequent": lambda today: CustomerFeature.frequency.between(6, 15),
+    "loyal": lambda today: CustomerFeature.frequency >= 16,
+    "no_orders": lambda today: CustomerFeature.customer_id.is_(None),
+    # Churn risk (calculate_churn_risk)
+    "low_churn": lambda today: CustomerFeature.last_order_at > _churn_since(today, CHURN_RISK_DAYS[0]),
+    "medium_churn": lambda today: and_(
+        CustomerFeature.last_order_at <= _churn_since(today, CHURN_RISK_DAYS[0]),
+        CustomerFeature.last_order_at > _churn_since(today, CHURN_RISK_DAYS[1]),
+    ),
+    "high_churn": lambda today: or_(
+        CustomerFeature.last_order_at.is_(None),
+        CustomerFeature.last_order_at <= _churn_since(today, CHURN_RISK_DAYS[1]),
+    ),
+    # Spending (classify_spending)
+    "low_spender": lambda today: func.coalesce(CustomerFeature.monetary, 0) < SPENDING_TIERS[0],
+    "medium_spender": lambda today: and_(
+        CustomerFeature.monetary >= SPENDING_TIERS[0], CustomerFeature.monetary < SPENDING_TIERS[1]
+    ),
+    "high_spender": lambda today: and_(
+        CustomerFeature.monetary >= SPENDING_TIERS[1], CustomerFeature.monetary < SPENDING_TIERS[2]
+    ),
+    "vip": lambda today: CustomerFeature.monetary >= SPENDING_TIERS[2],
+}
+
+def stream_customer_class_data(
+    db: Session,
+    customer_class: str,
+    client_id: Optional[int] = None,
+    chunk_size: int = CLASS_STREAM_CHUNK_SIZE,
+    today: Optional[datetime] = None
+) -> Iterator[List[dict]]:
+    """
+    Yield the customers of one client (or of every client, client by client) that fall in
+    a CUSTOMER_CLASS_FILTERS class, in chunks of chunk_size. Keyset-paginated on
+    (client_id, customer_id), so each chunk is one indexed range scan.
+    """
+    if customer_class not in CUSTOMER_CLASS_FILTERS:
+        raise ValueError(f"Unknown customer class '{customer_class}'")
+    condition = CUSTOMER_CLASS_FILTERS[customer_class](today or datetime.now())
+
+    last_key = None
+    while True:
+        query = (
+            db.query(
+                Customer.client_id.label("client_id"),
+                Customer.id.label("customer_id"),
+                func.concat(Customer.first_name, ' ', Customer.last_name).label("customer_name"),
+                Customer.phone.label("phone"),
+                func.coalesce(CustomerFeature.frequency, 0).label("order_count"),
+                func.coalesce(CustomerFeature.monetary, 0).label("total_spent"),
+                CustomerFeature.last_order_at.label("last_order_date")
+            )
+            .outerjoin(CustomerFeature, CustomerFeature.customer_id == Customer.id)
+            .filter(condition)
+        )
+        if client_id is not None:
+            query = query.filter(Customer.client_id == client_id)
+        if last_key is not None:
+            query = query.filter(tuple_(Customer.client_id, Customer.id) > last_key)
+
+        rows = query.order_by(Customer.client_id, Customer.id).limit(chunk_size).all()
+        if not rows:
+            return
+        yield [dict(row._mapping) for row in rows]
+        if len(rows) < chunk_size:
+            return
+        last_key = (rows[-1].client_id, rows[-1].customer_id)
+
+def get_forecast_features_data(db: Session, client_id: int):
+    """
+    RFM features of a client's customers with counted orders, for the purchase forecast.
+    """
+    return (
+        db.query(
+            CustomerFeature.customer_id,
+            CustomerFeature.frequency,
+            CustomerFeature.avg_gap_days,
+            CustomerFeature.gap_variance,
+            CustomerFeature.last_order_at
+        )
+        .filter(CustomerFeature.client_id == client_id)
+        .all()
+    )
+
+def replace_customer_forecasts_data(db: Session, client_id: int, forecasts: List[dict]) -> None:
+    """
+    Replace a client's customer_forecasts rows with `forecasts` (CustomerForecast column dicts). Does not commit.
+    """
+    db.query(CustomerForecast).filter(CustomerForecast.client_id == client_id).delete(synchronize_session=False)
+    if forecasts:
+        db.execute(CustomerForecast.__table__.insert(), forecasts)
+
+def get_forecasts_due_data(db: Session, customer_ids: Iterable[int], day: date) -> List[dict]:
+    """
+    Forecasts of the given customers whose next purchase is expected on `day`.
+    """
+    return [
+        dict(row._mapping)
+        for row in db.query(
+            CustomerForecast.customer_id,
+            CustomerForecast.next_purchase_on,
+            CustomerForecast.purchase_probability
+        )
+        .filter(CustomerForecast.customer_id.in_(list(customer_ids)), CustomerForecast.next_purchase_on == day)
+        .all()
+    ]
+
+def find_customer_by_identity(db: Session, client_id: int, phone: Optional[str], email: Optional[str]) -> Optional[Customer]:
+    """
+    Customer of a client owning the normalized phone or email (utils.identity_normalizer),
+    preferring the phone match. One lookup on the customer_identities primary key.
+    """
+    identities = [(kind, value) for kind, value in ((PHONE_IDENTITY, phone), (EMAIL_IDENTITY, email)) if value]
+    if not identities:
+        return None
+
+    return (
+        db.query(Customer)
+        .join(CustomerIdentity, CustomerIdentity.customer_id == Customer.id)
+        .filter(
+            CustomerIdentity.client_id == client_id,
+            tuple_(CustomerIdentity.kind, CustomerIdentity.value).in_(identities)
+        )
+        .order_by(case((CustomerIdentity.kind == PHONE_IDENTITY, 0), else_=1))
+        .first()
+    )
+
+def record_customer_identities(
+    db: Session,
+    client_id: int,
+    customer_id: int,
+    phone: Optional[str],
+    email: Optional[str]
+) -> None:
+    """
+    Register a customer's normalized phone and email; identities already owned by
+    another customer of the client are left to the dedupe job. Does not commit.
+    """
+    for kind, value in ((PHONE_IDENTITY, phone), (EMAIL_IDENTITY, email)):
+        if value:
+            db.execute(text("""
+                INSERT INTO customer_identities (client_id, kind, value, customer_id)
+                VALUES (:client_id, :kind, :value, :customer_id)
+                ON CONFLICT (client_id, kind, value) DO NOTHING
+            """), {"client_id": client_id, "kind": kind, "value": value, "customer_id": customer_id})
+
+def _identity_groups(customers) -> tuple:
+    """
+    Union-find over customers sharing a normalized identity.
+    Returns ({duplicate_id: survivor_id}, {(kind, value): survivor_id}); the survivor
+    of each group is its oldest (lowest id) customer.
+    """
+    parent = {}
+
+    def find(customer_id):
+        root = customer_id
+        while parent[root] != root:
+            root = parent[root]
+        while parent[customer_id] != root:
+            parent[customer_id], customer_id = root, parent[customer_id]
+        return root
+
+    owners = {}
+    for customer in sorted(customers, key=lambda c: c.id):
+        parent[customer.id] = customer.id
+        for identity in customer_identities(customer.phone, customer.email):
+            owner = owners.setdefault(identity, customer.id)
+            first, second = find(owner), find(customer.id)
+            if first != second:
+                parent[max(first, second)] = min(first, second)
+
+    merges = {customer_id: find(customer_id) for customer_id in parent if find(customer_id) != customer_id}
+    return merges, {identity: find(owner) for identity, owner in owners.items()}
+
+def dedupe_customers_data(db: Session, client_id: int) -> int:
+    """
+    Merge a client's customers that share a normalized phone or email into the oldest of them
+    and rebuild the client's customer_identities. Orders, addresses, messages and reorder
+    reminders move to the surviving customer in set-based statements; its features are rebuilt.
+    Returns the number of merged (deleted) customers. Does not commit.
+    """
+    customers = (
+        db.query(Customer.id, Customer.phone, Customer.email)
+        .filter(Customer.client_id == client_id)
+        .all()
+    )
+    merges, identities = _identity_groups(customers)
+
+    if merges:
+        db.execute(text("DROP TABLE IF EXISTS customer_merge_map"))
+        db.execute(text("""
+            CREATE TEMP TABLE customer_merge_map (
+                duplicate_id INTEGER PRIMARY KEY,
+                survivor_id INTEGER NOT NULL
+            ) ON COMMIT DROP
+        """))
+        db.execute(
+            text("INSERT INTO customer_merge_map (duplicate_id, survivor_id) VALUES (:duplicate_id, :survivor_id)"),
+            [{"duplicate_id": duplicate_id, "survivor_id": survivor_id} for duplicate_id, survivor_id in merges.items()]
+        )
+
+        # Survivors without a phone/email take one of their duplicates'
+        db.execute(text("""
+            UPDATE customers c
+            SET phone = COALESCE(c.phone, d.phone), email = COALESCE(c.email, d.email)
+            FROM (
+                SELECT m.survivor_id, MIN(dup.phone) AS phone, MIN(dup.email) AS email
+                FROM customer_merge_map m
+                JOIN customers dup ON dup.id = m.duplicate_id
+                GROUP BY m.survivor_id
+            ) d
+            WHERE c.id = d.survivor_id
+        """))
+        for table in ("orders", "addresses", "whatsapp_messages", "email_messages"):
+            db.execute(text(f"""
+                UPDATE {table} t SET customer_id = m.survivor_id
+                FROM customer_merge_map m
+                WHERE t.customer_id = m.duplicate_id
+            """))
+        # Addresses the duplicates shared with their survivor (same key as order sync)
+        db.execute(text("""
+            DELETE FROM addresses a
+            USING addresses b
+            WHERE a.customer_id = b.customer_id
+              AND a.id > b.id
+              AND a.customer_id IN (SELECT survivor_id FROM customer_merge_map)
+              AND a.address_1 IS NOT DISTINCT FROM b.address_1
+              AND a.city IS NOT DISTINCT FROM b.city
+              AND a.postcode IS NOT DISTINCT FROM b.postcode
+        """))
+        db.execute(text("""
+            INSERT INTO reorder_reminders AS r (customer_id, client_id, last_reminded_on, reminders_sent)
+            SELECT m.survivor_id, :client_id, MAX(dup.last_reminded_on), SUM(dup.reminders_sent)
+            FROM customer_merge_map m
+            JOIN reorder_reminders dup ON dup.customer_id = m.duplicate_id
+            GROUP BY m.survivor_id
+            ON CONFLICT (customer_id) DO UPDATE SET
+                last_reminded_on = GREATEST(r.last_reminded_on, EXCLUDED.last_reminded_on),
+                reminders_sent = r.reminders_sent + EXCLUDED.reminders_sent
+        """), {"client_id": client_id})
+
+        # Features, forecasts, reminders and identities of the duplicates cascade
+        db.execute(text("""
+            DELETE FROM customers c
+            USING customer_merge_map m
+            WHERE c.id = m.duplicate_id
+        """))
+        refresh_customer_features_data(db, customer_ids=set(merges.values()))
+
+    db.query(CustomerIdentity).filter(CustomerIdentity.client_id == client_id).delete(synchronize_session=False)
+    if identities:
+        db.execute(CustomerIdentity.__table__.insert(), [
+            {"client_id": client_id, "kind": kind, "value": value, "customer_id": customer_id}
+            for (kind, value), customer_id in identities.items()
+        ])
+
+    return len(merges)
@@ -1,52 +1,34 @@
 from customers.db_helper import *
 import pandas as pd
-from sklearn.cluster import KMeans
+from sklearn.cluster import MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
 import numpy as np
+from scipy import stats
+from itertools import repeat
 
 def function_get_customers_table(db, client_id):
     customers_data = customers_table_data(db, client_id)
 
     return customers_data
 
-def function_get_customers_details(db, id: int):
-    data = get_customer_order_data_for_analysis(db, id)
+TOP_PRODUCTS_LIMIT = 5
 
-    if not data:
-        return {}
-
-    raw_records = data["raw_records"]
-
-    df = pd.DataFrame(raw_records)
+def function_get_customers_details(db, id: int, limit: int = 50, cursor=None):
+    customer = get_customer_info_data(db, id)
 
-    # ✅ Only completed orders - use .copy() to avoid SettingWithCopyWarning
-    df_completed = df[df["order_status"] == "completed"].copy()
-
-    # Top 5 products
-    df_completed["product_key"] = df_completed["product_id"].fillna(
-        df_completed["product_name"]
-    )
+    if not customer:
+        return {}
 
-    top_products = (
-        df_completed.groupby(["product_key", "product_name"], as_index=False)
-        .agg(total_quantity=("product_quantity", "sum"))
-        .sort_values(by="total_quantity", ascending=False)
-        .head(5)
-        .rename(columns={"product_key": "product_id"})
-        .to_dict(orient="records")
-    )
+    client_id = customer.pop("client_id")
+    orders_page = get_customer_orders_page_data(db, id, client_id, limit=limit, cursor=cursor)
 
-    all_products_summary = (
-        df_completed.groupby(["product_key", "product_name"], as_index=False)
-        .agg(total_quantity=("product_quantity", "sum"))
-        .rename(columns={"product_key": "product_id"})
-        .sort_values(by="product_name")
-        .to_dict(orient="records")
-    )
+    # ✅ Only completed orders, aggregated in SQL
+    all_products_summary = get_customer_product_summary_data(db, id)
+    top_products = sorted(all_products_summary, key=lambda p: p["total_quantity"], reverse=True)[:TOP_PRODUCTS_LIMIT]
 
     return {
-        "customer": data["customer"],
-        "orders": data["orders"],
+        "customer": customer,
+        **orders_page,
         "top_products": top_products,
         "all_products_summary": all_products_summary
     }
@@ -85,52 +67,80 @@ def function_get_customer_product_orders(db, customer_id: int, product_external_
 # Helper Functions
 # --------------------------
 
-def classify_behavior(order_count, last_order_date, cutoff_date=datetime(2025, 1, 1)):
+# Rule boundaries (half-open, lower bound inclusive)
+CHURN_RISK_BINS = [-np.inf, *CHURN_RISK_DAYS, np.inf]
+CHURN_RISK_LABELS = ["Low", "Medium", "High"]
+SPENDING_BINS = [-np.inf, *SPENDING_TIERS, np.inf]
+SPENDING_LABELS = ["Low Spender", "Medium Spender", "High Spender", "VIP"]
+NO_ORDER_RECENCY_DAYS = 999
+
+SEGMENT_FEATURES = ["order_count", "recency_days"]
+SEGMENT_CLUSTERS = 4
+SEGMENT_NAMES = ["Loyal At-Risk", "Cold Leads", "Dormant Customers", "Lost One-Timers"]  # best -> worst centroid
+UNSEGMENTED = "Unsegmented"
+SEGMENT_MODEL_MAX_AGE = timedelta(days=7)
+SEGMENT_GROWTH_RATIO = 1.5   # refit once the client has 50% more customers with orders than at fit time
+SEGMENT_DRIFT_RATIO = 1.25   # ... or customers sit 25% further from their centroids on average
+
+FORECAST_HORIZON_DAYS = 30
+FORECAST_PRIOR_GAPS = 2          # weight of the client-wide gap distribution, in pseudo-gaps
+FORECAST_DEFAULT_GAP_DAYS = 30   # prior mean gap for clients without any repeat customer
+FORECAST_CV2_BOUNDS = (0.02, 10.0)
+FORECAST_DROPOUT_BOUNDS = (0.05, 0.95)  # per-order churn probability
+
+CLASSIFICATION_FIELDS = [
+    "customer_id", "customer_name", "phone", "order_count", "total_spent", "last_order_date",
+    "classification", "churn_risk", "segment", "spending_classification",
+]
+
+
+def classify_behavior(order_count, last_order_date, cutoff_date=DEAD_CUTOFF_DATE):
     """
     Classify customers based on their order count and last order date.
 
     Args:
-        order_count (int): Number of orders placed by the customer.
-        last_order_date (datetime or None): Date of the last order.
+        order_count (Series[int]): Number of orders placed by each customer.
+        last_order_date (Series[datetime64]): Date of the last order (NaT when none).
         cutoff_date (datetime): Reference date to distinguish old vs new customers.
 
     Returns:
-        str: One of 'New', 'Dead', 'Occasional', 'Frequent', 'Loyal', or 'No Orders'.
+        ndarray[str]: One of 'New', 'Dead', 'Occasional', 'Frequent', 'Loyal', or 'No Orders'.
     """
-    if order_count == 1 and pd.notnull(last_order_date) and last_order_date < cutoff_date:
-        return "Dead"
-    elif order_count == 1:
-        return "New"
-    elif 2 <= order_count <= 5:
-        return "Occasional"
-    elif 6 <= order_count <= 15:
-        return "Frequent"
-    elif order_count >= 16:
-        return "Loyal"
-    else:
-        return "No Orders"
+    conditions = [
+        (order_count == 1) & (last_order_date < cutoff_date),  # NaT compares False
+        order_count == 1,
+        order_count.between(2, 5),
+        order_count.between(6, 15),
+        order_count >= 16,
+    ]
+    choices = ["Dead", "New", "Occasional", "Frequent", "Loyal"]
+    return np.select(conditions, choices, default="No Orders")
 
-def calculate_churn_risk(last_order_date, today=None):
+def recency_in_days(last_order_date, today):
+    """
+    Whole days since the last order (NaN when the customer has no orders).
+
+    Args:
+        last_order_date (Series[datetime64]): Date of last order.
+        today (datetime): Reference date.
+
+    Returns:
+        Series[float]: Days since the last order.
+    """
+    return (pd.Timestamp(today) - last_order_date).dt.days
+
+def calculate_churn_risk(recency_days):
     """
     Determine churn risk based on how long ago the last order was placed.
 
     Args:
-        last_order_date (datetime or None): Date of last order.
-        today (datetime, optional): Reference date; defaults to now.
+        recency_days (Series[float]): Days since the last order, NaN when none.
 
     Returns:
-        str: 'Low', 'Medium', or 'High' risk.
+        Series[str]: 'Low' (< 30 days), 'Medium' (< 90 days) or 'High' risk.
     """
-    today = today or datetime.now()
-    if pd.isnull(last_order_date):
-        return "High"
-    days_since = (today - last_order_date).days
-    if days_since < 30:
-        return "Low"
-    elif days_since < 90:
-        return "Medium"
-    else:
-        return "High"
+    risk = pd.cut(recency_days, bins=CHURN_RISK_BINS, labels=CHURN_RISK_LABELS, right=False)
+    return risk.astype(object).fillna("High")
 
 
 def classify_spending(total_spent):
@@ -138,53 +148,147 @@ def classify_spending(total_spent):
     Classify customers based on total spending.
 
     Args:
-        total_spent (float): Total monetary value spent by the customer.
+        total_spent (Series[float]): Total monetary value spent by each customer.
 
     Returns:
-        str: One of 'Low Spender', 'Medium Spender', 'High Spender', or 'VIP'.
+        Series[str]: One of 'Low Spender', 'Medium Spender', 'High Spender', or 'VIP'.
     """
-    if total_spent < 50:
-        return "Low Spender"
-    elif 50 <= total_spent < 200:
-        return "Medium Spender"
-    elif 200 <= total_spent < 1000:
-        return "High Spender"
-    else:
-        return "VIP"
+    spending = pd.cut(total_spent, bins=SPENDING_BINS, labels=SPENDING_LABELS, right=False)
+    return spending.astype(object).fillna("VIP")
 
-def segment_customers_kmeans(df, today):
-    
+def fit_segment_model(features):
     """
-    Apply KMeans clustering based on order count and recency.
+    Fit StandardScaler + MiniBatchKMeans on customers' order count and recency.
+
+    Clusters are named deterministically from their centroids: SEGMENT_NAMES are handed out
+    in order of (scaled order_count - scaled recency_days), i.e. from frequent recent buyers
+    to one-off lapsed ones, so names don't depend on the label ids KMeans happens to assign.
 
     Args:
-        df (DataFrame): DataFrame with 'order_count' and 'last_order_date'.
-        today (datetime): Reference date to calculate recency.
+        features (DataFrame): 'order_count' and 'recency_days' of customers with orders.
 
     Returns:
-        DataFrame: Modified DataFrame with a 'segment' column.
+        dict: CustomerSegmentModel fields, or None with fewer distinct customers than clusters.
     """
-
-    df["recency_days"] = df["last_order_date"].apply(
-        lambda d: (today - d).days if pd.notnull(d) else 999
-    )
-    clustering_df = df[df["order_count"] > 0][["order_count", "recency_days"]]
+    X = features[SEGMENT_FEATURES].to_numpy(dtype=float)
+    if len(np.unique(X, axis=0)) < SEGMENT_CLUSTERS:
+        return None
 
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(clustering_df)
+    X_scaled = scaler.fit_transform(X)
 
-    kmeans = KMeans(n_clusters=4, random_state=42, n_init="auto")
-    df.loc[df["order_count"] > 0, "segment"] = kmeans.fit_predict(X_scaled).astype(int)
+    kmeans = MiniBatchKMeans(n_clusters=SEGMENT_CLUSTERS, random_state=42, n_init=3, batch_size=4096)
+    labels = kmeans.fit_predict(X_scaled)
+    centroids = kmeans.cluster_centers_
 
-    segment_map = {
-        0: "Loyal At-Risk",
-        1: "Dormant Customers",
-        2: "Cold Leads",
-        3: "Lost One-Timers"
+    ranking = np.argsort(centroids[:, 1] - centroids[:, 0], kind="stable")
+    segment_names = [None] * SEGMENT_CLUSTERS
+    for rank, cluster in enumerate(ranking):
+        segment_names[cluster] = SEGMENT_NAMES[rank]
+
+    return {
+        "scaler_mean": scaler.mean_.tolist(),
+        "scaler_scale": scaler.scale_.tolist(),
+        "centroids": centroids.tolist(),
+        "segment_names": segment_names,
+        "mean_distance": float(np.linalg.norm(X_scaled - centroids[labels], axis=1).mean()),
+        "n_samples": len(X),
     }
-    df["segment"] = df["segment"].apply(lambda x: segment_map.get(x, "Unsegmented"))
+
+def predict_segments(model, features):
+    """
+    Assign customers to the nearest centroid of a fitted segment model.
+
+    Args:
+        model (CustomerSegmentModel): Persisted model of the client.
+        features (DataFrame): 'order_count' and 'recency_days' of customers with orders.
+
+    Returns:
+        tuple: (segment name per customer, distance to its centroid in scaled space)
+    """
+    X = (features[SEGMENT_FEATURES].to_numpy(dtype=float) - np.asarray(model.scaler_mean)) / np.asarray(model.scaler_scale)
+    squared = np.stack([((X - centroid) ** 2).sum(axis=1) for centroid in np.asarray(model.centroids)], axis=1)
+    labels = squared.argmin(axis=1)
+    names = np.asarray(model.segment_names, dtype=object)[labels]
+    return names, np.sqrt(squared[np.arange(len(X)), labels])
+
+def segment_model_is_stale(model, distances, now=None):
+    """
+    A model needs refitting when it is old, the customer base outgrew it, or customers
+    now sit much further from their centroids than when it was fitted.
+    """
+    now = now or datetime.utcnow()
+    if model.fitted_at is None or now - model.fitted_at > SEGMENT_MODEL_MAX_AGE:
+        return True
+    if len(distances) > model.n_samples * SEGMENT_GROWTH_RATIO:
+        return True
+    return model.mean_distance > 0 and distances.mean() > model.mean_distance * SEGMENT_DRIFT_RATIO
+
+def request_segment_refit(client_id):
+    # Imported here: the task module imports this one
+    from tasks.refit_customer_segments import refit_customer_segments_task
+    try:
+        refit_customer_segments_task.delay(client_id)
+    except Exception as e:
+        print(f"⚠️ Could not enqueue segment refit for client {client_id}: {e}")
+
+def assign_customer_segments(db, client_id, df):
+    """
+    Segment customers with the client's persisted model, fitting one on first use.
+    Stale models keep serving while a refit is queued.
+
+    Args:
+        df (DataFrame): DataFrame with 'order_count' and 'recency_days'.
+
+    Returns:
+        DataFrame: Modified DataFrame with a 'segment' column.
+    """
+    df["segment"] = UNSEGMENTED
+    ordered = df["order_count"] > 0
+    if not ordered.any():
+        return df
+    features = df.loc[ordered, SEGMENT_FEATURES]
+
+    model = get_segment_model_data(db, client_id)
+    if model is None:
+        fitted = fit_segment_model(features)
+        if fitted is None:
+            return df
+        model = save_segment_model_data(db, client_id, fitted)
+        db.commit()
+
+    names, distances = predict_segments(model, features)
+    df.loc[ordered, "segment"] = names
+
+    if segment_model_is_stale(model, distances):
+        request_segment_refit(client_id)
     return df
 
+def isoformat_dates(dates):
+    """
+    Vectorized datetime.isoformat() for a naive datetime64 Series; NaT becomes None.
+    """
+    values = dates.to_numpy(dtype="datetime64[us]")
+    formatted = np.datetime_as_string(values, unit="s").astype(object)
+    with_micros = ~np.isnat(values) & (values.astype("datetime64[s]") != values)
+    if with_micros.any():
+        formatted[with_micros] = np.datetime_as_string(values[with_micros], unit="us")
+    formatted[np.isnat(values)] = None
+    return formatted
+
+def frame_records(df):
+    """
+    df.to_dict("records") with native Python values and None for missing ones, built
+    column-wise (to_dict boxes object columns cell by cell, which dominates on large tenants).
+    """
+    columns = []
+    for name in df.columns:
+        values = df[name]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(object).where(values.notna(), None)
+        columns.append(values.tolist())
+    return list(map(dict, map(zip, repeat(df.columns.tolist()), zip(*columns))))
+
 # --------------------------
 # Main Function
 # --------------------------
@@ -192,70 +296,193 @@ def segment_customers_kmeans(df, today):
 def function_get_full_customer_classification(db, client_id):
     # Fetch data
     customer_data = get_full_customer_classification_data(db, client_id)
-    
-    # SAFELY convert query result to DataFrame using column labels
-    df = pd.DataFrame([dict(row._mapping) for row in customer_data])
-    
+
+    df = pd.DataFrame.from_records(
+        customer_data,
+        columns=["customer_id", "customer_name", "phone", "order_count", "total_spent", "last_order_date"],
+    )
+    if df.empty:
+        return []
+
     # Clean data
     df["order_count"] = df["order_count"].fillna(0).astype(int)
     df["total_spent"] = df["total_spent"].fillna(0).astype(float)
     df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors='coerce')
 
     today = datetime.now()
+    recency_days = recency_in_days(df["last_order_date"], today)
 
     # Apply classifications
-    df["classification"] = df.apply(
-        lambda row: classify_behavior(row["order_count"], row["last_order_date"]), axis=1
-    )
-    df["churn_risk"] = df["last_order_date"].apply(lambda x: calculate_churn_risk(x, today))
-    df["spending_classification"] = df["total_spent"].apply(classify_spending)
+    df["classification"] = classify_behavior(df["order_count"], df["last_order_date"])
+    df["churn_risk"] = calculate_churn_risk(recency_days)
+    df["spending_classification"] = classify_spending(df["total_spent"])
 
     # Apply segmentation
-    df = segment_customers_kmeans(df, today)
+    df["recency_days"] = recency_days.fillna(NO_ORDER_RECENCY_DAYS).astype(int)
+    df = assign_customer_segments(db, client_id, df)
+
+    # Final return structure: project the response columns, then emit records
+    response = df[CLASSIFICATION_FIELDS].copy()
+    response["customer_name"] = response["customer_name"].astype(str)
+    response["last_order_date"] = pd.Series(isoformat_dates(df["last_order_date"]), index=df.index, dtype=object)
+    return frame_records(response)
+
+def function_get_customer_classification(db, client_id):
+    customer_data = get_customer_classification_data(db, client_id)
+
+    df = pd.DataFrame.from_records(
+        customer_data, columns=["customer_id", "customer_name", "order_count", "last_order_date"]
+    )
+    if df.empty:
+        return []
+
+    df["order_count"] = df["order_count"].fillna(0).astype(int)
+    df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors='coerce')
+    df["classification"] = classify_behavior(df["order_count"], df["last_order_date"])
+
+    response = df[["customer_id", "customer_name", "order_count", "classification"]].copy()
+    response["customer_name"] = response["customer_name"].astype(str)
+    response["last_order_date"] = pd.Series(isoformat_dates(df["last_order_date"]), index=df.index, dtype=object)
+    return frame_records(response)
+
+def function_get_spending_customer_classification_data(db, client_id):
+    customer_data = get_spending_customer_classification_data(db, client_id)
+
+    df = pd.DataFrame.from_records(
+        customer_data, columns=["customer_id", "customer_name", "order_count", "total_spent", "last_order_date"]
+    )
+    if df.empty:
+        return []
+
+    df["order_count"] = df["order_count"].fillna(0).astype(int)
+    df["total_spent"] = df["total_spent"].fillna(0).astype(float)
+    df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors='coerce')
+    df["spending_classification"] = classify_spending(df["total_spent"])
+
+    response = df[["customer_id", "customer_name", "order_count", "total_spent", "spending_classification"]].copy()
+    response["customer_name"] = response["customer_name"].astype(str)
+    response["last_order_date"] = pd.Series(isoformat_dates(df["last_order_date"]), index=df.index, dtype=object)
+    return frame_records(response)
+
+def forecast_customer_purchases(features, now=None, horizon_days=FORECAST_HORIZON_DAYS):
+    """
+    Batch next-purchase forecast for all customers of a client from their RFM features.
+
+    Each customer's gaps between orders are modelled as Gamma-distributed. Mean and squared
+    coefficient of variation are the customer's own, shrunk towards the client-wide gap
+    distribution with FORECAST_PRIOR_GAPS pseudo-gaps (one-time buyers get the client's).
+    The purchase probability is conditional on no order since the last one:
+    P(order within horizon) = P(alive) * (1 - S(elapsed + horizon) / S(elapsed)).
 
-    # Format date
-    df["last_order_date"] = df["last_order_date"].apply(
-        lambda x: x.isoformat() if pd.notnull(x) else None
+    As in BG/NBD, a customer drops out for good after each order with a client-wide
+    probability d (orders per customer taken as geometric, d = customers / orders), so a long
+    silence is evidence of churn: P(alive) = (1 - d) S(elapsed) / ((1 - d) S(elapsed) + d).
+    Without it, a Gamma shape above 1 gives an increasing hazard and lapsed customers would
+    look the most likely to buy.
+
+    Args:
+        features (DataFrame): 'customer_id', 'frequency', 'avg_gap_days', 'gap_variance', 'last_order_at'.
+        now (datetime): Reference time; defaults to now.
+        horizon_days (int): Probability horizon in days.
+
+    Returns:
+        DataFrame: 'customer_id', 'next_purchase_on', 'expected_gap_days', 'purchase_probability'.
+    """
+    now = now or datetime.now()
+    n_gaps = (features["frequency"].to_numpy(dtype=float) - 1).clip(min=0)
+    avg_gap = features["avg_gap_days"].to_numpy(dtype=float)
+    variance = features["gap_variance"].to_numpy(dtype=float)
+    has_gaps = (n_gaps > 0) & ~np.isnan(avg_gap)
+
+    # Client-wide gap distribution, pooled over every observed gap
+    if has_gaps.any():
+        weights = n_gaps[has_gaps]
+        prior_mean = np.average(avg_gap[has_gaps], weights=weights)
+        pooled_variance = np.average(np.nan_to_num(variance[has_gaps]) + (avg_gap[has_gaps] - prior_mean) ** 2, weights=weights)
+        prior_cv2 = pooled_variance / prior_mean ** 2 if prior_mean > 0 else 1.0
+    else:
+        prior_mean, prior_cv2 = FORECAST_DEFAULT_GAP_DAYS, 1.0
+    prior_mean = max(prior_mean, 1.0)
+    prior_cv2 = float(np.clip(prior_cv2, *FORECAST_CV2_BOUNDS))
+
+    own_weight = np.where(has_gaps, n_gaps, 0.0)
+    total_weight = own_weight + FORECAST_PRIOR_GAPS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        own_cv2 = np.where(has_gaps & (avg_gap > 0), np.nan_to_num(variance) / avg_gap ** 2, prior_cv2)
+    mean_gap = np.maximum((own_weight * np.nan_to_num(avg_gap) + FORECAST_PRIOR_GAPS * prior_mean) / total_weight, 1.0)
+    cv2 = np.clip((own_weight * own_cv2 + FORECAST_PRIOR_GAPS * prior_cv2) / total_weight, *FORECAST_CV2_BOUNDS)
+
+    last_order_at = pd.to_datetime(features["last_order_at"])
+    elapsed = np.maximum((pd.Timestamp(now) - last_order_at).dt.total_seconds().to_numpy() / 86400.0, 0.0)
+
+    shape, scale = 1.0 / cv2, mean_gap * cv2
+    log_survival = stats.gamma.logsf(elapsed, shape, scale=scale)
+    log_survival_after = stats.gamma.logsf(elapsed + horizon_days, shape, scale=scale)
+    probability = -np.expm1(log_survival_after - log_survival)
+
+    frequency = features["frequency"].to_numpy(dtype=float)
+    dropout = float(np.clip(len(frequency) / max(frequency.sum(), 1.0), *FORECAST_DROPOUT_BOUNDS))
+    still_active = (1 - dropout) * np.exp(log_survival)
+    probability = probability * still_active / (still_active + dropout)
+
+    return pd.DataFrame({
+        "customer_id": features["customer_id"].to_numpy(),
+        "next_purchase_on": (last_order_at + pd.to_timedelta(mean_gap, unit="D")).dt.date,
+        "expected_gap_days": mean_gap,
+        "purchase_probability": np.nan_to_num(probability, nan=0.0),
+    })
+
+def function_refresh_customer_forecasts(db, client_id, now=None):
+    """
+    Recompute and store the purchase forecasts of every customer of a client. Returns the row count.
+    """
+    now = now or datetime.now()
+    features = pd.DataFrame.from_records(
+        get_forecast_features_data(db, client_id),
+        columns=["customer_id", "frequency", "avg_gap_days", "gap_variance", "last_order_at"],
     )
+    forecasts = forecast_customer_purchases(features, now=now) if not features.empty else pd.DataFrame()
+    if not forecasts.empty:
+        forecasts["client_id"] = client_id
+        forecasts["horizon_days"] = FORECAST_HORIZON_DAYS
+        forecasts["computed_at"] = now
 
-    # Optional inspection
-    print(df.groupby("segment")[["order_count", "recency_days", "total_spent"]].mean())
+    replace_customer_forecasts_data(db, client_id, frame_records(forecasts) if not forecasts.empty else [])
+    return len(forecasts)
 
-    # Final return structure
+def function_get_customers_in_class(db, customer_class, client_id=None):
+    """
+    Customers in a CUSTOMER_CLASS_FILTERS class (e.g. 'dead', 'low_churn', 'loyal'), of one
+    client or of all clients. Campaign tasks should iterate stream_customer_class_data instead.
+    """
     return [
-        {
-            "customer_id": int(row["customer_id"]),
-            "customer_name": str(row["customer_name"]),
-            "phone": row["phone"],
-            "order_count": int(row["order_count"]),
-            "total_spent": float(row["total_spent"]),
-            "last_order_date": row["last_order_date"],
-            "classification": row["classification"],
-            "churn_risk": row["churn_risk"],
-            "segment": row["segment"],
-            "spending_classification": row["spending_classification"]
-        }
-        for _, row in df.iterrows()
+        customer
+        for chunk in stream_customer_class_data(db, customer_class, client_id=client_id)
+        for customer in chunk
     ]
 
-def function_get_customers_with_low_churnRisk(db):
+def function_get_customers_with_low_churnRisk(db, client_id=None):
+    """
+    Extract customers with a 'Low' churn risk (ordered in the last 30 days).
 
-    all_customers = function_get_full_customer_classification(db)
-    low_churn_customers = [c for c in all_customers if c["churn_risk"] == "Low"]
-    
-    return low_churn_customers
+    Args:
+        db: Database connection/session.
+        client_id: Client to restrict to; all clients when omitted.
+
+    Returns:
+        list: Matching customers.
+    """
+    return function_get_customers_in_class(db, "low_churn", client_id)
 
-def function_get_dead_customers(db):
+def function_get_dead_customers(db, client_id=None):
     """
     Extract customers classified as 'Dead'.
 
     Args:
         db: Database connection/session.
+        client_id: Client to restrict to; all clients when omitted.
 
     Returns:
         list: Customers with classification = 'Dead'.
     """
-    all_customers = function_get_full_customer_classification(db)
-    dead_customers = [c for c in all_customers if c["classification"] == "Dead"]
-    
-    return dead_customers
\ No newline at end of file
+    return function_get_customers_in_class(db, "dead", client_id)
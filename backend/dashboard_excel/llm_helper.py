@@ -2,6 +2,21 @@ import os
 import json
 from typing import Dict, List, Optional, Tuple
 from openai import OpenAI
+from utils.heuristic_column_mapper import low_confidence_fields, match_fields, open_columns
+
+def _match_locally(
+    column_names: List[str],
+    sample_values: Dict[str, List[str]],
+    canonical_fields: List[str],
+    required: Tuple[str, ...] = ()
+) -> Tuple[Dict[str, Optional[str]], List[str]]:
+  """
+  Heuristic pass before any LLM call. Returns ({field: column or None}, unsure_fields);
+  the LLM is only needed when unsure_fields is non-empty.
+  """
+  matches = match_fields(column_names, sample_values, canonical_fields)
+  unsure = low_confidence_fields(matches, open_columns(column_names, sample_values), required)
+  return {field: column for field, (column, _) in matches.items()}, unsure
 
 def infer_columns_with_llm(
     column_names: List[str],
@@ -13,6 +28,12 @@ def infer_columns_with_llm(
   We only send column names + a few sample values (masked).
   """
 
+  matched, unsure = _match_locally(
+    column_names, sample_values, ["customer_name", "total_amount"], required=("customer_name", "total_amount")
+  )
+  if not unsure:
+    return matched["customer_name"], matched["total_amount"]
+
   client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
   system = (
@@ -49,6 +70,11 @@ def infer_columns_with_llm(
     customer_col = None
   if amount_col not in column_names:
     amount_col = None
+  # Keep confident local matches, take the LLM's answer for the rest
+  if "customer_name" not in unsure:
+    customer_col = matched["customer_name"]
+  if "total_amount" not in unsure:
+    amount_col = matched["total_amount"]
   return customer_col, amount_col
 
 def infer_unique_id_column_with_llm(
@@ -61,6 +87,12 @@ def infer_unique_id_column_with_llm(
   Returns the column name or None.
   """
 
+  # Phone, then email, then an explicit customer ID
+  matched, unsure = _match_locally(column_names, sample_values, ["phone", "email", "customer_id"])
+  for field in ["phone", "email", "customer_id"]:
+    if matched[field] and field not in unsure:
+      return matched[field]
+
   client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
   system = (
@@ -96,6 +128,11 @@ def infer_unique_id_column_with_llm(
   return unique_id_col
 
 def infer_product_column_with_llm(column_names, sample_values, model="gpt-4o-mini"):
+    matched, unsure = _match_locally(column_names, sample_values, ["product_name", "product_id", "sku"])
+    for field in ["product_name", "product_id", "sku"]:
+        if matched[field] and field not in unsure:
+            return matched[field]
+
     client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
     system = (
         "Identify the best product column (names, items, SKUs, product IDs). "
@@ -132,6 +169,13 @@ def infer_customer_fields_with_llm(
   ["name", "civil_id", "phone", "city", "address", "email"]
   """
 
+  canonical = {"name": "customer_name", "civil_id": "civil_id", "phone": "phone",
+               "city": "City", "address": "address", "email": "email"}
+  matched, unsure = _match_locally(column_names, sample_values, list(canonical.values()))
+  local = {key: matched[field] for key, field in canonical.items()}
+  if not unsure:
+    return local
+
   client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
   system = (
@@ -166,7 +210,10 @@ def infer_customer_fields_with_llm(
   result: Dict[str, Optional[str]] = {}
   for key in ["name", "civil_id", "phone", "city", "address", "email"]:
     val = data.get(key)
-    result[key] = val if val in column_names else None
+    if canonical[key] not in unsure:
+      result[key] = local[key]
+    else:
+      result[key] = val if val in column_names else None
   return result
 
 def infer_order_fields_with_llm(
@@ -177,6 +224,13 @@ def infer_order_fields_with_llm(
     Use an LLM to infer canonical order fields from arbitrary uploaded file column names.
     Canonical fields: order_id, customer_name, amount, date, status
     """
+    canonical = {"order_id": "order_id", "customer_name": "customer_name", "amount": "total_amount",
+                 "date": "created_at", "status": "status"}
+    matched, unsure = _match_locally(column_names, sample_values, list(canonical.values()))
+    local = {key: matched[field] for key, field in canonical.items()}
+    if not unsure:
+        return local
+
     prompt = f"""
 You are given a list of dataframe columns and sample values.
 Map them to the following canonical order fields if possible:
@@ -215,4 +269,9 @@ and values are the chosen column name (or null if not found).
             "status": None,
         }
 
+    # Keep confident local matches, take the LLM's answer for the rest
+    for key, field in canonical.items():
+        if field not in unsure:
+            mapping[key] = local[key]
+
     return mapping
\ No newline at end of file
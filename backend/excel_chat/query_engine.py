@@ -5,12 +5,24 @@ Converts natural language queries to pandas operations on Excel data
 import os
 import json
 import pandas as pd
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 from sqlalchemy.orm import Session
 from models import UploadedFile, ColumnMapping, FileRow, Client
 from openai import OpenAI
+from excel_chat.query_plan import (
+    PlanValidationError,
+    load_file_columns,
+    load_file_frame,
+    load_sample_frame,
+    run_plan,
+    validate_plan,
+)
+from utils.streaming import DEFAULT_BATCH_SIZE, batched
 import re
 
+# Streaming responses aren't held in memory, so they can return more than the 100-row preview
+STREAM_MAX_ROWS = int(os.getenv("EXCEL_CHAT_STREAM_MAX_ROWS", "10000"))
+
 class ExcelQueryEngine:
     def __init__(self, db: Session, client: Client, file_id: Optional[int] = None):
         self.db = db
@@ -19,10 +31,11 @@ class ExcelQueryEngine:
         self.df = None
         self.mapping = None
         self.target_file = None
+        self.is_sample = False
         self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         
-    def load_excel_data(self) -> bool:
-        """Load Excel data into DataFrame using existing patterns"""
+    def resolve_target_file(self) -> bool:
+        """Pick the requested (or latest) file and its column mapping"""
         client_id = self.client.id
         
         # Determine target file
@@ -54,24 +67,31 @@ class ExcelQueryEngine:
         else:
             self.mapping = {}
         
-        # Load rows
-        rows = self.db.query(FileRow).filter(FileRow.file_id == self.target_file.id).all()
-        if not rows:
+        return True
+    
+    def load_excel_data(self) -> bool:
+        """Load Excel data into DataFrame using existing patterns"""
+        if not self.resolve_target_file():
             return False
         
-        # Convert to DataFrame
-        records = [r.data for r in rows]
-        self.df = pd.DataFrame(records)
+        # Rows are cached per file, so repeat questions skip the FileRow scan
+        self.df = load_file_frame(self.db, self.target_file)
         
         if self.df.empty:
             return False
         
-        # Clean DataFrame
-        self.df.columns = [str(c).strip() for c in self.df.columns]
-        self.df = self.df.where(pd.notnull(self.df), None)
-        
         return True
     
+    def load_sample_data(self) -> bool:
+        """Load only a sample of rows, enough to describe the file to the LLM"""
+        if not self.resolve_target_file():
+            return False
+        
+        self.df = load_sample_frame(self.db, self.target_file)
+        self.is_sample = True
+        
+        return not self.df.empty
+    
     def get_dataframe_info(self) -> Dict[str, Any]:
         """Get information about the DataFrame for LLM context"""
         if self.df is None or self.df.empty:
@@ -81,7 +101,8 @@ class ExcelQueryEngine:
         column_info = {}
         for col in self.df.columns:
             sample_values = self.df[col].dropna().head(5).tolist()
-            dtype = str(self.df[col].dtype)
+            # Cached frames keep raw JSON values (object dtype); report the inferred type
+            dtype = str(self.df[col].infer_objects().dtype)
             column_info[col] = {
                 "dtype": dtype,
                 "sample_values": [str(v) for v in sample_values[:5]],
@@ -99,7 +120,7 @@ class ExcelQueryEngine:
         
         return {
             "columns": column_info,
-            "row_count": len(self.df),
+            "row_count": self.target_file.total_rows if self.is_sample else len(self.df),
             "column_count": len(self.df.columns),
             "canonical_mappings": canonical_mappings,
             "file_name": self.target_file.filename if self.target_file else None
@@ -189,8 +210,97 @@ Return ONLY the Python code, no markdown, no explanations."""
                 "code": None
             }
     
-    def execute_query(self, code: str) -> Dict[str, Any]:
-        """Safely execute pandas code on the DataFrame"""
+    def interpret_plan(self, question: str) -> Dict[str, Any]:
+        """Use LLM to translate the question into a declarative query plan"""
+        df_info = self.get_dataframe_info()
+        
+        if not df_info:
+            return {
+                "error": "No data available. Please upload an Excel file first.",
+                "plan": None
+            }
+        
+        system_prompt = """You are a data analysis assistant. Given a table description and a user question,
+produce a JSON query plan that answers the question. Do NOT write code.
+
+The plan has these keys (all optional):
+- "filters": list of {"column", "op", "value"}; op is one of
+  eq, ne, gt, gte, lt, lte, in, not_in, contains, between, is_null, not_null
+  ("in"/"not_in" take a list, "between" takes [low, high])
+- "group_by": list of column names
+- "aggregations": list of {"column", "func", "alias"}; func is one of
+  sum, mean, count, min, max, nunique; use column "*" with count to count rows
+- "select": list of columns to return when not aggregating
+- "sort": list of {"column", "direction"}; direction is asc or desc;
+  sort by a group_by column or an aggregation alias when aggregating
+- "limit": number of rows to return (default 20, max 100)
+
+Rules:
+1. Use the exact column names from the table
+2. Use numbers (not strings) for numeric comparisons
+3. Return ONLY the JSON object"""
+
+        column_summary = []
+        for col_name, col_info in df_info['columns'].items():
+            summary = f"- {col_name} ({col_info['dtype']})"
+            if col_info['sample_values']:
+                samples = ', '.join(col_info['sample_values'][:3])
+                summary += f", samples: {samples}"
+            column_summary.append(summary)
+        
+        user_prompt = f"""Table with {df_info['row_count']} rows and these columns:
+{chr(10).join(column_summary)}
+
+Canonical Mappings (if available):
+{json.dumps(df_info['canonical_mappings'], indent=2) if df_info['canonical_mappings'] else 'None'}
+
+User Question: "{question}"
+
+Return the JSON query plan."""
+
+        try:
+            response = self.openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0,
+                max_tokens=500
+            )
+            
+            raw_plan = json.loads(response.choices[0].message.content)
+            # self.df may be a sample; columns that are empty in it are still valid
+            plan = validate_plan(raw_plan, load_file_columns(self.db, self.target_file))
+            
+            return {
+                "plan": plan,
+                "error": None
+            }
+        except PlanValidationError as e:
+            return {
+                "error": f"Invalid query plan: {str(e)}",
+                "plan": None
+            }
+        except Exception as e:
+            return {
+                "error": f"Failed to interpret query: {str(e)}",
+                "plan": None
+            }
+    
+    def execute_plan(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a validated plan over the cached file data"""
+        try:
+            return run_plan(self.db, self.target_file, plan)
+        except Exception as e:
+            return {
+                "error": f"Error executing query: {str(e)}",
+                "result": None
+            }
+    
+    def evaluate_code(self, code: str) -> Dict[str, Any]:
+        """Safely execute pandas code on the DataFrame and return the raw result"""
         if self.df is None or self.df.empty:
             return {
                 "error": "No data available",
@@ -226,7 +336,7 @@ Return ONLY the Python code, no markdown, no explanations."""
             # Create a safe execution environment
             safe_globals = {
                 'pd': pd,
-                'df': self.df.copy(),  # Use copy to avoid modifying original
+                'df': self.df.infer_objects(),  # Typed copy; the cached frame keeps raw JSON values
                 'len': len,
                 'sum': sum,
                 'max': max,
@@ -267,13 +377,33 @@ Return ONLY the Python code, no markdown, no explanations."""
                     except:
                         pass
             
-            # Convert result to a format we can return
             if result is None:
                 return {
                     "error": "Query did not return a result",
                     "result": None
                 }
             
+            return {
+                "error": None,
+                "result": result
+            }
+        except Exception as e:
+            return {
+                "error": f"Error executing query: {str(e)}",
+                "result": None
+            }
+    
+    def execute_query(self, code: str) -> Dict[str, Any]:
+        """Safely execute pandas code on the DataFrame"""
+        evaluated = self.evaluate_code(code)
+        if evaluated.get("error"):
+            return evaluated
+        
+        return self.format_result(evaluated["result"])
+    
+    def format_result(self, result: Any) -> Dict[str, Any]:
+        """Convert a raw pandas/python result into a JSON-serializable response"""
+        try:
             # Convert pandas objects to JSON-serializable format
             if isinstance(result, pd.DataFrame):
                 # Limit rows for large results
@@ -346,8 +476,15 @@ Return ONLY the Python code, no markdown, no explanations."""
         else:
             return "Here are the results:"
     
-    def query(self, question: str) -> Dict[str, Any]:
-        """Main method to process a natural language query"""
+    def query(self, question: str, mode: str = "code") -> Dict[str, Any]:
+        """
+        Main method to process a natural language query.
+        mode="code" asks the LLM for pandas code; mode="plan" asks for a
+        declarative query plan that is validated and executed without exec.
+        """
+        if mode == "plan":
+            return self.query_plan(question)
+        
         # Load data if not already loaded
         if self.df is None:
             if not self.load_excel_data():
@@ -383,3 +520,113 @@ Return ONLY the Python code, no markdown, no explanations."""
             "code": code,
             "type": execution_result.get("type")
         }
+    
+    def query_plan(self, question: str) -> Dict[str, Any]:
+        """Process a natural language query through a validated query plan"""
+        # Only a sample is needed to prompt; execution uses the cache or SQL
+        if self.df is None:
+            if not self.load_sample_data():
+                return {
+                    "error": "No Excel file found. Please upload an Excel file first.",
+                    "result": None,
+                    "explanation": None,
+                    "code": None
+                }
+        
+        interpretation = self.interpret_plan(question)
+        if interpretation.get("error"):
+            return {
+                "error": interpretation["error"],
+                "result": None,
+                "explanation": None,
+                "code": None
+            }
+        
+        plan = interpretation["plan"]
+        execution_result = self.execute_plan(plan)
+        explanation = self.generate_explanation(question, execution_result)
+        
+        return {
+            "error": execution_result.get("error"),
+            "result": execution_result.get("result"),
+            "explanation": explanation,
+            "code": json.dumps(plan, ensure_ascii=False),
+            "type": execution_result.get("type")
+        }
+    
+    def stream_query(self, question: str, mode: str = "code", batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of query(): yields a "meta" event with the generated
+        code/plan as soon as it is known, then "rows" events in batches, then "end".
+        Tabular results are not truncated to 100 rows (capped at STREAM_MAX_ROWS).
+        """
+        loaded = self.load_sample_data() if mode == "plan" else self.load_excel_data()
+        if not loaded:
+            yield {"type": "error", "error": "No Excel file found. Please upload an Excel file first."}
+            return
+        
+        if mode == "plan":
+            interpretation = self.interpret_plan(question)
+            code = json.dumps(interpretation["plan"], ensure_ascii=False) if interpretation.get("plan") else None
+        else:
+            interpretation = self.interpret_query(question)
+            code = interpretation.get("code")
+        
+        if interpretation.get("error"):
+            yield {"type": "error", "error": interpretation["error"], "code": code}
+            return
+        
+        yield {
+            "type": "meta",
+            "question": question,
+            "mode": mode,
+            "code": code,
+            "file_name": self.target_file.filename if self.target_file else None
+        }
+        
+        if mode == "plan":
+            execution_result = self.execute_plan(interpretation["plan"])
+            if execution_result.get("error"):
+                yield {"type": "error", "error": execution_result["error"]}
+                return
+            for batch in batched(execution_result["result"] or [], batch_size):
+                yield {"type": "rows", "rows": batch}
+            yield {
+                "type": "end",
+                "result_type": execution_result.get("type"),
+                "row_count": execution_result.get("row_count"),
+                "columns": execution_result.get("columns"),
+                "explanation": self.generate_explanation(question, execution_result)
+            }
+            return
+        
+        evaluated = self.evaluate_code(code)
+        if evaluated.get("error"):
+            yield {"type": "error", "error": evaluated["error"]}
+            return
+        
+        result = evaluated["result"]
+        if not isinstance(result, pd.DataFrame):
+            # Non-tabular answers are small; send them as one "result" event
+            execution_result = self.format_result(result)
+            yield {"type": "result", "result": execution_result.get("result"), "result_type": execution_result.get("type")}
+            yield {
+                "type": "end",
+                "result_type": execution_result.get("type"),
+                "explanation": self.generate_explanation(question, execution_result)
+            }
+            return
+        
+        result = result.head(STREAM_MAX_ROWS)
+        for start in range(0, len(result), batch_size):
+            # orjson encodes NumPy values directly, no per-cell conversion needed
+            yield {"type": "rows", "rows": result.iloc[start:start + batch_size].to_dict(orient='records')}
+        
+        summary = {"type": "dataframe", "row_count": len(result), "columns": list(result.columns)}
+        yield {
+            "type": "end",
+            "result_type": "dataframe",
+            "row_count": len(result),
+            "columns": summary["columns"],
+            "explanation": self.generate_explanation(question, summary)
+        }
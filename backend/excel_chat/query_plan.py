@@ -0,0 +1,474 @@
+"""
+Excel Chat Query Plans
+Validates and executes declarative query plans (filters, group keys,
+aggregations, sort, limit) instead of free-form pandas code
+"""
+import json
+import hashlib
+import operator
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import UploadedFile, FileRow
+
+FILTER_OPS = {"eq", "ne", "gt", "gte", "lt", "lte", "in", "not_in", "contains", "between", "is_null", "not_null"}
+AGG_FUNCS = {"sum", "mean", "count", "min", "max", "nunique"}
+NUMERIC_AGGS = {"sum", "mean", "min", "max"}
+MAX_LIMIT = 100
+DEFAULT_LIMIT = 20
+
+FRAME_CACHE_SIZE = 8
+COLUMNS_CACHE_SIZE = 256
+RESULT_CACHE_SIZE = 256
+
+# file cache key -> DataFrame (uploaded files never change after upload)
+_frame_cache: "OrderedDict[Tuple[int, str], pd.DataFrame]" = OrderedDict()
+# file cache key -> every column name stored in the file's rows
+_columns_cache: "OrderedDict[Tuple[int, str], List[str]]" = OrderedDict()
+# (file cache key, plan hash) -> result
+_result_cache: "OrderedDict[Tuple[Tuple[int, str], str], Dict[str, Any]]" = OrderedDict()
+
+
+class PlanValidationError(ValueError):
+    """Raised when an LLM-produced plan references unknown columns or operations"""
+
+
+# --------------------------
+# Caches
+# --------------------------
+
+def file_cache_key(target_file: UploadedFile) -> Tuple[int, str]:
+    uploaded_at = target_file.uploaded_at.isoformat() if target_file.uploaded_at else ""
+    return (target_file.id, uploaded_at)
+
+
+def _lru_get(cache: OrderedDict, key):
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    return None
+
+
+def _lru_put(cache: OrderedDict, key, value, max_size: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def get_cached_frame(target_file: UploadedFile) -> Optional[pd.DataFrame]:
+    """Return the cached DataFrame for a file, if it has been loaded before"""
+    return _lru_get(_frame_cache, file_cache_key(target_file))
+
+
+def load_file_frame(db: Session, target_file: UploadedFile) -> pd.DataFrame:
+    """
+    Load all rows of a file as a cleaned DataFrame, reusing the in-process cache.
+    Values keep their JSON types (object dtype) so plans see the same values as SQL pushdown.
+    """
+    cached = get_cached_frame(target_file)
+    if cached is not None:
+        return cached
+
+    rows = db.query(FileRow.data).filter(FileRow.file_id == target_file.id).all()
+    df = pd.DataFrame([r.data for r in rows], dtype=object)
+    if not df.empty:
+        df.columns = [str(c).strip() for c in df.columns]
+        df = df.where(pd.notnull(df), None)
+
+    _lru_put(_frame_cache, file_cache_key(target_file), df, FRAME_CACHE_SIZE)
+    return df
+
+
+def load_sample_frame(db: Session, target_file: UploadedFile, limit: int = 200) -> pd.DataFrame:
+    """Load a small slice of a file, enough to describe its columns to the LLM"""
+    cached = get_cached_frame(target_file)
+    if cached is not None:
+        return cached.head(limit)
+
+    rows = (
+        db.query(FileRow.data)
+        .filter(FileRow.file_id == target_file.id)
+        .order_by(FileRow.id)
+        .limit(limit)
+        .all()
+    )
+    df = pd.DataFrame([r.data for r in rows], dtype=object)
+    if not df.empty:
+        df.columns = [str(c).strip() for c in df.columns]
+        df = df.where(pd.notnull(df), None)
+    return df
+
+
+def load_file_columns(db: Session, target_file: UploadedFile) -> List[str]:
+    """
+    All column names of a file, from the keys of its stored rows rather than a sample,
+    so plans may reference columns that are empty in the first rows
+    """
+    cached = get_cached_frame(target_file)
+    if cached is not None:
+        return list(cached.columns)
+
+    key = file_cache_key(target_file)
+    columns = _lru_get(_columns_cache, key)
+    if columns is None:
+        rows = db.execute(
+            text("SELECT DISTINCT jsonb_object_keys(data) AS name FROM file_rows WHERE file_id = :file_id"),
+            {"file_id": target_file.id},
+        ).fetchall()
+        columns = sorted({str(r.name).strip() for r in rows})
+        _lru_put(_columns_cache, key, columns, COLUMNS_CACHE_SIZE)
+    return columns
+
+
+def plan_hash(plan: Dict[str, Any]) -> str:
+    canonical = json.dumps(plan, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# --------------------------
+# Validation
+# --------------------------
+
+def validate_plan(plan: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    """
+    Validate a raw plan against the file's columns and return a normalized copy.
+
+    Raises:
+        PlanValidationError: if the plan is malformed or references unknown columns.
+    """
+    if not isinstance(plan, dict):
+        raise PlanValidationError("Plan must be a JSON object")
+
+    known = set(columns)
+
+    def check_column(col, where):
+        if col not in known:
+            raise PlanValidationError(f"Unknown column '{col}' in {where}")
+        return col
+
+    filters = []
+    for f in plan.get("filters") or []:
+        if not isinstance(f, dict):
+            raise PlanValidationError("Each filter must be an object")
+        op = f.get("op")
+        if op not in FILTER_OPS:
+            raise PlanValidationError(f"Unsupported filter op '{op}'")
+        value = f.get("value")
+        if op in ("in", "not_in") and not isinstance(value, list):
+            raise PlanValidationError(f"Filter op '{op}' needs a list value")
+        if op == "between" and (not isinstance(value, list) or len(value) != 2):
+            raise PlanValidationError("Filter op 'between' needs a [low, high] value")
+        filters.append({"column": check_column(f.get("column"), "filters"), "op": op, "value": value})
+
+    group_by = [check_column(c, "group_by") for c in plan.get("group_by") or []]
+
+    aggregations = []
+    for i, agg in enumerate(plan.get("aggregations") or []):
+        if not isinstance(agg, dict):
+            raise PlanValidationError("Each aggregation must be an object")
+        func_name = agg.get("func")
+        if func_name not in AGG_FUNCS:
+            raise PlanValidationError(f"Unsupported aggregation '{func_name}'")
+        column = agg.get("column") or "*"
+        if column == "*":
+            if func_name != "count":
+                raise PlanValidationError("Only count can aggregate over '*'")
+        else:
+            check_column(column, "aggregations")
+        alias = str(agg.get("alias") or (f"{func_name}_{column}" if column != "*" else "count"))
+        aggregations.append({"column": column, "func": func_name, "alias": alias})
+
+    aliases = [a["alias"] for a in aggregations]
+    if len(set(aliases)) != len(aliases):
+        raise PlanValidationError("Aggregation aliases must be unique")
+
+    select = [check_column(c, "select") for c in plan.get("select") or []]
+    if aggregations and select:
+        raise PlanValidationError("Use either select or aggregations, not both")
+    if group_by and not aggregations:
+        aggregations = [{"column": "*", "func": "count", "alias": "count"}]
+        aliases = ["count"]
+
+    output_columns = set(group_by) | set(aliases) if aggregations else known
+    sort = []
+    for s in plan.get("sort") or []:
+        if not isinstance(s, dict) or s.get("column") not in output_columns:
+            raise PlanValidationError(f"Cannot sort by '{s.get('column') if isinstance(s, dict) else s}'")
+        direction = str(s.get("direction") or "asc").lower()
+        if direction not in ("asc", "desc"):
+            raise PlanValidationError(f"Unsupported sort direction '{direction}'")
+        sort.append({"column": s["column"], "direction": direction})
+
+    try:
+        limit = int(plan.get("limit") or DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        raise PlanValidationError("Limit must be an integer")
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    return {
+        "filters": filters,
+        "group_by": group_by,
+        "aggregations": aggregations,
+        "select": select,
+        "sort": sort,
+        "limit": limit,
+    }
+
+
+# --------------------------
+# Pandas execution
+# --------------------------
+
+def _to_numeric(series: pd.Series) -> pd.Series:
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    cleaned = series.astype(str).str.replace(",", "", regex=False).str.strip()
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+_ORDER_OPS = {"gt": operator.gt, "gte": operator.ge, "lt": operator.lt, "lte": operator.le}
+
+
+def _json_text(value) -> Optional[str]:
+    """A JSON value as Postgres' ->> renders it (None for null)"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _filter_mask(df: pd.DataFrame, f: Dict[str, Any]) -> pd.Series:
+    """
+    Row mask with SQL semantics: a comparison against a null (or, for numeric
+    comparisons, a non-numeric) cell is unknown, so the row is dropped for every op,
+    including ne and not_in. Text comparisons use the ->> text of the JSON value.
+    """
+    col, op, value = f["column"], f["op"], f["value"]
+
+    if op == "is_null":
+        return df[col].isna()
+    if op == "not_null":
+        return df[col].notna()
+
+    numeric = op == "between" and all(_is_number(v) for v in value) or _is_number(value)
+    if numeric:
+        series = _to_numeric(df[col])
+    else:
+        series = df[col].map(_json_text)
+    known = series.notna()
+
+    if op == "contains":
+        return known & series.str.contains(str(value), case=False, regex=False, na=False)
+    if op in ("in", "not_in"):
+        mask = series.isin({_json_text(v) for v in value})
+        return known & (~mask if op == "not_in" else mask)
+
+    if not numeric:
+        value = [_json_text(v) for v in value] if op == "between" else _json_text(value)
+    if op == "eq":
+        return known & (series == value)
+    if op == "ne":
+        return known & (series != value)
+
+    # Only known values are compared, so mixed None/str never meets an ordering operator
+    compared = series[known]
+    if op == "between":
+        low, high = value
+        result = (compared >= low) & (compared <= high)
+    else:
+        result = _ORDER_OPS[op](compared, value)
+    return result.reindex(series.index, fill_value=False).astype(bool)
+
+
+def execute_plan_pandas(df: pd.DataFrame, plan: Dict[str, Any]) -> pd.DataFrame:
+    """Execute a validated plan against an in-memory DataFrame"""
+    mask = pd.Series(True, index=df.index)
+    for f in plan["filters"]:
+        mask &= _filter_mask(df, f)
+    frame = df[mask]
+
+    if plan["aggregations"]:
+        # Group keys and distinct counts use the ->> text, like the SQL pushdown
+        work = frame.copy()
+        for col in plan["group_by"]:
+            work[col] = frame[col].map(_json_text)
+        named = {}
+        # SQL SUM over no numeric values is NULL while pandas gives 0; count the values to match
+        sum_counts = {}
+        for i, agg in enumerate(plan["aggregations"]):
+            if agg["column"] == "*":
+                named[agg["alias"]] = (work.columns[0], "size")
+                continue
+            source = frame[agg["column"]]
+            if agg["func"] in NUMERIC_AGGS:
+                source = _to_numeric(source)
+            elif agg["func"] == "nunique":
+                source = source.map(_json_text)
+            work[f"__agg_{i}"] = source
+            named[agg["alias"]] = (f"__agg_{i}", agg["func"])
+            if agg["func"] == "sum":
+                sum_counts[agg["alias"]] = f"__values_{i}"
+                named[f"__values_{i}"] = (f"__agg_{i}", "count")
+
+        if plan["group_by"]:
+            result = work.groupby(plan["group_by"], dropna=False).agg(**named).reset_index()
+        else:
+            result = pd.DataFrame([{
+                alias: (len(work) if fn == "size" else work[col].agg(fn))
+                for alias, (col, fn) in named.items()
+            }])
+        for alias, count_column in sum_counts.items():
+            result[alias] = result[alias].where(result[count_column] > 0)
+        result = result.drop(columns=list(sum_counts.values()))
+    else:
+        result = frame[plan["select"]] if plan["select"] else frame
+
+    if plan["sort"]:
+        result = result.sort_values(
+            by=[s["column"] for s in plan["sort"]],
+            ascending=[s["direction"] == "asc" for s in plan["sort"]],
+        )
+
+    return result.head(plan["limit"])
+
+
+# --------------------------
+# SQL pushdown
+# --------------------------
+
+_SQL_OPS = {"eq": "=", "ne": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+_SQL_AGGS = {"sum": "SUM", "mean": "AVG", "min": "MIN", "max": "MAX"}
+
+
+def _sql_numeric(param: str) -> str:
+    # Mirrors _to_numeric: strip thousands separators, ignore non-numeric text
+    return (
+        f"CASE WHEN replace(data->>:{param}, ',', '') ~ '^\\s*-?[0-9]+(\\.[0-9]+)?\\s*$' "
+        f"THEN replace(data->>:{param}, ',', '')::numeric END"
+    )
+
+
+def can_push_down(plan: Dict[str, Any]) -> bool:
+    """Only aggregation plans are worth pushing down; row selections need the frame anyway"""
+    return bool(plan["aggregations"])
+
+
+def execute_plan_sql(db: Session, file_id: int, plan: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Execute an aggregation plan directly over file_rows JSONB in Postgres.
+    Column names are always bound as parameters, never interpolated.
+    """
+    params: Dict[str, Any] = {"file_id": file_id}
+    where = ["file_id = :file_id"]
+
+    for i, f in enumerate(plan["filters"]):
+        col_param = f"fc{i}"
+        params[col_param] = f["column"]
+        op, value = f["op"], f["value"]
+        if op == "is_null":
+            where.append(f"data->>:{col_param} IS NULL")
+        elif op == "not_null":
+            where.append(f"data->>:{col_param} IS NOT NULL")
+        elif op == "contains":
+            # Match the literal substring, like pandas' str.contains(regex=False)
+            escaped = str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params[f"fv{i}"] = f"%{escaped}%"
+            where.append(f"data->>:{col_param} ILIKE :fv{i}")
+        elif op in ("in", "not_in"):
+            params[f"fv{i}"] = [_json_text(v) for v in value]
+            negate = "NOT " if op == "not_in" else ""
+            where.append(f"{negate}(data->>:{col_param} = ANY(:fv{i}))")
+        elif op == "between":
+            numeric = all(_is_number(v) for v in value)
+            expr = _sql_numeric(col_param) if numeric else f"data->>:{col_param}"
+            params[f"fv{i}_lo"], params[f"fv{i}_hi"] = (value if numeric else [_json_text(v) for v in value])
+            where.append(f"{expr} BETWEEN :fv{i}_lo AND :fv{i}_hi")
+        else:
+            numeric = _is_number(value)
+            expr = _sql_numeric(col_param) if numeric else f"data->>:{col_param}"
+            params[f"fv{i}"] = value if numeric else _json_text(value)
+            where.append(f"{expr} {_SQL_OPS[op]} :fv{i}")
+
+    select_parts, group_parts, output_names = [], [], []
+    for i, col in enumerate(plan["group_by"]):
+        params[f"g{i}"] = col
+        select_parts.append(f"data->>:g{i} AS g{i}")
+        group_parts.append(f"g{i}")
+        output_names.append(col)
+
+    for i, agg in enumerate(plan["aggregations"]):
+        if agg["column"] == "*":
+            expr = "COUNT(*)"
+        else:
+            params[f"a{i}"] = agg["column"]
+            if agg["func"] == "count":
+                expr = f"COUNT(data->>:a{i})"
+            elif agg["func"] == "nunique":
+                expr = f"COUNT(DISTINCT data->>:a{i})"
+            else:
+                expr = f"{_SQL_AGGS[agg['func']]}({_sql_numeric(f'a{i}')})"
+        select_parts.append(f"{expr} AS a{i}")
+        output_names.append(agg["alias"])
+
+    internal = {name: f"g{i}" for i, name in enumerate(plan["group_by"])}
+    internal.update({agg["alias"]: f"a{i}" for i, agg in enumerate(plan["aggregations"])})
+    order_parts = [f"{internal[s['column']]} {s['direction'].upper()}" for s in plan["sort"]]
+
+    sql = f"SELECT {', '.join(select_parts)} FROM file_rows WHERE {' AND '.join(where)}"
+    if group_parts:
+        sql += f" GROUP BY {', '.join(group_parts)}"
+    if order_parts:
+        sql += f" ORDER BY {', '.join(order_parts)}"
+    sql += " LIMIT :limit"
+    params["limit"] = plan["limit"]
+
+    rows = db.execute(text(sql), params).fetchall()
+    result = pd.DataFrame([tuple(r) for r in rows], columns=output_names)
+    for agg in plan["aggregations"]:
+        # numeric comes back as Decimal
+        result[agg["alias"]] = pd.to_numeric(result[agg["alias"]], errors="coerce")
+    return result
+
+
+# --------------------------
+# Entry point
+# --------------------------
+
+def run_plan(db: Session, target_file: UploadedFile, plan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Execute a validated plan, preferring the cached frame, then SQL pushdown,
+    and memoizing the result per (file, plan).
+    """
+    cache_key = (file_cache_key(target_file), plan_hash(plan))
+    cached = _lru_get(_result_cache, cache_key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    frame = get_cached_frame(target_file)
+    if frame is not None:
+        result_df, engine = execute_plan_pandas(frame, plan), "pandas"
+    elif can_push_down(plan):
+        result_df, engine = execute_plan_sql(db, target_file.id, plan), "sql"
+    else:
+        result_df, engine = execute_plan_pandas(load_file_frame(db, target_file), plan), "pandas"
+
+    result_df = result_df.astype(object).where(pd.notnull(result_df), None)
+    result = {
+        "result": result_df.to_dict(orient="records"),
+        "type": "dataframe",
+        "row_count": len(result_df),
+        "columns": [str(c) for c in result_df.columns],
+        "engine": engine,
+    }
+    _lru_put(_result_cache, cache_key, result, RESULT_CACHE_SIZE)
+    return {**result, "cached": False}
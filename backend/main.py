@@ -22,6 +22,7 @@ from routers import (
     admin,
     competitor_analysis,
     send_mail,
+    cohorts,
 )
 
 load_dotenv()
@@ -117,6 +118,7 @@ app.include_router(excel_chat.router, prefix="/excel-chat", tags=["excel-chat"])
 app.include_router(admin.router)
 app.include_router(competitor_analysis.router)
 app.include_router(send_mail.router)
+app.include_router(cohorts.router)
 # app.include_router(ai_chat.router)
 # app.include_router(whatsapp_messaging.router)
 # app.include_router(forecast_api.router)
@@ -1,4 +1,4 @@
-from sqlalchemy import ( Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, Index, Text, Boolean, UniqueConstraint, JSON, LargeBinary)
+from sqlalchemy import ( Column, Integer, BigInteger, String, Float, ForeignKey, Date, DateTime, Index, Text, Boolean, UniqueConstraint, JSON, LargeBinary)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
@@ -126,7 +126,7 @@ class Customer(Base):
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     email = Column(String, index=True, nullable=True)
-    phone = Column(String, unique=True, index=True)
+    phone = Column(String, index=True)  # unique per client through customer_identities
     # 🔗 Reference back to client
     client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
     client = relationship("Client", back_populates="customers")
@@ -134,6 +134,24 @@ class Customer(Base):
     address = relationship("Address", back_populates="customer", uselist=False, cascade="all, delete-orphan")
     whatsapp_messages = relationship("WhatsAppMessage", back_populates="customer", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Tenant lookups, and keyset streaming of customers client by client: ORDER BY client_id, id
+        Index("ix_customers_client_id_id", "client_id", "id"),
+    )
+
+class CustomerIdentity(Base):
+    """
+    Normalized phone (E.164) or email of a customer, unique within its client
+    (utils.identity_normalizer). Order sync matches billing details against it; merged
+    customers keep the identities of the duplicates they absorbed.
+    """
+    __tablename__ = "customer_identities"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String, primary_key=True)       # "phone" | "email"
+    value = Column(String, primary_key=True)
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), nullable=False, index=True)
+
 class Address(Base):
     __tablename__ = "addresses"
 
@@ -146,7 +164,34 @@ class Address(Base):
     state = Column(String)
     postcode = Column(String)
     country = Column(String)
+    # Resolved once at write time by utils.location_normalizer.resolve_location
+    governorate = Column(String, nullable=True, index=True)
+    area = Column(String, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    city_id = Column(Integer, ForeignKey("kuwait_cities.id", ondelete="SET NULL"), nullable=True)
+    # When resolve_location ran for this address (even without a match); NULL = not yet attempted
+    location_resolved_at = Column(DateTime, nullable=True)
     customer = relationship("Customer", back_populates="address")
+    kuwait_city = relationship("KuwaitCity")
+
+    __table_args__ = (
+        # Tenant map: customers of a client -> their address city
+        Index("ix_addresses_customer_id_city_id", "customer_id", "city_id"),
+        # Addresses the location backfill still has to visit
+        Index("ix_addresses_id_location_unresolved", "id", postgresql_where=location_resolved_at.is_(None)),
+    )
+
+class KuwaitCity(Base):
+    """Canonical Kuwaiti cities, seeded from utils.location_normalizer"""
+    __tablename__ = "kuwait_cities"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)       # canonical English name, e.g. "Salmiya"
+    governorate = Column(String, nullable=True, index=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    aliases = Column(JSONB, nullable=False, default=list)    # lowercased raw spellings, e.g. ["السالمية", "salmiya"]
 
 class Order(Base):
     __tablename__ = "orders"
@@ -160,17 +205,127 @@ class Order(Base):
     created_at = Column(DateTime, index=True, nullable=False)
     payment_method = Column(String, nullable=True)
     attribution_referrer = Column(String, nullable=True)
+    attribution_channel = Column(String, nullable=True, index=True)  # utils.referrer_channels.classify_referrer(attribution_referrer)
     session_pages = Column(Integer, nullable=True)
     session_count = Column(Integer, nullable=True)
     device_type = Column(String, nullable=True)
     customer = relationship("Customer", back_populates="orders", passive_deletes=True)
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination of order lists: ORDER BY created_at DESC, id DESC
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_customer_id_created_at", "customer_id", "created_at"),
+    )
+
+class CustomerFeature(Base):
+    """
+    Per-customer RFM features over completed/processing orders, kept current by order sync
+    (customers.db_helper). Customers without such orders have no row; recency is
+    derived from last_order_at at read time.
+    """
+    __tablename__ = "customer_features"
+
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False, index=True)
+    frequency = Column(Integer, nullable=False, default=0)     # number of orders
+    monetary = Column(Float, nullable=False, default=0)        # sum of total_amount
+    first_order_at = Column(DateTime, nullable=False)
+    last_order_at = Column(DateTime, nullable=False)
+    avg_gap_days = Column(Float, nullable=True)                # mean days between consecutive orders (NULL with one order)
+    gap_variance = Column(Float, nullable=True)                # population variance of those gaps, in days²
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class CustomerCohortStat(Base):
+    """
+    Monthly acquisition cohort activity of a client, rebuilt from orders after each sync
+    (cohorts.db_helper). A customer's cohort is the month of its first counted order
+    (customer_features.first_order_at); months without activity have no row.
+    """
+    __tablename__ = "customer_cohort_stats"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    cohort_month = Column(Date, primary_key=True)             # first day of the acquisition month
+    month_offset = Column(Integer, primary_key=True)          # months since cohort_month
+    activity_month = Column(Date, nullable=False)             # cohort_month + month_offset
+    cohort_size = Column(Integer, nullable=False)
+    active_customers = Column(Integer, nullable=False)        # cohort customers with a counted order that month
+    orders_count = Column(Integer, nullable=False)
+    revenue = Column(Float, nullable=False)
+    cumulative_revenue = Column(Float, nullable=False)        # cohort revenue up to and including this month
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Incremental refresh drops a client's rows from a month onwards
+        Index("ix_customer_cohort_stats_client_id_activity_month", "client_id", "activity_month"),
+    )
+
+class CustomerForecast(Base):
+    """
+    Next-purchase forecast of a customer, rewritten per client by the batch forecasting task
+    (customers.operation_helper.forecast_customer_purchases).
+    """
+    __tablename__ = "customer_forecasts"
+
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    next_purchase_on = Column(Date, nullable=False)          # last order + expected gap
+    expected_gap_days = Column(Float, nullable=False)
+    purchase_probability = Column(Float, nullable=False)     # of ordering within the forecast horizon, from computed_at
+    horizon_days = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Campaigns: a client's customers expected to buy on a given day
+        Index("ix_customer_forecasts_client_id_next_purchase_on", "client_id", "next_purchase_on"),
+    )
+
+class ReorderReminder(Base):
+    """Last reorder reminder sent to a customer: cooldown state of tasks.reorder_messaging"""
+    __tablename__ = "reorder_reminders"
+
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False, index=True)
+    last_reminded_on = Column(Date, nullable=False)
+    reminders_sent = Column(Integer, nullable=False, default=1)
+
+class CustomerSegmentModel(Base):
+    """
+    Fitted customer segmentation (StandardScaler + KMeans over order_count, recency_days) of a client.
+    Centroids are in scaled space; segment_names[i] is the name of cluster i.
+    """
+    __tablename__ = "customer_segment_models"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    scaler_mean = Column(JSONB, nullable=False)
+    scaler_scale = Column(JSONB, nullable=False)
+    centroids = Column(JSONB, nullable=False)
+    segment_names = Column(JSONB, nullable=False)
+    mean_distance = Column(Float, nullable=False)   # mean distance to the nearest centroid at fit time (drift baseline)
+    n_samples = Column(Integer, nullable=False)
+    fitted_at = Column(DateTime, default=datetime.utcnow)
+
+class DailyChannelStat(Base):
+    """Per-client daily order counts and revenue by attribution channel (rebuilt from orders)"""
+    __tablename__ = "daily_channel_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    channel = Column(String, nullable=False)
+    orders_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("client_id", "day", "channel", name="uq_daily_channel_stat"),
+    )
+
 class Product(Base):
     __tablename__ = "products"
 
     id = Column(Integer, primary_key=True, index=True)
-    external_id = Column(BigInteger, unique=True, index=True, nullable=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=True)
+    external_id = Column(BigInteger, index=True, nullable=True)  # WooCommerce ID, unique per client
     name = Column(String, nullable=False)
     short_description = Column(Text, nullable=True)
     regular_price = Column(Float, nullable=True)
@@ -182,22 +337,81 @@ class Product(Base):
     date_created = Column(DateTime, nullable=True)
     date_modified = Column(DateTime, nullable=True)
 
-    # ✅ Relationship back to OrderItem
-    order_items = relationship("OrderItem", back_populates="product")
+    __table_args__ = (
+        UniqueConstraint("client_id", "external_id", name="uq_products_client_id_external_id"),
+        # Type-ahead search: name ILIKE '%term%'
+        Index("ix_products_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"))
-    product_id = Column(Integer, ForeignKey("products.external_id", ondelete="SET NULL"))  # ✅ This is essential
+    product_id = Column(Integer, nullable=True)  # WooCommerce product ID = products.external_id of the order's client
     product_name = Column(String, nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
     order = relationship("Order", back_populates="items", passive_deletes=True)
 
-    # ✅ Relationship to Product
-    product = relationship("Product", back_populates="order_items")
+    __table_args__ = (
+        # Orders -> items scans read product, quantity and price from the index alone
+        Index("ix_order_items_order_id_covering", "order_id", postgresql_include=["product_id", "quantity", "price"]),
+        Index("ix_order_items_product_id", "product_id"),
+    )
+
+class DailyProductSale(Base):
+    """
+    Per-client daily sales per product from completed orders (rebuilt from order_items).
+    product_id is the item's products.external_id; items without one (custom line
+    items, or items synced before their product existed) are kept per product_name.
+    """
+    __tablename__ = "daily_product_sales"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    product_id = Column(BigInteger, nullable=True)
+    product_name = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    orders_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_product_sales_client_id_day", "client_id", "day"),
+        Index("ix_daily_product_sales_client_id_product_id_day", "client_id", "product_id", "day"),
+    )
+
+class ProductCooccurrenceMatrix(Base):
+    """
+    Per-client item-item co-occurrence counts over orders (scipy CSR matrix saved with
+    save_npz). Entry [i, j] is the number of orders containing products i and j, the
+    diagonal the orders containing i; product_ids[i] is the products.external_id of index i.
+    Orders up to last_order_id are folded in (products.operation_helper).
+    """
+    __tablename__ = "product_cooccurrence_matrices"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    matrix = Column(LargeBinary, nullable=False)
+    product_ids = Column(JSONB, nullable=False)
+    orders_count = Column(Integer, nullable=False, default=0)   # orders with at least one product
+    last_order_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ProductAffinity(Base):
+    """
+    Top-K "bought together" neighbours of a product of a client, from its co-occurrence matrix.
+    product_id and neighbor_id are products.external_id (= order_items.product_id).
+    """
+    __tablename__ = "product_affinities"
+
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(BigInteger, primary_key=True)
+    rank = Column(Integer, primary_key=True)                 # 1 = strongest neighbour
+    neighbor_id = Column(BigInteger, nullable=False)
+    co_orders = Column(Integer, nullable=False)              # orders containing both products
+    confidence = Column(Float, nullable=False)               # co_orders / orders containing product_id
+    lift = Column(Float, nullable=False)                     # confidence / share of orders containing neighbor_id
 
 class SyncState(Base):
     __tablename__ = "sync_state"
@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session
 from models import *
-from typing import List, Dict
-from sqlalchemy import func, extract, cast, Date, desc, text, distinct
+from typing import List, Dict, Optional
+from sqlalchemy import func, extract, cast, Date, desc, text, distinct, tuple_, or_
+import base64
 from datetime import date, timedelta, datetime
 from collections import Counter
+from utils.referrer_channels import classify_referrer
 
 def get_latest_orders_data(db: Session, client_id: int) -> List[dict]:
     orders = (
@@ -119,60 +121,193 @@ def get_top_customers_data(db: Session, client_id: int) -> List[dict]:
         for row in results
     ]
 
-def get_sales_comparison_data(db: Session, client_id: int) -> dict:
+COMPARISON_PERIODS = ("week", "month", "quarter", "year")
+
+def get_period_bounds(period: str, today: date) -> tuple:
+    """
+    Start of the current and previous period containing `today`.
+    Weeks start on Monday; quarters on Jan/Apr/Jul/Oct 1st.
+    """
+    if period == "week":
+        current_start = today - timedelta(days=today.weekday())
+        return current_start, current_start - timedelta(days=7)
+    if period == "month":
+        current_start = today.replace(day=1)
+        return current_start, (current_start - timedelta(days=1)).replace(day=1)
+    if period == "quarter":
+        current_start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        prev_end = current_start - timedelta(days=1)
+        return current_start, date(prev_end.year, 3 * ((prev_end.month - 1) // 3) + 1, 1)
+    if period == "year":
+        return date(today.year, 1, 1), date(today.year - 1, 1, 1)
+    raise ValueError(f"Invalid period. Use one of: {', '.join(COMPARISON_PERIODS)}.")
+
+def get_sales_comparison_data(db: Session, client_id: int, period: str = "month") -> dict:
+    """
+    Daily sales of the current period (up to today) vs the whole previous period.
+    The previous period ends where the current one starts, so both come from one
+    half-open created_at range (index range scan) in a single query.
+    Days without sales are zero-filled with generate_series.
+    "day" is the 1-based day within the period (day of month for period="month").
+    """
     today = date.today()
-    current_month = today.month
-    current_year = today.year
-
-    # Previous month calculation
-    first_day_current = date(current_year, current_month, 1)
-    last_day_prev = first_day_current - timedelta(days=1)
-    prev_month = last_day_prev.month
-    prev_year = last_day_prev.year
-
-    # Current month sales per day for this client
-    current_month_query = text("""
-        SELECT EXTRACT(DAY FROM o.created_at) AS day, SUM(o.total_amount) AS total
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.id
-        WHERE 
-            c.client_id = :client_id AND
-            EXTRACT(MONTH FROM o.created_at) = :month AND
-            EXTRACT(YEAR FROM o.created_at) = :year AND
-            o.created_at <= :today AND
-            o.status NOT IN ('failed', 'cancelled')
-        GROUP BY day
-        ORDER BY day
+    current_start, prev_start = get_period_bounds(period, today)
+
+    comparison_query = text("""
+        WITH daily_totals AS (
+            SELECT date_trunc('day', o.created_at)::date AS day, SUM(o.total_amount) AS total
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.id
+            WHERE
+                c.client_id = :client_id AND
+                o.created_at >= :prev_start AND
+                o.created_at < :end AND
+                o.status NOT IN ('failed', 'cancelled')
+            GROUP BY 1
+        )
+        SELECT days.day::date AS day, COALESCE(t.total, 0) AS total
+        FROM generate_series(CAST(:prev_start AS date), CAST(:today AS date), interval '1 day') AS days(day)
+        LEFT JOIN daily_totals t ON t.day = days.day::date
+        ORDER BY days.day
     """)
-    current_sales = db.execute(current_month_query, {
+    rows = db.execute(comparison_query, {
         "client_id": client_id,
-        "month": current_month,
-        "year": current_year,
+        "prev_start": prev_start,
+        "end": today + timedelta(days=1),
         "today": today
     }).fetchall()
 
-    # Previous month sales per day for this client
-    prev_month_query = text("""
-        SELECT EXTRACT(DAY FROM o.created_at) AS day, SUM(o.total_amount) AS total
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.id
-        WHERE 
-            c.client_id = :client_id AND
-            EXTRACT(MONTH FROM o.created_at) = :month AND
-            EXTRACT(YEAR FROM o.created_at) = :year AND
-            o.status NOT IN ('failed', 'cancelled')
-        GROUP BY day
-        ORDER BY day
+    current_sales = [
+        {"day": (row.day - current_start).days + 1, "total": float(row.total)}
+        for row in rows if row.day >= current_start
+    ]
+    prev_sales = [
+        {"day": (row.day - prev_start).days + 1, "total": float(row.total)}
+        for row in rows if row.day < current_start
+    ]
+
+    response = {
+        "period": period,
+        "currentStart": current_start.isoformat(),
+        "previousStart": prev_start.isoformat(),
+        "currentPeriod": current_sales,
+        "previousPeriod": prev_sales,
+    }
+    if period == "month":
+        # Keys the dashboard chart already reads
+        response["currentMonth"] = current_sales
+        response["previousMonth"] = prev_sales
+    return response
+
+def get_dashboard_summary_data(db: Session, client_id: int) -> dict:
+    """
+    All dashboard KPIs in one round trip.
+    The client's orders are scanned once (client_orders CTE) and every KPI is
+    derived from it with FILTER clauses, so the result matches the individual
+    /total-orders-count, /total-sales, /aov, /total-customers, /top-customers,
+    /latest-orders and /sales-comparison endpoints.
+    """
+    today = date.today()
+    current_month_start = today.replace(day=1)
+    prev_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
+
+    summary_query = text("""
+        WITH client_orders AS (
+            SELECT o.id, o.customer_id, o.total_amount, o.status, o.created_at
+            FROM orders o
+            JOIN customers c ON o.customer_id = c.id
+            WHERE c.client_id = :client_id
+        ),
+        totals AS (
+            SELECT
+                COUNT(*) AS total_orders,
+                COALESCE(SUM(total_amount) FILTER (WHERE status = 'completed'), 0) AS completed_sales,
+                COUNT(*) FILTER (WHERE status = 'completed') AS completed_orders
+            FROM client_orders
+        ),
+        top_customers AS (
+            SELECT c.first_name, c.last_name,
+                   COUNT(*) AS total_orders,
+                   COALESCE(SUM(co.total_amount), 0) AS total_spending
+            FROM client_orders co
+            JOIN customers c ON c.id = co.customer_id
+            WHERE co.status = 'completed'
+            GROUP BY c.id, c.first_name, c.last_name
+            ORDER BY total_spending DESC
+            LIMIT 5
+        ),
+        latest_orders AS (
+            SELECT co.id, co.created_at, co.total_amount, co.status, c.first_name, c.last_name
+            FROM client_orders co
+            JOIN customers c ON c.id = co.customer_id
+            ORDER BY co.created_at DESC
+            LIMIT 5
+        ),
+        daily_totals AS (
+            SELECT date_trunc('day', created_at)::date AS day, SUM(total_amount) AS total
+            FROM client_orders
+            WHERE created_at >= :prev_month_start
+              AND created_at < :tomorrow
+              AND status NOT IN ('failed', 'cancelled')
+            GROUP BY 1
+        ),
+        daily_sales AS (
+            SELECT
+                days.day::date AS date,
+                (days.day >= :current_month_start) AS is_current,
+                EXTRACT(DAY FROM days.day)::int AS day,
+                COALESCE(t.total, 0) AS total
+            FROM generate_series(CAST(:prev_month_start AS date), CAST(:today AS date), interval '1 day') AS days(day)
+            LEFT JOIN daily_totals t ON t.day = days.day::date
+        )
+        SELECT
+            (SELECT row_to_json(totals) FROM totals) AS totals,
+            (SELECT COUNT(*) FROM customers WHERE client_id = :client_id) AS total_customers,
+            (SELECT COALESCE(json_agg(t ORDER BY t.total_spending DESC), '[]') FROM top_customers t) AS top_customers,
+            (SELECT COALESCE(json_agg(l ORDER BY l.created_at DESC), '[]') FROM latest_orders l) AS latest_orders,
+            (SELECT COALESCE(json_agg(d ORDER BY d.date), '[]') FROM daily_sales d) AS daily_sales
     """)
-    prev_sales = db.execute(prev_month_query, {
+
+    row = db.execute(summary_query, {
         "client_id": client_id,
-        "month": prev_month,
-        "year": prev_year
-    }).fetchall()
+        "current_month_start": current_month_start,
+        "prev_month_start": prev_month_start,
+        "tomorrow": today + timedelta(days=1),
+        "today": today,
+    }).one()
+
+    totals = row.totals or {}
+    completed_sales = float(totals.get("completed_sales") or 0)
+    completed_orders = int(totals.get("completed_orders") or 0)
+    aov = completed_sales / completed_orders if completed_orders > 0 else 0.0
 
     return {
-        "currentMonth": [{"day": int(row.day), "total": float(row.total)} for row in current_sales],
-        "previousMonth": [{"day": int(row.day), "total": float(row.total)} for row in prev_sales]
+        "total_orders_count": [{"title": "Total Orders", "count": int(totals.get("total_orders") or 0)}],
+        "total_sales": [{"titlesales": "Total Sales", "totalamount": round(completed_sales, 2)}],
+        "aov": [{"title": "Average Order Value", "amount": round(aov, 2)}],
+        "total_customers": [{"titlecustomers": "Total Customers", "countcustomers": int(row.total_customers or 0)}],
+        "top_customers": [
+            {
+                "user": f"{c['first_name']} {c['last_name']}",
+                "total_orders": c["total_orders"],
+                "total_spending": round(float(c["total_spending"]), 2)
+            }
+            for c in row.top_customers
+        ],
+        "latest_orders": [
+            {
+                "id": f"#OD{o['id']}",
+                "user": f"{o['first_name']} {o['last_name']}",
+                "date": datetime.fromisoformat(o["created_at"]).strftime("%d %b %Y"),
+                "price": f"${float(o['total_amount']):.2f}",
+                "status": o["status"],
+            }
+            for o in row.latest_orders
+        ],
+        "sales_comparison": {
+            "currentMonth": [{"day": d["day"], "total": float(d["total"])} for d in row.daily_sales if d["is_current"]],
+            "previousMonth": [{"day": d["day"], "total": float(d["total"])} for d in row.daily_sales if not d["is_current"]],
+        },
     }
 
 def get_orders_in_range_data(db: Session, start_date: str, end_date: str, granularity: str = "daily", client_id: int = None):
@@ -241,241 +376,253 @@ def get_orders_in_range_data(db: Session, start_date: str, end_date: str, granul
         for row in results
     ]
 
-def get_orders_data(db: Session, client_id: int) -> List[dict]:
+ORDERS_PAGE_MAX_LIMIT = 500
+
+def encode_orders_cursor(created_at: datetime, order_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{order_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_orders_cursor(cursor: str) -> tuple:
+    """Returns (created_at, id); raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, order_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def get_orders_data(
+    db: Session,
+    client_id: int,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[List[str]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    referrer: Optional[str] = None,
+    include_total: bool = False,
+) -> dict:
     """
-    Fetch all orders for a specific client.
-    Joins Order → Customer and filters by client_id.
+    One page of a client's orders, newest first.
+    Keyset pagination on (created_at, id): pass the previous page's next_cursor
+    to get the following page. Only the displayed columns are selected, with
+    the customer name joined in the same query.
+    end_date is inclusive.
     """
-    orders = (
-        db.query(Order)
-        .join(Order.customer)  # ✅ Join to the Customer table
-        .filter(Customer.client_id == client_id)  # ✅ Only this client's orders
-        .order_by(Order.created_at.desc())
+    limit = max(1, min(limit, ORDERS_PAGE_MAX_LIMIT))
+
+    query = (
+        db.query(
+            Order.id,
+            Order.created_at,
+            Order.total_amount,
+            Order.status,
+            Order.attribution_referrer,
+            Customer.first_name,
+            Customer.last_name,
+        )
+        .join(Customer, Order.customer_id == Customer.id)
+        .filter(Customer.client_id == client_id)
+    )
+
+    # Half-open date range so the created_at index can be used
+    if start_date:
+        query = query.filter(Order.created_at >= start_date)
+    if end_date:
+        query = query.filter(Order.created_at < end_date + timedelta(days=1))
+    if status:
+        query = query.filter(Order.status.in_(status))
+    if referrer:
+        query = query.filter(Order.attribution_referrer.ilike(f"%{referrer}%"))
+
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        cursor_created_at, cursor_id = decode_orders_cursor(cursor)
+        query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(cursor_created_at, cursor_id))
+
+    # One extra row tells us whether there is a next page
+    rows = (
+        query.order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "orders": [
+            {
+                "id": f"#OD{row.id}",
+                "user": f"{row.first_name} {row.last_name}",
+                "date": row.created_at.strftime("%d %b %Y"),
+                "Amount": f"KD:{row.total_amount:.2f}",
+                "status": row.status,
+                "attribution_referrer": row.attribution_referrer,
+            }
+            for row in rows
+        ],
+        "next_cursor": encode_orders_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+        "has_more": has_more,
+        "total": total,
+    }
+
+def get_attribution_summary(
+    db: Session,
+    client_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> List[dict]:
+    """
+    Orders and revenue per attribution channel for a client, optionally within
+    [start_date, end_date]. Served from the daily_channel_stats rollup.
+    """
+    query = (
+        db.query(
+            DailyChannelStat.channel,
+            func.sum(DailyChannelStat.orders_count).label("count"),
+            func.sum(DailyChannelStat.revenue).label("revenue")
+        )
+        .filter(DailyChannelStat.client_id == client_id)
+    )
+    if start_date:
+        query = query.filter(DailyChannelStat.day >= start_date)
+    if end_date:
+        query = query.filter(DailyChannelStat.day <= end_date)
+
+    results = query.group_by(DailyChannelStat.channel).order_by(desc("count")).all()
 
     return [
         {
-            "id": f"#OD{order.id}",
-            "user": (
-                f"{order.customer.first_name} {order.customer.last_name}"
-                if order.customer else "Unknown"
-            ),
-            "date": order.created_at.strftime("%d %b %Y"),
-            "Amount": f"KD:{order.total_amount:.2f}",
-            "status": order.status,
-            "attribution_referrer": order.attribution_referrer,
+            "mapped_referrer": channel,
+            "count": int(count or 0),
+            "revenue": round(float(revenue or 0), 2)
         }
-        for order in orders
+        for channel, count, revenue in results
     ]
 
-def get_attribution_summary(db: Session, client_id: int) -> List[dict]:
+def refresh_channel_rollup_data(
+    db: Session,
+    client_id: int,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None
+) -> None:
     """
-    Fetch attribution summary for a specific client.
-    Joins Orders → Customers to filter by client.
+    Rebuild a client's daily_channel_stats rows for days in [start_day, end_day]
+    (all days when omitted) from its orders. Does not commit.
     """
-    results = (
-        db.query(Order.attribution_referrer, func.count(Order.id))
-        .join(Order.customer)  # ✅ Join Orders to Customers
-        .filter(Customer.client_id == client_id)  # ✅ Filter by client's ID
-        .group_by(Order.attribution_referrer)
-        .all()
-    )
+    params = {"client_id": client_id}
+    day_filter = ""
+    order_filter = ""
+    if start_day:
+        params["start_day"] = start_day
+        day_filter += " AND day >= :start_day"
+        order_filter += " AND o.created_at >= :start_day"
+    if end_day:
+        params["end_day_exclusive"] = end_day + timedelta(days=1)
+        day_filter += " AND day < :end_day_exclusive"
+        order_filter += " AND o.created_at < :end_day_exclusive"
+
+    db.execute(text(f"DELETE FROM daily_channel_stats WHERE client_id = :client_id{day_filter}"), params)
+    db.execute(text(f"""
+        INSERT INTO daily_channel_stats (client_id, day, channel, orders_count, revenue)
+        SELECT c.client_id,
+               o.created_at::date,
+               COALESCE(o.attribution_channel, 'Unknown'),
+               COUNT(*),
+               COALESCE(SUM(o.total_amount), 0)
+        FROM orders o
+        JOIN customers c ON c.id = o.customer_id
+        WHERE c.client_id = :client_id{order_filter}
+        GROUP BY c.client_id, o.created_at::date, COALESCE(o.attribution_channel, 'Unknown')
+    """), params)
 
-    summary = [
-        {
-            "referrer": referrer if referrer else "Unknown",
-            "count": count
-        }
-        for referrer, count in results
+def reclassify_attribution_channels_data(db: Session, client_id: Optional[int] = None) -> List[int]:
+    """
+    Re-run classify_referrer over every distinct referrer (optionally of one client),
+    update orders whose channel changed, and rebuild the rollup of affected clients.
+    Returns the affected client ids. Does not commit.
+    """
+    tenant_orders = db.query(Order.id).join(Customer, Customer.id == Order.customer_id)
+    if client_id is not None:
+        tenant_orders = tenant_orders.filter(Customer.client_id == client_id)
+    tenant_orders = tenant_orders.subquery()
+
+    referrers = [
+        ref for (ref,) in db.query(distinct(Order.attribution_referrer))
+        .filter(Order.id.in_(tenant_orders.select()))
+        .all()
     ]
 
-    return summary
+    # One UPDATE per channel, covering all of its referrers
+    by_channel: Dict[str, List[Optional[str]]] = {}
+    for ref in referrers:
+        by_channel.setdefault(classify_referrer(ref), []).append(ref)
+
+    affected_clients = set()
+    for channel, refs in by_channel.items():
+        known_refs = [ref for ref in refs if ref is not None]
+        ref_filter = Order.attribution_referrer.in_(known_refs)
+        if None in refs:
+            ref_filter = or_(ref_filter, Order.attribution_referrer.is_(None))
+
+        changed = (
+            db.query(Order.id)
+            .filter(
+                Order.id.in_(tenant_orders.select()),
+                ref_filter,
+                Order.attribution_channel.is_distinct_from(channel)
+            )
+        )
+        affected_clients.update(
+            cid for (cid,) in db.query(distinct(Customer.client_id))
+            .join(Order, Order.customer_id == Customer.id)
+            .filter(Order.id.in_(changed.subquery().select()))
+            .all()
+        )
+        db.query(Order).filter(Order.id.in_(changed.subquery().select())).update(
+            {Order.attribution_channel: channel}, synchronize_session=False
+        )
 
-def get_orders_by_location_data(db: Session) -> List[dict]:
+    for cid in affected_clients:
+        refresh_channel_rollup_data(db, cid)
 
-    # Step 1: Query city-level order counts (only from Kuwait)
-    clean_city = func.lower(func.trim(Address.city))
+    return sorted(affected_clients)
 
+def get_orders_by_location_data(db: Session, client_id: int) -> List[dict]:
+    """
+    Order count per Kuwaiti city for one client.
+    Grouped on Address.city_id (set at write time) joined to the kuwait_cities dimension.
+    """
     results = (
         db.query(
-            clean_city.label("city"),
+            KuwaitCity.name,
+            KuwaitCity.longitude,
+            KuwaitCity.latitude,
             func.count(func.distinct(Order.id)).label("order_count")
         )
-        .join(Customer, Customer.id == Address.customer_id)
+        .select_from(Customer)
+        .join(Address, Address.customer_id == Customer.id)
+        .join(KuwaitCity, KuwaitCity.id == Address.city_id)
         .join(Order, Order.customer_id == Customer.id)
-        .filter(Address.country.ilike("KW"))
-        .group_by(clean_city)  # << important
+        .filter(
+            Customer.client_id == client_id,
+            Address.country.ilike("KW"),
+            KuwaitCity.latitude.isnot(None),
+        )
+        .group_by(KuwaitCity.id)
+        .order_by(func.count(func.distinct(Order.id)).desc())
         .all()
     )
 
-    print(f"Raw city-level order counts: {results}")
-
-    # orders_with_city = (
-    #     db.query(Order.id, Address.city)
-    #     .join(Customer, Customer.id == Order.customer_id)
-    #     .join(Address, Address.customer_id == Customer.id)
-    #     .filter(Address.country.ilike("KW"))
-    #     .distinct(Order.id)  # ensures one city per order
-    #     .all()
-    # )
-
-    # for order_id, city in orders_with_city:
-    #     print(order_id, city)
-
-    # def analyze_orders(orders_with_city):
-    #     # Extract cities from the query results
-    #     cities = [city for _, city in orders_with_city]
-
-    #     # Count how many orders each city has
-    #     city_order_counts = Counter(cities)
-
-    #     # Print a table of distinct cities and their order counts
-    #     print(f"{'City':<25} | {'Number of Orders':>15}")
-    #     print("-" * 43)
-    #     for city, count in city_order_counts.most_common():
-    #         print(f"{city:<25} | {count:>15}")
-
-    #     return city_order_counts
-
-    # # Usage
-    # city_counts = analyze_orders(orders_with_city)
-
-    # Step 2: City name normalization map (partial view for clarity)
-    CITY_NAME_MAP = {
-        "كبد": "Kabad", "القصور": "Al Qusour", "al-qosour": "Al Qusour",
-        "مزارع الوفرة": "Wafra Farms", "جواخيرالوفرة": "Wafra Farms",
-        "صباح السالم": "Sabah Al Salem", "sabah al-salem": "Sabah Al Salem",
-        "مبارك الكبير": "Mubarak Al Kabeer", "العدان": "Al Adan",
-        "العبدلي": "Al Abdali", "al-abdilee": "Al Abdali",
-        "الرميثية": "Rumaithiya", "al-rumaithiya": "Rumaithiya",
-        "القرين": "Al Qurain", "مدينة الأحمدي": "Ahmadi City",
-        "سلوى": "Salwa", "salwa": "Salwa",
-        "مدينة صباح الأحمد": "Sabah Al Ahmad City", "الرقة": "Al Riqqa",
-        "السالمية": "Salmiya", "مدينة سعد العبدالله": "Saad Al Abdullah City",
-        "الصباحية": "Sabahiya", "ضاحية عبدالله المبارك": "Abdullah Al Mubarak",
-        "abdulla al-mubarak": "Abdullah Al Mubarak", "حطين": "Hateen",
-        "جابر العلي": "Jaber Al Ali", "جابر الأحمد": "Jaber Al Ahmad",
-        "al-sulaibia traditional accommodations": "Sulaibiya", "الري": "Al Rai",
-        "الجهراء": "Jahra", "الاندلس": "Andalus", "الدوحة": "Doha",
-        "al-doha": "Doha", "مشرف": "Mishref", "أبو فطيرة": "Abu Fatira",
-        "abu fatera": "Abu Fatira", "الفروانية": "Farwaniya",
-        "al-farwaniya": "Farwaniya", "الدسمة": "Dasma", "الزهراء": "Zahra",
-        "المنقف": "Mangaf", "الفردوس": "Firdous",
-        "علي صباح السالم (ام الهيمان)": "Ali Sabah Al Salem",
-        "علي صباح السالم   (ام الهيمان)": "Ali Sabah Al Salem",
-        "بيان": "Bayan", "الروضة": "Rawda",
-        "ضاحية عبدالله السالم": "Abdullah Al Salem", "هدية": "Hadiya",
-        "حولي": "Hawally", "الظهر": "Dhaher",
-        "مدينة الخيران الجديدة": "New Khairan City",
-        "al-kheeran and al-kheeran pearl": "New Khairan City",
-        "فهد الأحمد": "Fahad Al Ahmad", "الجابرية": "Jabriya",
-        "al-jabriya": "Jabriya", "السرة": "Surra", "القصر": "Al Qasr",
-        "سباق الهجن وسباق الفروسية": "Camel & Horse Racing", "العارضية": "Ardiya",
-        "الصليبخات": "Sulaibikhat", "اليرموك": "Yarmouk",
-        "جنوب الدوحة  - القيروان": "South Doha - Qairawan",
-        "الشامية": "Shamiya", "الصليبية الزراعية 1": "Sulaibiya Agriculture",
-        "العديلية": "Adailiya", "النهضة - شرق الصليبخات": "Nahda - East Sulaibikhat",
-        "الفحيحيل": "Fahaheel", "الشهداء": "Shuhada", "الفنيطيس": "Fnaitees",
-        "الرحاب": "Rehab", "الرابية": "Rabiya", "قرطبة": "Qurtuba",
-        "السلام": "Salam", "abdulla port and industrial shuaiba": "Shuaiba Industrial",
-        "north of al-shuaiba -al-ahmadi port": "North Shuaiba",
-        "المنصورية": "Mansouriya", "النزهة": "Nuzha", "أشبيلية": "Ishbiliya",
-        "بر محافظة الأحمدي": "Ahmadi Desert", "المهبولة": "Mahboula",
-        "جليب الشيوخ": "Jleeb Al Shuyoukh", "كيفان": "Keifan",
-        "الفنطاس": "Fintas", "الصديق": "Siddiq", "العقيلة": "Eqaila",
-        "النسيم": "Naseem", "صبحان الصناعية": "Sabhan Industrial",
-        "الواحة": "Waha", "خيطان": "Khaitan", "تيماء": "Tayma",
-        "القادسية": "Qadsiya",
-    }
-
-    # Step 3: Coordinates for major cities (you can extend this)
-    city_coords = {
-    "Hawalli": [48.02861, 29.33278],
-    "Salmiya": [48.08333, 29.33333],
-    "Farwaniya": [47.95861, 29.27750],
-    "Mahboula": [48.13028, 29.14500],
-    "Sabah Al Salem": [48.05722, 29.25722],
-    "Mangaf": [48.13278, 29.09611],
-    "Bayan": [48.04881, 29.30320],
-    "Wafra Farms": [47.93056, 28.63917],
-    "Abdullah Al Salem": [47.97806, 29.26917],
-    "Mubarak Al Kabeer": [47.65806, 29.33750],
-    "Fintas": [48.12111, 29.17389],
-    "Doha": [47.93306, 29.29500],
-    "Dasma": [48.00139, 29.36500],
-    "Shuwaikh Commercial": [47.95000, 29.35000],
-    "Jahra": [47.65806, 29.33750],
-    "Fahaheel": [48.12361, 29.09889],
-    "Sabhan Industrial": [47.90000, 29.25000],
-    "Jaber Al Ahmad": [47.90000, 29.30000],
-    "Jleeb Al Shuyoukh": [47.90000, 29.25000],
-    "Kaifan": [47.95000, 29.30000],
-    "Mishref": [47.95000, 29.30000],
-    "Qurtuba": [47.95000, 29.30000],
-    "Fahad Al Ahmad": [47.95000, 29.30000],
-    "Abdullah Al Mubarak": [47.95000, 29.30000],
-    "Umm Al Haiman": [47.95000, 29.30000],
-    "Kabed": [47.95000, 29.30000],
-    "Hateen": [47.95000, 29.30000],
-    "Nuzha": [47.95000, 29.30000],
-    "Sulaibikhat": [47.95000, 29.30000],
-    "Siddiq": [47.95000, 29.30000],
-    "Sabahiya": [47.95000, 29.30000],
-    "Dasman": [47.95000, 29.30000],
-    "Surra": [47.95000, 29.30000],
-    "Rai": [47.95000, 29.30000],
-    "Rawda": [47.95000, 29.30000],
-    "Riqqa": [47.95000, 29.30000],
-    "Shamiya": [47.95000, 29.30000],
-    "Shuhada": [47.95000, 29.30000],
-    "Al Nahda": [47.95000, 29.30000],
-    "Zahraa": [47.95000, 29.30000],
-    "Qusoor": [47.95000, 29.30000],
-    "Qasr": [47.95000, 29.30000],
-    "Eqaila": [47.95000, 29.30000],
-    "Ardiya": [47.95000, 29.30000],
-    "Adailiya": [47.95000, 29.30000],
-    "Adan": [47.95000, 29.30000],
-    "Omariya": [47.95000, 29.30000],
-    "Oyoun": [47.95000, 29.30000],
-    "Naseem": [47.95000, 29.30000],
-    "Naeem": [47.95000, 29.30000],
-    "Nuwaiseeb": [47.95000, 29.30000],
-    "Waha": [47.95000, 29.30000],
-    "Ferdous": [47.95000, 29.30000],
-    "Rumaithiya": [47.95000, 29.30000],
-    "Reqaee": [47.95000, 29.30000],
-    "Qurain": [47.95000, 29.30000],
-    "Faiha": [47.95000, 29.30000],
-    "Fnaitees": [47.95000, 29.30000],
-    "Bneid Al Gar": [47.95000, 29.30000],
-    "Ishbiliya": [47.95000, 29.30000],
-    "Andalus": [47.95000, 29.30000],
-    "Jabriya": [47.95000, 29.30000],
-    "Jaber Al Ali": [47.95000, 29.30000],
-    "Tayma": [47.95000, 29.30000],
-    "Sabah Al Nasser": [47.95000, 29.30000],
-    "Central Sabhan": [47.90000, 29.25000],
-}
-
-    response = []
-    for raw_city, count in results:
-        if not raw_city:
-            continue
-        city_key = raw_city.strip().lower()
-        canonical_city = CITY_NAME_MAP.get(city_key)
-        if not canonical_city:
-            continue
-        coords = city_coords.get(canonical_city)
-        if coords:
-            response.append({
-                "city": canonical_city,
-                "coordinates": coords,
-                "orders": count
-            })
-
-    return response
+    return [
+        {
+            "city": name,
+            "coordinates": [longitude, latitude],
+            "orders": count
+        }
+        for name, longitude, latitude, count in results
+    ]
 
 # def get_orders_with_customer_city(db: Session) -> List[Dict]:
 #     """
@@ -509,12 +656,13 @@ def get_orders_by_location_data(db: Session) -> List[dict]:
 #         for order_id, status, total_amount, city in results
 #     ]
 
-def get_unique_order_count_per_city(db: Session) -> List[Dict]:
+def get_unique_order_count_per_city(db: Session, client_id: int) -> List[Dict]:
     """
-    Get the count of unique orders for each city.
+    Get the count of unique orders for each city of one client.
 
     Args:
         db (Session): SQLAlchemy database session.
+        client_id (int): Client whose customers' orders are counted.
 
     Returns:
         List[Dict]: A list where each dict has 'city' and 'unique_order_count'.
@@ -526,6 +674,7 @@ def get_unique_order_count_per_city(db: Session) -> List[Dict]:
         )
         .join(Customer, Order.customer_id == Customer.id)
         .join(Address, Address.customer_id == Customer.id)
+        .filter(Customer.client_id == client_id)
         .group_by(Address.city)
         .order_by(func.count(distinct(Order.id)).desc())
         .all()
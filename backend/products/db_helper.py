@@ -1,29 +1,72 @@
-from sqlalchemy import func, cast, Date
+from sqlalchemy import func, cast, Date, case, desc, text, and_
 from sqlalchemy.orm import Session
 from models import *
-from typing import List, Dict
+from typing import List, Dict, Optional, Iterable
 from fastapi import Query
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from schemas import ProductSchema
 
-def get_top_selling_products_data(db: Session, client_id: int) -> list[dict]:
-    """
-    Returns the top 5 selling products (by quantity sold) for a given client.
-    This version does NOT depend on Product.external_id since many order_items
-    have no product_id value.
-    """
-    results = (
+COMPLETED_STATUSES = ("completed", "wc-completed")
+
+
+def parse_date(date_str) -> Optional[datetime]:
+    """Parse date from various formats (ISO, MM-DD-YYYY, YYYY-MM-DD, DD-MM-YYYY)"""
+    if not date_str:
+        return None
+    if isinstance(date_str, datetime):
+        return date_str
+    if isinstance(date_str, date):
+        return datetime.combine(date_str, datetime.min.time())
+
+    # Try ISO format first
+    try:
+        return datetime.fromisoformat(str(date_str).replace('Z', '+00:00'))
+    except ValueError:
+        pass
+
+    for fmt in ("%m-%d-%Y", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            pass
+
+    return None
+
+
+def _product_key():
+    """Rollup rows belong to one product by product_id, or by name for unlinked items"""
+    return (
+        DailyProductSale.product_id,
+        case((DailyProductSale.product_id.is_(None), DailyProductSale.product_name), else_=None)
+    )
+
+
+def _top_selling_products(
+    db: Session,
+    client_id: int,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None,
+    limit: int = 5
+) -> list[dict]:
+    query = (
         db.query(
-            OrderItem.product_name.label("name"),
-            func.sum(OrderItem.quantity).label("total_quantity_sold")
+            func.coalesce(func.max(Product.name), func.max(DailyProductSale.product_name)).label("name"),
+            func.sum(DailyProductSale.quantity).label("total_quantity_sold")
         )
-        .join(Order, Order.id == OrderItem.order_id)
-        .join(Customer, Customer.id == Order.customer_id)
-        .filter(Customer.client_id == client_id)
-        .filter(Order.status.in_(["completed", "wc-completed"]))
-        .group_by(OrderItem.product_name)
-        .order_by(func.sum(OrderItem.quantity).desc())
-        .limit(5)
+        .outerjoin(Product, (Product.client_id == DailyProductSale.client_id)
+                   & (Product.external_id == DailyProductSale.product_id))
+        .filter(DailyProductSale.client_id == client_id)
+    )
+    if start_day:
+        query = query.filter(DailyProductSale.day >= start_day)
+    if end_day:
+        query = query.filter(DailyProductSale.day <= end_day)
+
+    results = (
+        query
+        .group_by(*_product_key())
+        .order_by(desc("total_quantity_sold"))
+        .limit(limit)
         .all()
     )
 
@@ -32,6 +75,14 @@ def get_top_selling_products_data(db: Session, client_id: int) -> list[dict]:
         for name, quantity in results
     ]
 
+
+def get_top_selling_products_data(db: Session, client_id: int) -> list[dict]:
+    """
+    Returns the top 5 selling products (by quantity sold) for a given client,
+    from the daily_product_sales rollup.
+    """
+    return _top_selling_products(db, client_id)
+
 def get_top_selling_products_inbetween_data(
     db: Session,
     client_id: int,
@@ -40,38 +91,22 @@ def get_top_selling_products_inbetween_data(
 ) -> list[dict]:
     """
     Returns the top 5 selling products (by quantity sold) for a given client
-    within a specific date range, based on OrderItem data.
-    Does not rely on Product.external_id since many order_items may lack product_id.
+    with orders created within [start_date, end_date] (whole days).
     """
-    results = (
-        db.query(
-            OrderItem.product_name.label("name"),
-            func.sum(OrderItem.quantity).label("total_quantity_sold")
-        )
-        .join(Order, Order.id == OrderItem.order_id)
-        .join(Customer, Customer.id == Order.customer_id)
-        .filter(Customer.client_id == client_id)
-        .filter(Order.status.in_(["completed", "wc-completed"]))
-        .filter(Order.created_at >= start_date)
-        .filter(Order.created_at <= end_date)
-        .group_by(OrderItem.product_name)
-        .order_by(func.sum(OrderItem.quantity).desc())
-        .limit(5)
-        .all()
-    )
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if not start or not end:
+        return []
 
-    return [
-        {"name": name, "total_quantity_sold": int(quantity or 0)}
-        for name, quantity in results
-    ]
+    return _top_selling_products(db, client_id, start.date(), end.date())
 
 def get_products_sales_table_data(db: Session, client_id: int, start_date: str, end_date: str):
-    try:
-        start = datetime.fromisoformat(start_date)
-        end = datetime.fromisoformat(end_date) + timedelta(days=1) - timedelta(seconds=1)
-    except (ValueError, TypeError):
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if not start or not end:
         return []
 
+    # order_items.product_id -> products.external_id, via the daily rollup
     results = (
         db.query(
             Product.id,
@@ -79,15 +114,13 @@ def get_products_sales_table_data(db: Session, client_id: int, start_date: str,
             Product.categories,
             Product.sales_price,
             Product.regular_price,
-            func.sum(OrderItem.quantity).label("total_sales")
+            func.sum(DailyProductSale.quantity).label("total_sales")
         )
-        .join(OrderItem, Product.name == OrderItem.product_name)
-        .join(Order, Order.id == OrderItem.order_id)
-        .join(Customer, Customer.id == Order.customer_id)
-        .filter(Customer.client_id == client_id)
-        .filter(Order.status.in_(["completed", "wc-completed"]))
-        .filter(Order.created_at >= start)
-        .filter(Order.created_at <= end)
+        .join(DailyProductSale, (DailyProductSale.client_id == Product.client_id)
+              & (DailyProductSale.product_id == Product.external_id))
+        .filter(Product.client_id == client_id)
+        .filter(DailyProductSale.day >= start.date())
+        .filter(DailyProductSale.day <= end.date())
         .group_by(
             Product.id,
             Product.name,
@@ -95,7 +128,7 @@ def get_products_sales_table_data(db: Session, client_id: int, start_date: str,
             Product.sales_price,
             Product.regular_price
         )
-        .order_by(func.sum(OrderItem.quantity).desc())
+        .order_by(func.sum(DailyProductSale.quantity).desc())
         .all()
     )
 
@@ -128,18 +161,51 @@ def get_products_sales_table_data(db: Session, client_id: int, start_date: str,
         for p_id, name, category, sales_price, regular_price, total_sales in results
     ]
 
-def get_products_table_data(db: Session):
+PRODUCTS_PAGE_MAX_LIMIT = 500
+
+def get_products_table_data(
+    db: Session,
+    client_id: int,
+    limit: int = 50,
+    cursor: Optional[int] = None,
+    search: Optional[str] = None,
+    include_total: bool = False,
+) -> dict:
+    """
+    One page of a client's products, newest first.
+    Keyset pagination on id: pass the previous page's next_cursor to continue.
+    search matches anywhere in the name (served by the trigram index).
+    """
+    limit = max(1, min(limit, PRODUCTS_PAGE_MAX_LIMIT))
+
+    query = db.query(Product).filter(Product.client_id == client_id)
+    if search and search.strip():
+        query = query.filter(Product.name.ilike(f"%{search.strip()}%"))
+
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        query = query.filter(Product.id < cursor)
+
+    # One extra row tells us whether there is a next page
+    products = query.order_by(Product.id.desc()).limit(limit + 1).all()
+    has_more = len(products) > limit
+    products = products[:limit]
 
-    products = db.query(Product).all()
-    return [ProductSchema.from_orm(p) for p in products]
+    return {
+        "products": [ProductSchema.from_orm(p) for p in products],
+        "next_cursor": products[-1].id if has_more else None,
+        "has_more": has_more,
+        "total": total,
+    }
 
-def get_product_details_data(db: Session, id: int) -> dict:
+def get_product_details_data(db: Session, id: int, client_id: int) -> dict:
     
-    return db.query(Product).filter(Product.id == id).all() 
+    return db.query(Product).filter(Product.id == id, Product.client_id == client_id).all() 
 
 def get_sales_over_time_data(db: Session, start_date: str, end_date: str, product_id: int, client_id: int = None):
     """
-    Get sales over time for a specific product.
+    Get daily sales of one product.
     
     Args:
         db: Database session
@@ -148,58 +214,23 @@ def get_sales_over_time_data(db: Session, start_date: str, end_date: str, produc
         product_id: Product ID (can be internal Product.id or Product.external_id)
         client_id: Optional client ID to filter orders
     """
-    # Parse dates - handle multiple formats
-    def parse_date(date_str):
-        """Parse date from various formats"""
-        if not date_str:
-            return None
-        
-        # Try ISO format first
-        try:
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        except ValueError:
-            pass
-        
-        # Try MM-DD-YYYY format
-        try:
-            return datetime.strptime(date_str, "%m-%d-%Y")
-        except ValueError:
-            pass
-        
-        # Try YYYY-MM-DD format
-        try:
-            return datetime.strptime(date_str, "%Y-%m-%d")
-        except ValueError:
-            pass
-        
-        # Try DD-MM-YYYY format
-        try:
-            return datetime.strptime(date_str, "%d-%m-%Y")
-        except ValueError:
-            pass
-        
-        return None
-    
     start = parse_date(start_date)
     end = parse_date(end_date)
     
     if not start or not end:
         return []
 
-    # Build query
     query = (
         db.query(
             Product.name.label("product_name"),
             Product.external_id.label("external_id"),
-            cast(Order.created_at, Date).label("date"),
-            func.sum(OrderItem.quantity).label("total_sales")
+            DailyProductSale.day.label("date"),
+            func.sum(DailyProductSale.quantity).label("total_sales")
         )
-        .join(OrderItem, Product.external_id == OrderItem.product_id)
-        .join(Order, Order.id == OrderItem.order_id)
-        .join(Customer, Customer.id == Order.customer_id)
-        .filter(Order.created_at >= start)
-        .filter(Order.created_at <= end)
-        .filter(Order.status.in_(["completed", "wc-completed"]))
+        .join(DailyProductSale, (DailyProductSale.client_id == Product.client_id)
+              & (DailyProductSale.product_id == Product.external_id))
+        .filter(DailyProductSale.day >= start.date())
+        .filter(DailyProductSale.day <= end.date())
     )
     
     # Filter by product_id - check both Product.id and Product.external_id
@@ -209,12 +240,12 @@ def get_sales_over_time_data(db: Session, start_date: str, end_date: str, produc
     
     # Filter by client_id if provided
     if client_id:
-        query = query.filter(Customer.client_id == client_id)
+        query = query.filter(Product.client_id == client_id)
     
     results = (
         query
-        .group_by(Product.name, Product.external_id, cast(Order.created_at, Date))
-        .order_by(cast(Order.created_at, Date))
+        .group_by(Product.name, Product.external_id, DailyProductSale.day)
+        .order_by(DailyProductSale.day)
         .all()
     )
 
@@ -227,4 +258,169 @@ def get_sales_over_time_data(db: Session, start_date: str, end_date: str, produc
             "total_sales": int(row.total_sales or 0)
         }
         for row in results
-    ]
\ No newline at end of file
+    ]
+
+def refresh_product_rollup_data(
+    db: Session,
+    client_id: int,
+    start_day: Optional[date] = None,
+    end_day: Optional[date] = None
+) -> None:
+    """
+    Rebuild a client's daily_product_sales rows for days in [start_day, end_day]
+    (all days when omitted) from its completed orders. Does not commit.
+    """
+    params = {"client_id": client_id, "statuses": list(COMPLETED_STATUSES)}
+    day_filter = ""
+    order_filter = ""
+    if start_day:
+        params["start_day"] = start_day
+        day_filter += " AND day >= :start_day"
+        order_filter += " AND o.created_at >= :start_day"
+    if end_day:
+        params["end_day_exclusive"] = end_day + timedelta(days=1)
+        day_filter += " AND day < :end_day_exclusive"
+        order_filter += " AND o.created_at < :end_day_exclusive"
+
+    db.execute(text(f"DELETE FROM daily_product_sales WHERE client_id = :client_id{day_filter}"), params)
+    db.execute(text(f"""
+        INSERT INTO daily_product_sales (client_id, day, product_id, product_name, quantity, revenue, orders_count)
+        SELECT c.client_id,
+               o.created_at::date,
+               oi.product_id,
+               MAX(oi.product_name),
+               SUM(oi.quantity),
+               COALESCE(SUM(oi.quantity * oi.price), 0),
+               COUNT(DISTINCT o.id)
+        FROM orders o
+        JOIN customers c ON c.id = o.customer_id
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE c.client_id = :client_id
+          AND o.status = ANY(:statuses){order_filter}
+        GROUP BY c.client_id, o.created_at::date, oi.product_id,
+                 CASE WHEN oi.product_id IS NULL THEN oi.product_name END
+    """), params)
+
+# Orders left out of the bought-together counts (statuses at the time they are folded in)
+AFFINITY_EXCLUDED_STATUSES = ("cancelled", "failed", "refunded", "trash")
+
+def get_order_product_pairs_data(db: Session, client_id: int, after_order_id: int = 0) -> List[tuple]:
+    """
+    (order_id, product_id) of every product line in the client's orders with id > after_order_id,
+    skipping custom line items and AFFINITY_EXCLUDED_STATUSES orders.
+    """
+    return db.execute(text("""
+        SELECT oi.order_id, oi.product_id
+        FROM orders o
+        JOIN customers c ON c.id = o.customer_id
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE c.client_id = :client_id
+          AND o.id > :after_order_id
+          AND o.status <> ALL(:excluded_statuses)
+          AND oi.product_id IS NOT NULL
+    """), {
+        "client_id": client_id,
+        "after_order_id": after_order_id,
+        "excluded_statuses": list(AFFINITY_EXCLUDED_STATUSES),
+    }).all()
+
+def get_cooccurrence_matrix_data(db: Session, client_id: int) -> Optional[ProductCooccurrenceMatrix]:
+    return db.query(ProductCooccurrenceMatrix).filter(ProductCooccurrenceMatrix.client_id == client_id).first()
+
+def save_cooccurrence_matrix_data(db: Session, client_id: int, state: dict) -> ProductCooccurrenceMatrix:
+    """
+    Insert or replace a client's co-occurrence matrix state. Does not commit.
+    """
+    row = get_cooccurrence_matrix_data(db, client_id)
+    if row is None:
+        row = ProductCooccurrenceMatrix(client_id=client_id)
+        db.add(row)
+    for field, value in state.items():
+        setattr(row, field, value)
+    row.updated_at = datetime.utcnow()
+    db.flush()
+    return row
+
+def replace_product_affinities_data(
+    db: Session,
+    client_id: int,
+    affinities: List[dict],
+    product_ids: Optional[Iterable[int]] = None
+) -> None:
+    """
+    Replace a client's product_affinities rows of the given products (all products when
+    omitted) with `affinities` (ProductAffinity column dicts). Does not commit.
+    """
+    query = db.query(ProductAffinity).filter(ProductAffinity.client_id == client_id)
+    if product_ids is not None:
+        query = query.filter(ProductAffinity.product_id.in_(list(product_ids)))
+    query.delete(synchronize_session=False)
+    if affinities:
+        db.execute(ProductAffinity.__table__.insert(), [{"client_id": client_id, **row} for row in affinities])
+
+def get_product_affinities_data(db: Session, client_id: int, product_external_id: int, limit: int = 10) -> List[dict]:
+    """
+    Products most often bought together with a product, strongest first (primary key range lookup).
+    """
+    rows = (
+        db.query(
+            ProductAffinity.neighbor_id,
+            ProductAffinity.co_orders,
+            ProductAffinity.confidence,
+            ProductAffinity.lift,
+            Product.id,
+            Product.name
+        )
+        .outerjoin(Product, and_(
+            Product.client_id == ProductAffinity.client_id,
+            Product.external_id == ProductAffinity.neighbor_id
+        ))
+        .filter(ProductAffinity.client_id == client_id, ProductAffinity.product_id == product_external_id)
+        .order_by(ProductAffinity.rank)
+        .limit(limit)
+        .all()
+    )
+
+    return [
+        {
+            "product_id": row.id,
+            "external_id": row.neighbor_id,
+            "product_name": row.name,
+            "co_orders": row.co_orders,
+            "confidence": round(row.confidence, 4),
+            "lift": round(row.lift, 3),
+        }
+        for row in rows
+    ]
+
+def get_cross_sell_suggestions_data(db: Session, customer_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Best bought-together product for each customer, from the products of its latest order,
+    excluding products already in that order. Keyed by customer id; customers without a
+    suggestion are missing.
+    """
+    rows = db.execute(text("""
+        WITH last_orders AS (
+            SELECT DISTINCT ON (o.customer_id) o.customer_id, o.id AS order_id, c.client_id
+            FROM orders o
+            JOIN customers c ON c.id = o.customer_id
+            WHERE o.customer_id = ANY(:customer_ids)
+            ORDER BY o.customer_id, o.created_at DESC, o.id DESC
+        ),
+        bought AS (
+            SELECT DISTINCT lo.customer_id, lo.client_id, oi.product_id
+            FROM last_orders lo
+            JOIN order_items oi ON oi.order_id = lo.order_id
+            WHERE oi.product_id IS NOT NULL
+        )
+        SELECT DISTINCT ON (b.customer_id) b.customer_id, a.neighbor_id, p.name
+        FROM bought b
+        JOIN product_affinities a ON a.client_id = b.client_id AND a.product_id = b.product_id
+        JOIN products p ON p.client_id = a.client_id AND p.external_id = a.neighbor_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM bought b2 WHERE b2.customer_id = b.customer_id AND b2.product_id = a.neighbor_id
+        )
+        ORDER BY b.customer_id, a.confidence DESC, a.lift DESC
+    """), {"customer_ids": list(customer_ids)}).all()
+
+    return {row.customer_id: {"external_id": row.neighbor_id, "product_name": row.name} for row in rows}
@@ -1,5 +1,8 @@
 from products.db_helper import *
+import io
+import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 from datetime import datetime
@@ -20,17 +23,141 @@ def function_get_products_sales_table(db, client_id, start_date, end_date):
    
     return products_sales_table_response
 
-def function_get_products_table(db):
+def function_get_products_table(db, client_id, **filters):
 
-    products_table_response = get_products_table_data(db)
+    products_table_response = get_products_table_data(db, client_id, **filters)
 
     return products_table_response
 
-def function_get_product_details(db, id: int):
+def function_get_product_details(db, id: int, client_id: int):
 
-    sales_comparison_data = get_product_details_data(db, id)
+    sales_comparison_data = get_product_details_data(db, id, client_id)
     return sales_comparison_data
 
+AFFINITY_TOP_K = 10
+AFFINITY_MIN_CO_ORDERS = 2   # pairs bought together fewer times are noise, not affinity
+
+def fold_orders_into_cooccurrence(matrix, product_ids, order_products):
+    """
+    Add orders to an item-item co-occurrence matrix: C += B.T @ B, with B the binary
+    order x product incidence matrix of the new orders. Products seen for the first time
+    are appended to product_ids and the matrix grows to match.
+
+    Args:
+        matrix (csr_matrix | None): Current counts, None to start empty.
+        product_ids (list): External product id of each matrix index.
+        order_products (list): (order_id, product_id) pairs of the new orders.
+
+    Returns:
+        tuple: (matrix, product_ids, number of orders added, matrix indices of their products)
+    """
+    product_ids = list(product_ids)
+    index_of = {product_id: i for i, product_id in enumerate(product_ids)}
+    for _, product_id in order_products:
+        if product_id not in index_of:
+            index_of[product_id] = len(product_ids)
+            product_ids.append(product_id)
+
+    size = len(product_ids)
+    if matrix is None:
+        matrix = sparse.csr_matrix((size, size), dtype=np.int64)
+    else:
+        matrix.resize((size, size))
+
+    if not order_products:
+        return matrix, product_ids, 0, np.array([], dtype=np.int64)
+
+    order_ids = np.fromiter((order_id for order_id, _ in order_products), dtype=np.int64, count=len(order_products))
+    columns = np.fromiter((index_of[product_id] for _, product_id in order_products), dtype=np.int64, count=len(order_products))
+    order_index, rows = np.unique(order_ids, return_inverse=True)
+
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, columns)), shape=(len(order_index), size)
+    )
+    incidence.data[:] = 1  # a product listed twice in one order counts once
+
+    matrix = (matrix + incidence.T @ incidence).tocsr()
+    return matrix, product_ids, len(order_index), np.unique(columns)
+
+def top_k_neighbors(matrix, product_ids, orders_count, rows, k=AFFINITY_TOP_K, min_co_orders=AFFINITY_MIN_CO_ORDERS):
+    """
+    Top-k neighbours of the given matrix rows, by co-occurring orders then lift.
+
+    Returns:
+        list: ProductAffinity column dicts (without client_id).
+    """
+    matrix.sort_indices()
+    orders_with = matrix.diagonal()
+    affinities = []
+
+    for row in rows:
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        neighbors = matrix.indices[start:end]
+        co_orders = matrix.data[start:end]
+        keep = (neighbors != row) & (co_orders >= min_co_orders)
+        neighbors, co_orders = neighbors[keep], co_orders[keep]
+        if not len(neighbors):
+            continue
+
+        confidence = co_orders / orders_with[row]
+        lift = confidence * orders_count / orders_with[neighbors]
+        best = np.lexsort((-lift, -co_orders))[:k]
+
+        for rank, i in enumerate(best, start=1):
+            affinities.append({
+                "product_id": product_ids[row],
+                "rank": rank,
+                "neighbor_id": product_ids[neighbors[i]],
+                "co_orders": int(co_orders[i]),
+                "confidence": float(confidence[i]),
+                "lift": float(lift[i]),
+            })
+
+    return affinities
+
+def function_update_product_affinity(db, client_id: int, full: bool = False) -> int:
+    """
+    Fold the client's orders placed since the last run into its co-occurrence matrix and
+    recompute the top-k neighbours of the products in them. Other products keep their
+    neighbours (only their lift drifts as order totals grow) until the next full rebuild,
+    which also drops orders cancelled after being counted. Returns the number of orders added.
+    """
+    state = None if full else get_cooccurrence_matrix_data(db, client_id)
+    if state is not None:
+        matrix = sparse.load_npz(io.BytesIO(state.matrix))
+        product_ids, orders_count, last_order_id = state.product_ids, state.orders_count, state.last_order_id
+    else:
+        matrix, product_ids, orders_count, last_order_id = None, [], 0, 0
+
+    order_products = get_order_product_pairs_data(db, client_id, after_order_id=last_order_id)
+    matrix, product_ids, added, touched = fold_orders_into_cooccurrence(matrix, product_ids, order_products)
+    if state is not None and not added:
+        return 0
+
+    orders_count += added
+    buffer = io.BytesIO()
+    sparse.save_npz(buffer, matrix)
+    save_cooccurrence_matrix_data(db, client_id, {
+        "matrix": buffer.getvalue(),
+        "product_ids": product_ids,
+        "orders_count": orders_count,
+        "last_order_id": max((order_id for order_id, _ in order_products), default=last_order_id),
+    })
+
+    rows = range(len(product_ids)) if state is None else touched
+    replace_product_affinities_data(
+        db, client_id,
+        top_k_neighbors(matrix, product_ids, orders_count, rows),
+        product_ids=None if state is None else [product_ids[row] for row in touched],
+    )
+    return added
+
+def function_get_bought_together(db, id: int, client_id: int, limit: int = AFFINITY_TOP_K):
+    product = get_product_details_data(db, id, client_id)
+    if not product or product[0].external_id is None:
+        return []
+    return get_product_affinities_data(db, client_id, product[0].external_id, limit)
+
 def function_get_sales_over_time(db, start_date, end_date, product_id, client_id=None):
 
     sales_over_time_data = get_sales_over_time_data(db, start_date, end_date, product_id, client_id)
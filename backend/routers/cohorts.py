@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import Optional
+from database import get_db
+from models import Client
+from cohorts.operation_helper import *
+from utils.auth import get_current_client
+from utils.response_cache import cached_response
+
+router = APIRouter()
+
+@router.get("/cohorts/retention")
+def get_cohort_retention(
+    start_month: Optional[date] = Query(None, description="First cohort month (any day of the month)"),
+    end_month: Optional[date] = Query(None, description="Last cohort month (any day of the month)"),
+    max_months: int = Query(12, ge=0, le=60, description="Months after acquisition to report"),
+    db: Session = Depends(get_db),
+    current_client: Client = Depends(get_current_client),
+    client_id: int | None = Query(
+        None,
+        description="(Admin only) ID of client whose data to view",
+    ),
+):
+    """
+    Monthly acquisition cohorts with their retention curve and cumulative LTV per month
+    since acquisition, plus size-weighted averages across cohorts.
+    Served from customer_cohort_stats, which order sync keeps current.
+    """
+    # Default: use logged-in user
+    target_client_id = current_client.id
+
+    # If admin and client_id is provided, override
+    if getattr(current_client, "user_type", None) == "admin" and client_id is not None:
+        target_client = db.query(Client).filter(Client.id == client_id).first()
+        if not target_client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        target_client_id = target_client.id
+
+    params = {"start_month": start_month, "end_month": end_month, "max_months": max_months, "today": date.today()}
+    response_data = cached_response(
+        target_client_id, "cohorts-retention", params,
+        lambda: function_get_cohort_analysis(
+            db=db, client_id=target_client_id, start_month=start_month, end_month=end_month, max_months=max_months
+        )
+    )
+    return response_data
@@ -6,6 +6,7 @@ from models import *  # Assuming Customer model is imported
 from customers.operation_helper import *
 from schemas import *
 from utils.auth import get_current_client
+from utils.response_cache import cached_response
 
 router = APIRouter()
 
@@ -28,12 +29,17 @@ def get_customers_table(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_customers_table(db=db, client_id = target_client_id)
+    response_data = cached_response(
+        target_client_id, "customers-table", {},
+        lambda: function_get_customers_table(db=db, client_id = target_client_id)
+    )
     return response_data
 
 @router.get("/customer-details/{id}", response_model=CustomerDetailsResponse)
 def get_customers_details(
     id: int, 
+    limit: int = Query(50, ge=1, le=200, description="Orders page size"),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
     db: Session = Depends(get_db),
     current_client = Depends(get_current_client),
     client_id: int | None = Query(
@@ -41,6 +47,11 @@ def get_customers_details(
         description="(Admin only) ID of client whose data to view",
     ),
 ):
+    """
+    Customer info, product totals over completed orders and one page of the
+    customer's orders, newest first. Pass next_cursor back as cursor for the
+    following page.
+    """
     # Default: use logged-in user
     target_client_id = current_client.id
 
@@ -58,7 +69,13 @@ def get_customers_details(
     if customer.client_id != target_client_id:
         raise HTTPException(status_code=403, detail="Customer does not belong to the specified client")
 
-    response_data = function_get_customers_details(db=db, id=id)
+    try:
+        response_data = cached_response(
+            target_client_id, "customer-details", {"id": id, "limit": limit, "cursor": cursor},
+            lambda: function_get_customers_details(db=db, id=id, limit=limit, cursor=cursor)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return response_data
 
 @router.get("/customer-order-items-summary/{id}", response_model=List[dict])
@@ -88,7 +105,10 @@ def get_customer_order_items_summary(
     if customer.client_id != target_client_id:
         raise HTTPException(status_code=403, detail="Customer does not belong to the specified client")
 
-    response_data = function_get_customer_order_items_summary(db=db, id=id)
+    response_data = cached_response(
+        target_client_id, "customer-order-items-summary", {"id": id},
+        lambda: function_get_customer_order_items_summary(db=db, id=id)
+    )
     return response_data
 
 @router.get("/customer-product-orders", response_model=List[ProductOrderData])
@@ -119,7 +139,10 @@ def get_customer_product_orders(
     if customer.client_id != target_client_id:
         raise HTTPException(status_code=403, detail="Customer does not belong to the specified client")
 
-    response_data = function_get_customer_product_orders(db=db, customer_id=customer_id, product_external_id=product_external_id)
+    response_data = cached_response(
+        target_client_id, "customer-product-orders", {"customer_id": customer_id, "product_external_id": product_external_id},
+        lambda: function_get_customer_product_orders(db=db, customer_id=customer_id, product_external_id=product_external_id)
+    )
     return response_data
 
 @router.get("/customer-classification", response_model=List[CustomerClassificationResponse])
@@ -131,8 +154,6 @@ def get_customer_classification(
         description="(Admin only) ID of client whose data to view",
     ),
 ):
-    # Note: This endpoint currently doesn't filter by client_id in the underlying function
-    # For now, we'll add the parameter but it may need backend function updates
     # Default: use logged-in user
     target_client_id = current_client.id
 
@@ -143,8 +164,10 @@ def get_customer_classification(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    # TODO: Update function_get_customer_classification to accept client_id parameter
-    response_data = function_get_customer_classification(db=db)
+    response_data = cached_response(
+        target_client_id, "customer-classification", {},
+        lambda: function_get_customer_classification(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/spending-customer-classification", response_model=List[CustomerClassificationResponse])
@@ -156,8 +179,6 @@ def get_spending_customer_classification(
         description="(Admin only) ID of client whose data to view",
     ),
 ):
-    # Note: This endpoint currently doesn't filter by client_id in the underlying function
-    # For now, we'll add the parameter but it may need backend function updates
     # Default: use logged-in user
     target_client_id = current_client.id
 
@@ -168,8 +189,10 @@ def get_spending_customer_classification(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    # TODO: Update function_get_spending_customer_classification_data to accept client_id parameter
-    response_data = function_get_spending_customer_classification_data(db=db)
+    response_data = cached_response(
+        target_client_id, "spending-customer-classification", {},
+        lambda: function_get_spending_customer_classification_data(db=db, client_id=target_client_id)
+    )
     return response_data
     
 @router.get("/full-customer-classification", response_model=List[CustomerClassificationResponse])
@@ -191,7 +214,10 @@ def get_full_customer_classification(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_full_customer_classification(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "full-customer-classification", {},
+        lambda: function_get_full_customer_classification(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/customers_with_low_churnRisk", response_model=List[CustomerClassificationResponse])
@@ -215,7 +241,10 @@ def get_customers_with_low_churnRisk(
 
     # This function calls function_get_full_customer_classification internally
     # We need to update it to accept client_id, but for now we'll filter the results
-    all_customers = function_get_full_customer_classification(db=db, client_id=target_client_id)
+    all_customers = cached_response(
+        target_client_id, "full-customer-classification", {},
+        lambda: function_get_full_customer_classification(db=db, client_id=target_client_id)
+    )
     low_churn_customers = [c for c in all_customers if c.get("churn_risk") == "Low"]
     
     return low_churn_customers
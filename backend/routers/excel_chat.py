@@ -5,17 +5,20 @@ Provides natural language query interface for Excel data
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-from database import get_db
+from typing import Optional, List, Dict, Any, Literal
+from database import get_db, SessionLocal
 from utils.auth import get_current_client
 from models import Client, UploadedFile
 from excel_chat.query_engine import ExcelQueryEngine
+from utils.streaming import stream_response
 
 router = APIRouter()
 
 class ExcelChatRequest(BaseModel):
     question: str
     file_id: Optional[int] = None
+    mode: Literal["code", "plan"] = "code"
+    stream: Optional[Literal["ndjson", "sse"]] = None
 
 class ExcelChatResponse(BaseModel):
     answer: str
@@ -38,7 +41,27 @@ def query_excel_data(
     - "What's the total revenue in December?"
     - "Which products sold the most last month?"
     - "How many orders do I have?"
+
+    mode="plan" answers through a validated JSON query plan instead of
+    generated pandas code; plan results are cached per file and plan.
+
+    stream="ndjson" or "sse" streams the answer instead: the generated code
+    first, then row batches, then a final "end" event with the explanation.
     """
+    if request.stream:
+        # The request session may be closed before the body is sent, so the stream owns its own
+        stream_db = SessionLocal()
+        engine = ExcelQueryEngine(
+            db=stream_db,
+            client=current_client,
+            file_id=request.file_id
+        )
+        return stream_response(
+            engine.stream_query(request.question, mode=request.mode),
+            request.stream,
+            on_close=stream_db.close
+        )
+    
     try:
         # Initialize query engine
         engine = ExcelQueryEngine(
@@ -48,7 +71,7 @@ def query_excel_data(
         )
         
         # Process query
-        result = engine.query(request.question)
+        result = engine.query(request.question, mode=request.mode)
         
         if result.get("error"):
             return ExcelChatResponse(
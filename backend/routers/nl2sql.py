@@ -1,14 +1,14 @@
 # backend/routers/nl2sql_router.py
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
+from typing import Literal, Optional
 from dotenv import load_dotenv
 from pathlib import Path
 import os
 import models
-from nl2sql import NL2SQL
 import numpy as np
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, SessionLocal
 from models import Client
 from utils.subscription import require_feature
 from utils.auth import get_current_client
@@ -19,12 +19,8 @@ from models import UploadedFile
 env_path = Path(__file__).resolve().parents[1] / ".env"
 load_dotenv(dotenv_path=env_path)
 
-# Initialize NL2SQL once
-nl2sql = NL2SQL(
-    database_url=os.getenv("DATABASE_URL"),
-    llm_provider="openai",
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+from sql_chat.query_engine import TenantSQLQueryEngine, UnsafeQueryError, QueryTooExpensiveError
+from utils.streaming import stream_response
 
 router = APIRouter()
 
@@ -54,6 +50,7 @@ def to_python(obj):
 # Pydantic model for input
 class QueryRequest(BaseModel):
     question: str
+    stream: Optional[Literal["ndjson", "sse"]] = None
 
 @router.post("/nl2sql")
 def get_sql_result(
@@ -65,18 +62,28 @@ def get_sql_result(
     Execute natural language query against the database.
     
     Requires: Starter Plan, Pro Plan, or All Unlimited Plan subscription.
+
+    Queries only see the current client's orders, customers, addresses,
+    order items and products. Generated SQL is cached per client and question.
+
+    stream="ndjson" or "sse" streams the SQL first and then the rows in batches.
     """
-    try:
-        result = nl2sql.ask(request.question)
+    if request.stream:
+        # The request session may be closed before the body is sent, so the stream owns its own
+        stream_db = SessionLocal()
+        engine = TenantSQLQueryEngine(db=stream_db, client=current_client)
+        return stream_response(engine.stream(request.question), request.stream, on_close=stream_db.close)
 
-        print("🔍 Raw nl2sql result:", result)
-        print("🔍 Types in results:", {k: type(v) for k, v in result.items()})
-        # print(f"🔍 Client ID: {current_client.id}")
+    try:
+        engine = TenantSQLQueryEngine(db=db, client=current_client)
+        result = engine.ask(request.question)
 
         return {
             "sql_query": result["sql_query"],
             "results": to_python(result["results"])
         }
+    except (UnsafeQueryError, QueryTooExpensiveError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+import hashlib
+from datetime import date
+import json
 from typing import List
 from typing import Optional
 from database import get_db
 from models import Order, Customer, Client  # Assuming Customer model is imported
 from orders.operation_helper import *
 from utils.auth import get_current_client
+from utils.response_cache import cached_response
 
 router = APIRouter()
 
@@ -28,7 +33,10 @@ def get_latest_orders(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = get_latest_orders_dashboard(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "latest-orders", {},
+        lambda: get_latest_orders_dashboard(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/total-orders-count", response_model = List[dict])
@@ -50,7 +58,10 @@ def get_total_orders_count(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_total_orders_count(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "total-orders-count", {},
+        lambda: function_get_total_orders_count(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/total-sales", response_model = List[dict])
@@ -72,7 +83,10 @@ def get_total_sales(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_total_sales(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "total-sales", {},
+        lambda: function_get_total_sales(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/aov", response_model = List[dict])
@@ -94,7 +108,10 @@ def get_average_order_value(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_average_order_value(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "aov", {},
+        lambda: function_get_average_order_value(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/total-customers", response_model = List[dict])
@@ -116,7 +133,10 @@ def get_total_customers_count(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_total_customers_count(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "total-customers", {},
+        lambda: function_get_total_customers_count(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/top-customers", response_model=List[dict])
@@ -138,11 +158,15 @@ def get_top_customers(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_top_customers(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "top-customers", {},
+        lambda: function_get_top_customers(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/sales-comparison")
 def get_sales_comparison(
+    period: str = Query("month", description="Comparison period: week, month, quarter or year"),
     db: Session = Depends(get_db), 
     current_client: Client = Depends(get_current_client),
     client_id: int | None = Query(
@@ -160,9 +184,55 @@ def get_sales_comparison(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_sales_comparison(db=db, client_id=target_client_id)
+    if period not in COMPARISON_PERIODS:
+        raise HTTPException(status_code=400, detail=f"Invalid period. Use one of: {', '.join(COMPARISON_PERIODS)}")
+
+    response_data = cached_response(
+        target_client_id, "sales-comparison", {"today": date.today(), "period": period},
+        lambda: function_get_sales_comparison(db=db, client_id=target_client_id, period=period)
+    )
     return response_data
 
+@router.get("/dashboard/summary")
+def get_dashboard_summary(
+    request: Request,
+    db: Session = Depends(get_db), 
+    current_client: Client = Depends(get_current_client),
+    client_id: int | None = Query(
+        None,
+        description="(Admin only) ID of client whose data to view",
+    ),
+):
+    """
+    All main-dashboard KPIs (orders count, sales, AOV, customers, top customers,
+    latest orders, sales comparison) computed in one SQL pass.
+    Each key has the same shape as the corresponding standalone endpoint.
+    Returns an ETag; a matching If-None-Match gets 304 Not Modified.
+    """
+    # Default: use logged-in user
+    target_client_id = current_client.id
+
+    # If admin and client_id is provided, override
+    if getattr(current_client, "user_type", None) == "admin" and client_id is not None:
+        target_client = db.query(Client).filter(Client.id == client_id).first()
+        if not target_client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        target_client_id = target_client.id
+
+    response_data = cached_response(
+        target_client_id, "dashboard-summary", {"today": date.today()},
+        lambda: function_get_dashboard_summary(db=db, client_id=target_client_id)
+    )
+
+    body = json.dumps(response_data, sort_keys=True, separators=(",", ":"), default=str)
+    etag = f'W/"{hashlib.sha1(f"{target_client_id}:{body}".encode("utf-8")).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=response_data, headers=headers)
+
 @router.get("/orders-in-range", response_model = List[dict])
 def get_orders_in_range(
     start_date: str, 
@@ -185,11 +255,21 @@ def get_orders_in_range(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_orders_in_range(db=db, start_date=start_date, end_date=end_date, granularity=granularity, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "orders-in-range", {"start_date": start_date, "end_date": end_date, "granularity": granularity},
+        lambda: function_get_orders_in_range(db=db, start_date=start_date, end_date=end_date, granularity=granularity, client_id=target_client_id)
+    )
     return response_data
 
-@router.get("/orders-data", response_model = List[dict])
+@router.get("/orders-data")
 def get_orders_data(
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    status: Optional[str] = Query(None, description="Comma-separated statuses, e.g. completed,processing"),
+    start_date: Optional[date] = Query(None, description="Orders created on or after this date"),
+    end_date: Optional[date] = Query(None, description="Orders created on or before this date"),
+    referrer: Optional[str] = Query(None, description="Substring of the attribution referrer"),
+    include_total: bool = Query(False, description="Also count all matching orders"),
     db: Session = Depends(get_db), 
     current_client = Depends(get_current_client),
     client_id: int | None = Query(
@@ -197,6 +277,11 @@ def get_orders_data(
         description="(Admin only) ID of client whose data to view",
     ),
 ):
+    """
+    Keyset-paginated orders list, newest first.
+    Returns {"orders", "next_cursor", "has_more", "total"}; total is only
+    computed when include_total=true.
+    """
     # Default: use logged-in user
     target_client_id = current_client.id
 
@@ -207,11 +292,29 @@ def get_orders_data(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_orders_data(db=db, client_id=target_client_id)
+    filters = {
+        "limit": limit,
+        "cursor": cursor,
+        "status": [s.strip() for s in status.split(",") if s.strip()] if status else None,
+        "start_date": start_date,
+        "end_date": end_date,
+        "referrer": referrer,
+        "include_total": include_total,
+    }
+
+    try:
+        response_data = cached_response(
+            target_client_id, "orders-data", filters,
+            lambda: function_get_orders_data(db=db, client_id=target_client_id, **filters)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return response_data
 
 @router.get("/attribution-summary", response_model = List[dict])
 def get_attribution_summary_data(
+    start_date: Optional[date] = Query(None, description="Only orders created on or after this date"),
+    end_date: Optional[date] = Query(None, description="Only orders created on or before this date"),
     db: Session = Depends(get_db), 
     current_client = Depends(get_current_client),
     client_id: int | None = Query(
@@ -229,7 +332,12 @@ def get_attribution_summary_data(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_attribution_summary(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "attribution-summary", {"start_date": start_date, "end_date": end_date},
+        lambda: function_get_attribution_summary(
+            db=db, client_id=target_client_id, start_date=start_date, end_date=end_date
+        )
+    )
     return response_data
 
 @router.get("/orders-by-location", response_model = List[dict])
@@ -251,9 +359,10 @@ def get_orders_by_location(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    # Note: This endpoint may need to be updated to accept client_id in the underlying function
-    # TODO: Update function_get_orders_by_location to accept client_id parameter
-    response_data = function_get_orders_by_location(db=db)
+    response_data = cached_response(
+        target_client_id, "orders-by-location", {},
+        lambda: function_get_orders_by_location(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/orders-by-city", response_model = List[dict])
@@ -275,7 +384,8 @@ def get_orders_by_city(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    # Note: This endpoint may need to be updated to accept client_id in the underlying function
-    # TODO: Update function_get_orders_orderid_city to accept client_id parameter
-    response_data = function_get_orders_orderid_city(db=db)
+    response_data = cached_response(
+        target_client_id, "orders-by-city", {},
+        lambda: function_get_orders_orderid_city(db=db, client_id=target_client_id)
+    )
     return response_data
\ No newline at end of file
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from schemas import ProductSchema
 from database import get_db
 from models import *  # Assuming Customer model is imported
 from products.operation_helper import *
 from utils.auth import get_current_client
+from utils.response_cache import cached_response
 
 router = APIRouter()
 
@@ -28,7 +29,10 @@ def get_top_selling_products(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_top_selling_products(db=db, client_id=target_client_id)
+    response_data = cached_response(
+        target_client_id, "top-selling-products", {},
+        lambda: function_get_top_selling_products(db=db, client_id=target_client_id)
+    )
     return response_data
 
 @router.get("/top-products-inbetween", response_model=List[dict])
@@ -52,7 +56,10 @@ def get_top_selling_products_inbetween(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_top_selling_products_inbetween(db=db, client_id=target_client_id, start_date=start_date, end_date=end_date)
+    response_data = cached_response(
+        target_client_id, "top-products-inbetween", {"start_date": start_date, "end_date": end_date},
+        lambda: function_get_top_selling_products_inbetween(db=db, client_id=target_client_id, start_date=start_date, end_date=end_date)
+    )
     return response_data
 
 @router.get("/products-sales-table", response_model=List[dict]) 
@@ -76,11 +83,18 @@ def get_products_sales_table(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_products_sales_table(db=db, client_id=target_client_id, start_date=start_date, end_date=end_date) 
+    response_data = cached_response(
+        target_client_id, "products-sales-table", {"start_date": start_date, "end_date": end_date},
+        lambda: function_get_products_sales_table(db=db, client_id=target_client_id, start_date=start_date, end_date=end_date)
+    )
     return response_data
 
-@router.get("/products-table", response_model=List[ProductSchema])
+@router.get("/products-table")
 def get_products_table(
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    search: Optional[str] = Query(None, description="Substring of the product name"),
+    include_total: bool = Query(False, description="Also count all matching products"),
     db: Session = Depends(get_db),
     current_client = Depends(get_current_client),
     client_id: int | None = Query(
@@ -88,6 +102,11 @@ def get_products_table(
         description="(Admin only) ID of client whose data to view",
     ),
 ):
+    """
+    Keyset-paginated, searchable products list of the client, newest first.
+    Returns {"products", "next_cursor", "has_more", "total"}; total is only
+    computed when include_total=true.
+    """
     # Default: use logged-in user
     target_client_id = current_client.id
 
@@ -98,9 +117,16 @@ def get_products_table(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    # Note: This endpoint may need to be updated to accept client_id in the underlying function
-    # TODO: Update function_get_products_table to accept client_id parameter
-    response_data = function_get_products_table(db)
+    filters = {
+        "limit": limit,
+        "cursor": cursor,
+        "search": search,
+        "include_total": include_total,
+    }
+    response_data = cached_response(
+        target_client_id, "products-table", filters,
+        lambda: function_get_products_table(db, client_id=target_client_id, **filters)
+    )
     return response_data
 
 @router.get("/product-details/{id}", response_model=List[ProductSchema])
@@ -123,9 +149,38 @@ def get_product_details(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    # Note: This endpoint may need to verify product belongs to target client
-    # TODO: Update function_get_product_details to accept client_id parameter or verify ownership
-    response_data = function_get_product_details(db, id)
+    response_data = function_get_product_details(db, id, client_id=target_client_id)
+    return response_data
+
+@router.get("/product-details/{id}/bought-together", response_model=List[dict])
+def get_product_bought_together(
+    id: int,
+    limit: int = Query(10, ge=1, le=10, description="Number of products to return"),
+    db: Session = Depends(get_db),
+    current_client = Depends(get_current_client),
+    client_id: int | None = Query(
+        None,
+        description="(Admin only) ID of client whose data to view",
+    ),
+):
+    """
+    Products most often bought in the same order as this one ("customers who bought X
+    also bought Y"), strongest first, from the precomputed product_affinities index.
+    """
+    # Default: use logged-in user
+    target_client_id = current_client.id
+
+    # If admin and client_id is provided, override
+    if getattr(current_client, "user_type", None) == "admin" and client_id is not None:
+        target_client = db.query(Client).filter(Client.id == client_id).first()
+        if not target_client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        target_client_id = target_client.id
+
+    response_data = cached_response(
+        target_client_id, "product-bought-together", {"id": id, "limit": limit},
+        lambda: function_get_bought_together(db, id, client_id=target_client_id, limit=limit)
+    )
     return response_data
 
 @router.get("/product-sales-over-time", response_model=List[Dict[str, Any]])
@@ -150,12 +205,16 @@ def get_product_sales_over_time(
             raise HTTPException(status_code=404, detail="Client not found")
         target_client_id = target_client.id
 
-    response_data = function_get_sales_over_time(
-        db=db, 
-        product_id=product_id, 
-        start_date=start_date, 
-        end_date=end_date,
-        client_id=target_client_id
+    response_data = cached_response(
+        target_client_id, "product-sales-over-time",
+        {"product_id": product_id, "start_date": start_date, "end_date": end_date},
+        lambda: function_get_sales_over_time(
+            db=db, 
+            product_id=product_id, 
+            start_date=start_date, 
+            end_date=end_date,
+            client_id=target_client_id
+        )
     )
     return response_data
 
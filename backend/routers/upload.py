@@ -213,7 +213,8 @@ def auto_map_columns(
         ai_mappings = mapper.auto_map_file(
             db=db,
             file_id=file_id,
-            analysis_types=["customer", "order", "product"]
+            analysis_types=["customer", "order", "product"],
+            client_id=current_client.id
         )
         
         # Format for response
@@ -233,7 +234,7 @@ def auto_map_columns(
                                 canonical_field=canonical_field,
                                 excel_column=mapping_data["excel_column"],
                                 confidence=mapping_data.get("confidence", 0.5),
-                                suggested_by="ai"
+                                suggested_by=mapping_data.get("suggested_by", "ai")
                             )
                         )
         
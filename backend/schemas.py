@@ -112,6 +112,10 @@ class CustomerDetailsResponse(BaseModel):
     orders: List[OrderDetail]
     top_products: List[ProductSummary]
     all_products_summary: List[ProductSummary]
+    # Order pagination (WooCommerce customers); Excel details return all orders
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    total_orders: Optional[int] = None
 
 class WhatsAppCredentialsInput(BaseModel):
     phoneNumberId: Optional[str]
@@ -0,0 +1 @@
+# SQL Chat Module
@@ -0,0 +1,305 @@
+"""
+Tenant-scoped NL2SQL Query Engine
+Translates natural language questions to SQL over a curated, per-client
+view set, with SQL caching, EXPLAIN cost gating, statement timeout and row limit
+"""
+import os
+import re
+import json
+import hashlib
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from openai import OpenAI
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import Client
+from utils.redis_lock import redis_client
+from sql_chat.sql_guard import UnsafeQueryError, validate_read_only_sql
+
+STATEMENT_TIMEOUT_MS = int(os.getenv("NL2SQL_STATEMENT_TIMEOUT_MS", "5000"))
+MAX_ROWS = int(os.getenv("NL2SQL_MAX_ROWS", "500"))
+STREAM_MAX_ROWS = int(os.getenv("NL2SQL_STREAM_MAX_ROWS", "10000"))
+MAX_PLAN_COST = float(os.getenv("NL2SQL_MAX_PLAN_COST", "200000"))
+SQL_CACHE_TTL = int(os.getenv("NL2SQL_SQL_CACHE_TTL", str(60 * 60 * 24)))
+
+# --------------------------
+# Curated per-tenant views
+# --------------------------
+# Each view lives in the nl2sql schema (migration c2a7e5f9d814) and is filtered by the
+# transaction-local nl2sql.client_id setting. Generated SQL runs as nl2sql_reader, which
+# can only read these views, with search_path = nl2sql.
+
+TENANT_VIEWS = {
+    "customers": {
+        "columns": {
+            "id": "integer, primary key",
+            "first_name": "text",
+            "last_name": "text",
+            "email": "text",
+            "phone": "text",
+        },
+        "keywords": ["customer", "client", "buyer", "phone", "email", "name", "who"],
+    },
+    "addresses": {
+        "columns": {
+            "id": "integer, primary key",
+            "customer_id": "integer, references customers.id",
+            "address_1": "text",
+            "address_2": "text",
+            "city": "text (area name, Arabic or English)",
+            "state": "text",
+            "country": "text (ISO code, e.g. KW)",
+            "governorate": "text, one of Capital, Hawalli, Farwaniya, Ahmadi, Jahra, Mubarak Al-Kabeer; NULL if unknown",
+            "area": "text, normalized English area name, NULL if unknown",
+        },
+        "keywords": ["city", "area", "address", "location", "governorate", "where", "country"],
+    },
+    "orders": {
+        "columns": {
+            "id": "integer, primary key",
+            "external_id": "bigint, WooCommerce order number",
+            "customer_id": "integer, references customers.id",
+            "status": "text (completed, processing, cancelled, failed, on-hold, ...)",
+            "total_amount": "numeric, order total in KWD",
+            "created_at": "timestamp",
+            "payment_method": "text",
+            "attribution_referrer": "text, referring URL",
+            "attribution_channel": "text, marketing channel (google, instagram, facebook, knet, linktree, Unknown or the referring domain)",
+            "device_type": "text",
+        },
+        "keywords": [],  # always exposed
+    },
+    "order_items": {
+        "columns": {
+            "id": "integer, primary key",
+            "order_id": "integer, references orders.id",
+            "product_id": "bigint, WooCommerce product id, matches products.external_id",
+            "product_name": "text",
+            "quantity": "integer",
+            "price": "numeric, unit price",
+        },
+        "keywords": ["product", "item", "sold", "selling", "seller", "quantity", "unit", "sku", "basket"],
+    },
+    "products": {
+        "columns": {
+            "id": "integer, primary key",
+            "external_id": "bigint, WooCommerce product id",
+            "name": "text",
+            "regular_price": "numeric",
+            "sales_price": "numeric",
+            "categories": "text, comma separated",
+            "stock_status": "text",
+        },
+        "keywords": ["product", "category", "categories", "stock", "price", "catalog", "catalogue"],
+    },
+}
+
+class QueryTooExpensiveError(ValueError):
+    """Raised when the planner's estimated cost exceeds MAX_PLAN_COST"""
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and strip trailing punctuation"""
+    normalized = re.sub(r"\s+", " ", (question or "").strip().lower())
+    return normalized.rstrip("?.!؟ ")
+
+
+def prune_views(question: str) -> List[str]:
+    """Pick the views relevant to a question; orders are always included"""
+    normalized = normalize_question(question)
+    selected = [
+        name for name, view in TENANT_VIEWS.items()
+        if not view["keywords"] or any(k in normalized for k in view["keywords"])
+    ]
+    # order_items is the only path from orders to products
+    if "products" in selected and "order_items" not in selected:
+        selected.append("order_items")
+    return [name for name in TENANT_VIEWS if name in selected]
+
+
+def describe_views(view_names: List[str]) -> str:
+    lines = []
+    for name in view_names:
+        cols = ", ".join(f"{col} ({desc})" for col, desc in TENANT_VIEWS[name]["columns"].items())
+        lines.append(f"- {name}: {cols}")
+    return "\n".join(lines)
+
+
+def validate_sql(sql: str) -> str:
+    """
+    Make sure the generated SQL is a single SELECT over the curated views.
+
+    Raises:
+        UnsafeQueryError: if the statement could modify data or escape the tenant scope.
+    """
+    return validate_read_only_sql(sql, TENANT_VIEWS)
+
+
+def build_scoped_sql(sql: str) -> str:
+    """Wrap validated SQL with the row limit; table names resolve to the nl2sql views"""
+    # Escape colons in generated SQL so text() does not treat them as bind params
+    escaped = re.sub(r"(?<!\\):", r"\\:", sql)
+    return f"SELECT * FROM (\n{escaped}\n) AS nl2sql_result LIMIT :row_limit"
+
+
+class TenantSQLQueryEngine:
+    def __init__(self, db: Session, client: Client, model: str = "gpt-4o-mini"):
+        self.db = db
+        self.client = client
+        # Read once: the session is rolled back before execution, expiring ORM objects
+        self.client_id = client.id
+        self.model = model
+        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    # --------------------------
+    # SQL generation + cache
+    # --------------------------
+
+    def _cache_key(self, question: str) -> str:
+        digest = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+        return f"nl2sql:sql:{self.client_id}:{digest}"
+
+    def get_cached_sql(self, question: str) -> Optional[str]:
+        try:
+            return redis_client.get(self._cache_key(question))
+        except Exception as e:
+            print(f"⚠️ NL2SQL cache read failed: {e}")
+            return None
+
+    def cache_sql(self, question: str, sql: str) -> None:
+        try:
+            redis_client.set(self._cache_key(question), sql, ex=SQL_CACHE_TTL)
+        except Exception as e:
+            print(f"⚠️ NL2SQL cache write failed: {e}")
+
+    def generate_sql(self, question: str) -> str:
+        """Ask the LLM for a PostgreSQL query over the pruned view set"""
+        view_names = prune_views(question)
+
+        system_prompt = """You translate questions about an online store into a single PostgreSQL SELECT query.
+
+Rules:
+1. Use ONLY the tables and columns listed; they are already filtered to the current store
+2. Return ONLY the SQL (no explanations, no markdown)
+3. Never modify data; one statement only, no comments
+4. Alias aggregated columns with descriptive names
+5. Revenue means SUM(orders.total_amount) over orders with status 'completed' unless asked otherwise
+6. Limit results to a reasonable size (top 10-50 rows unless specified otherwise)"""
+
+        user_prompt = f"""Tables:
+{describe_views(view_names)}
+
+Question: "{question}"
+
+SQL:"""
+
+        response = self.openai_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0,
+            max_tokens=500
+        )
+
+        sql = response.choices[0].message.content.strip()
+        sql = re.sub(r"```sql\n?", "", sql)
+        sql = re.sub(r"```\n?", "", sql)
+        return validate_sql(sql)
+
+    # --------------------------
+    # Execution
+    # --------------------------
+
+    def _explain_cost(self, scoped_sql: str, params: Dict[str, Any]) -> float:
+        plan = self.db.execute(text(f"EXPLAIN (FORMAT JSON) {scoped_sql}"), params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return float(plan[0]["Plan"]["Total Cost"])
+
+    def iter_sql(self, sql: str, row_limit: int = MAX_ROWS, batch_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Run validated SQL inside a read-only transaction with a statement timeout,
+        rejecting plans whose estimated cost exceeds MAX_PLAN_COST, and yield rows
+        in batches from a server-side cursor.
+        The query runs as nl2sql_reader with search_path = nl2sql, so it can only
+        read the curated views, which only return rows of nl2sql.client_id.
+        """
+        scoped_sql = build_scoped_sql(sql)
+        params = {"row_limit": row_limit}
+
+        # SET TRANSACTION must be the first statement of a fresh transaction
+        self.db.rollback()
+        try:
+            self.db.execute(text("SET TRANSACTION READ ONLY"))
+            self.db.execute(text(f"SET LOCAL statement_timeout = {int(STATEMENT_TIMEOUT_MS)}"))
+            self.db.execute(text("SET LOCAL search_path = nl2sql"))
+            self.db.execute(
+                text("SELECT set_config('nl2sql.client_id', :client_id, true)"),
+                {"client_id": str(self.client_id)},
+            )
+            self.db.execute(text("SET LOCAL ROLE nl2sql_reader"))
+
+            cost = self._explain_cost(scoped_sql, params)
+            if cost > MAX_PLAN_COST:
+                raise QueryTooExpensiveError(
+                    f"Query is too expensive to run (estimated cost {cost:.0f} > {MAX_PLAN_COST:.0f}). "
+                    "Try narrowing it down, e.g. to a date range."
+                )
+
+            result = self.db.execute(
+                text(scoped_sql), params, execution_options={"stream_results": True}
+            )
+            columns = list(result.keys())
+            for partition in result.partitions(batch_size):
+                yield [dict(zip(columns, row)) for row in partition]
+        finally:
+            # Discard the read-only/timeout/role settings with the transaction
+            self.db.rollback()
+
+    def execute_sql(self, sql: str) -> List[Dict[str, Any]]:
+        """Run validated SQL and return up to MAX_ROWS rows"""
+        return [row for batch in self.iter_sql(sql) for row in batch]
+
+    def resolve_sql(self, question: str) -> Tuple[str, bool]:
+        """Return (sql, cached): cached SQL is re-validated, new SQL is generated"""
+        sql = self.get_cached_sql(question)
+        if sql is None:
+            return self.generate_sql(question), False
+        return validate_sql(sql), True
+
+    def ask(self, question: str) -> Dict[str, Any]:
+        """Main method: returns {"sql_query", "results", "cached"}"""
+        sql, cached = self.resolve_sql(question)
+        results = self.execute_sql(sql)
+
+        if not cached:
+            self.cache_sql(question, sql)
+
+        return {
+            "sql_query": sql,
+            "results": results,
+            "cached": cached,
+        }
+
+    def stream(self, question: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of ask(): yields a "meta" event with the SQL first,
+        then "rows" batches (up to STREAM_MAX_ROWS), then "end".
+        """
+        sql, cached = self.resolve_sql(question)
+        yield {"type": "meta", "question": question, "sql_query": sql, "cached": cached}
+
+        row_count = 0
+        columns = None
+        for batch in self.iter_sql(sql, row_limit=STREAM_MAX_ROWS, batch_size=batch_size):
+            if columns is None and batch:
+                columns = list(batch[0].keys())
+            row_count += len(batch)
+            yield {"type": "rows", "rows": batch}
+
+        # Only cache SQL that actually ran
+        if not cached:
+            self.cache_sql(question, sql)
+
+        yield {"type": "end", "row_count": row_count, "columns": columns or []}
@@ -0,0 +1,100 @@
+"""
+Static checks on generated SQL before it runs against the tenant views.
+
+The statement is parsed with sqlglot (PostgreSQL dialect) and every table reference, in
+every scope (comma joins, subqueries, CTE bodies, set operations), must resolve either to a
+curated view or to a CTE visible from that scope. Quoted and schema-qualified names are
+rejected, as is any function sqlglot does not model unless it is in ALLOWED_FUNCTIONS.
+Execution additionally runs as the nl2sql_reader role, which can only read the nl2sql views.
+"""
+from typing import Iterable
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+from sqlglot.optimizer.scope import traverse_scope
+
+
+class UnsafeQueryError(ValueError):
+    """Raised when generated SQL is not a single read-only query over the curated views"""
+
+
+# Statements and clauses that write, lock or change session state
+FORBIDDEN_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+    exp.TruncateTable, exp.Copy, exp.Command, exp.Set, exp.Into, exp.Lock,
+    exp.Grant, exp.Revoke, exp.Transaction, exp.Commit, exp.Rollback,
+)
+
+# Functions sqlglot parses as exp.Anonymous (unknown to it) that generated SQL may use.
+# Everything else of that kind (set_config, current_setting, query_to_xml, dblink,
+# pg_read_file, pg_sleep, ...) is rejected.
+ALLOWED_FUNCTIONS = {
+    "age", "cardinality", "every", "isfinite", "json_agg", "json_build_object", "jsonb_agg",
+    "jsonb_build_object", "make_date", "make_interval", "make_timestamp", "octet_length", "to_jsonb",
+}
+
+# Set-returning functions allowed in FROM; unnest() is parsed as exp.Unnest rather than a table
+SET_RETURNING_FUNCTIONS = (exp.GenerateSeries, exp.ExplodingGenerateSeries)
+
+
+def _function_name(node: exp.Func) -> str:
+    return (node.name if isinstance(node, exp.Anonymous) else node.sql_name()).lower()
+
+
+def validate_read_only_sql(sql: str, tables: Iterable[str]) -> str:
+    """
+    Make sure the generated SQL is a single SELECT that only reads the given tables.
+
+    Returns:
+        str: The statement, stripped of surrounding whitespace and trailing semicolons.
+
+    Raises:
+        UnsafeQueryError: if the statement could modify data or read anything else.
+    """
+    cleaned = sql.strip().rstrip(";").strip()
+    if not cleaned:
+        raise UnsafeQueryError("Empty query")
+
+    try:
+        statements = [statement for statement in sqlglot.parse(cleaned, read="postgres") if statement is not None]
+    except SqlglotError as e:
+        raise UnsafeQueryError(f"Query could not be parsed: {e}")
+    if len(statements) != 1:
+        raise UnsafeQueryError("Only a single statement is allowed")
+
+    tree = statements[0]
+    if not isinstance(tree, exp.Query):
+        raise UnsafeQueryError("Only SELECT queries are allowed")
+
+    for node in tree.walk():
+        if isinstance(node, FORBIDDEN_NODES):
+            raise UnsafeQueryError(f"'{node.key.upper()}' is not allowed")
+        if isinstance(node, exp.Anonymous) and _function_name(node) not in ALLOWED_FUNCTIONS:
+            raise UnsafeQueryError(f"Function '{node.name}' is not allowed")
+
+    allowed = {name.lower() for name in tables}
+    try:
+        scopes = traverse_scope(tree)
+    except SqlglotError as e:
+        raise UnsafeQueryError(f"Query could not be analysed: {e}")
+
+    # Every scope (subquery, CTE body, union branch) lists its own table references;
+    # cte_sources only holds the CTEs visible from that scope
+    for scope in scopes:
+        for table in scope.tables:
+            if isinstance(table.this, exp.Func):
+                if not isinstance(table.this, SET_RETURNING_FUNCTIONS):
+                    raise UnsafeQueryError(f"Function '{table.this.sql('postgres')}' is not allowed in FROM")
+                continue
+            if table.args.get("db") or table.args.get("catalog"):
+                raise UnsafeQueryError(f"Schema-qualified name '{table.sql('postgres')}' is not allowed")
+            if table.name in scope.cte_sources:
+                continue
+            identifier = table.this
+            if not isinstance(identifier, exp.Identifier) or identifier.quoted:
+                raise UnsafeQueryError(f"Table '{table.sql('postgres')}' is not available")
+            if identifier.name.lower() not in allowed:
+                raise UnsafeQueryError(f"Table '{identifier.name}' is not available")
+
+    return cleaned
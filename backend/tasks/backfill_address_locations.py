@@ -0,0 +1,66 @@
+from celery import shared_task
+from datetime import datetime
+from models import Address, Customer
+from database import SessionLocal
+from utils.location_normalizer import resolve_location
+from utils.kuwait_cities import get_city_id
+from utils.response_cache import bump_data_version
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+@shared_task(name="backfill_address_locations_task")
+def backfill_address_locations_task(batch_size: int = BACKFILL_BATCH_SIZE):
+    """
+    Resolve governorate/area/coordinates/city_id for addresses stored before they
+    were resolved at write time. Walks addresses by id in batches, committing each batch.
+    Every visited address gets location_resolved_at, resolved or not, so re-runs only
+    see addresses that were never attempted.
+    """
+    db = SessionLocal()
+    last_id = 0
+    updated = 0
+
+    try:
+        while True:
+            batch = (
+                db.query(Address, Customer.client_id)
+                .join(Customer, Customer.id == Address.customer_id)
+                .filter(Address.location_resolved_at.is_(None), Address.id > last_id)
+                .order_by(Address.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+
+            affected_clients = set()
+            for address, client_id in batch:
+                location = resolve_location(
+                    address_1=address.address_1,
+                    address_2=address.address_2,
+                    city=address.city,
+                    state=address.state,
+                )
+                for field, value in location.items():
+                    setattr(address, field, value)
+                address.city_id = get_city_id(db, location["area"])
+                address.location_resolved_at = datetime.utcnow()
+                if location["governorate"]:
+                    updated += 1
+                if location["governorate"] or address.city_id:
+                    affected_clients.add(client_id)
+
+            last_id = batch[-1][0].id
+            db.commit()
+            # Location maps and customer tables of these clients are cached
+            for client_id in affected_clients:
+                bump_data_version(client_id)
+            print(f"✅ Backfilled address locations up to id {last_id} ({updated} resolved)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Address location backfill failed after id {last_id}: {e}")
+    finally:
+        db.close()
+
+    return updated
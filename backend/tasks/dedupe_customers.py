@@ -0,0 +1,52 @@
+from celery import shared_task
+from database import SessionLocal
+from models import Client
+from customers.db_helper import dedupe_customers_data
+from cohorts.db_helper import refresh_cohort_stats_data
+from utils.redis_lock import acquire_sync_lock, release_sync_lock
+from utils.response_cache import bump_data_version
+
+
+@shared_task(name="dedupe_customers_task")
+def dedupe_customers_task(client_id: int):
+    """
+    Merge a client's customers sharing a normalized phone or email and rebuild its identity index.
+    Holds the client's sync lock so no order sync creates customers meanwhile.
+    """
+    if not acquire_sync_lock(client_id, timeout=300):
+        print(f"⚠️ Sync in progress for client {client_id}. Skipping customer dedupe.")
+        return
+
+    db = SessionLocal()
+
+    try:
+        merged = dedupe_customers_data(db, client_id)
+        if merged:
+            # Merged customers can move to an earlier cohort
+            refresh_cohort_stats_data(db, client_id)
+        db.commit()
+        if merged:
+            bump_data_version(client_id)
+        print(f"✅ Merged {merged} duplicate customer(s) for client {client_id}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Customer dedupe failed for client {client_id}: {e}")
+    finally:
+        db.close()
+        release_sync_lock(client_id)
+
+
+@shared_task(name="dedupe_all_clients_customers_task")
+def dedupe_all_clients_customers_task():
+    """
+    Scheduled dedupe: enqueue one dedupe per client.
+    """
+    db = SessionLocal()
+    try:
+        client_ids = [row.id for row in db.query(Client.id).all()]
+    finally:
+        db.close()
+
+    for client_id in client_ids:
+        dedupe_customers_task.apply_async(kwargs={"client_id": client_id}, priority=9)
+    print(f"🔄 Enqueued customer dedupe for {len(client_ids)} client(s)")
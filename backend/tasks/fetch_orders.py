@@ -1,7 +1,7 @@
 import httpx
 import os
 from sqlalchemy.orm import Session
-from models import Customer, Address, Order, OrderItem, Product, SyncState
+from models import Customer, Address, Order, OrderItem, SyncState
 from tasks.send_whatsapp import send_whatsapp_template
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
@@ -14,6 +14,19 @@ from models import Client
 from fastapi import Depends, HTTPException, Header
 from jose import jwt, JWTError
 from utils.redis_lock import acquire_sync_lock, release_sync_lock
+from utils.response_cache import bump_data_version
+from utils.location_normalizer import resolve_location
+from utils.kuwait_cities import get_city_id
+from utils.referrer_channels import classify_referrer
+from orders.db_helper import refresh_channel_rollup_data
+from products.db_helper import refresh_product_rollup_data
+from cohorts.db_helper import refresh_cohort_stats_data
+from tasks.product_affinity import update_product_affinity_task
+from customers.db_helper import (
+    CLASSIFIED_ORDER_STATUSES, record_customer_order_features, refresh_customer_features_data,
+    find_customer_by_identity, record_customer_identities
+)
+from utils.identity_normalizer import to_e164_phone, normalize_email
 
 load_dotenv()
 
@@ -60,31 +73,6 @@ def normalize_phone(phone: str | None) -> str | None:
         return phone
     return None
 
-def normalize_existing_phones(db: Session) -> None:
-    customers = db.query(Customer).all()
-    updated = False
-    for customer in customers:
-        original_phone = customer.phone
-        normalized_phone = normalize_phone(original_phone)
-
-        if normalized_phone != original_phone:
-            existing = (
-                db.query(Customer)
-                .filter(Customer.phone == normalized_phone)
-                .filter(Customer.id != customer.id)
-                .first()
-            )
-            if existing:
-                print(f"Skipping Customer ID {customer.id}: {original_phone} -> {normalized_phone} (conflict with Customer ID {existing.id})")
-                continue  # skip update
-
-            print(f"Updating Customer ID {customer.id}: {original_phone} -> {normalized_phone}")
-            customer.phone = normalized_phone
-            updated = True
-
-    if updated:
-        db.commit()
-
 def get_last_synced_time(db: Session) -> str:
     state = db.query(SyncState).filter_by(key="last_order_sync").first()
     return state.value if state else "2000-01-01T00:00:00Z"
@@ -101,12 +89,11 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
     email = data["billing"].get("email") or None
     raw_phone = data["billing"].get("phone") or None
     phone = normalize_phone(raw_phone)
+    identity_phone = to_e164_phone(raw_phone)
+    identity_email = normalize_email(email)
 
-    customer = None
-    if phone:
-        customer = db.query(Customer).filter_by(phone=phone).first()
-    if not customer and email:
-        customer = db.query(Customer).filter_by(email=email).first()
+    # Customers are matched within the client on normalized phone, then email
+    customer = find_customer_by_identity(db, client_id, identity_phone, identity_email)
 
     if not customer:
         customer = Customer(
@@ -119,6 +106,8 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
         db.add(customer)
         db.flush()
 
+    record_customer_identities(db, client_id, customer.id, identity_phone, identity_email)
+
     existing_address = db.query(Address).filter_by(
         customer_id=customer.id,
         address_1=data["billing"].get("address_1", ""),
@@ -127,6 +116,12 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
     ).first()
 
     if not existing_address:
+        location = resolve_location(
+            address_1=data["billing"].get("address_1"),
+            address_2=data["billing"].get("address_2"),
+            city=data["billing"].get("city"),
+            state=data["billing"].get("state"),
+        )
         address = Address(
             customer_id=customer.id,
             company=data["billing"].get("company"),
@@ -135,7 +130,10 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
             city=data["billing"].get("city"),
             state=data["billing"].get("state"),
             postcode=data["billing"].get("postcode"),
-            country=data["billing"].get("country")
+            country=data["billing"].get("country"),
+            city_id=get_city_id(db, location["area"]),
+            location_resolved_at=datetime.utcnow(),
+            **location
         )
         db.add(address)
 
@@ -147,6 +145,7 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
     if order_in_db:
         new_status = data["status"]
         updated = False
+        was_counted = order_in_db.status in CLASSIFIED_ORDER_STATUSES
 
         if order_in_db.status != new_status:
             order_in_db.status = new_status
@@ -162,6 +161,10 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
             db.flush()
             print(f"🔄 Updated order #{order_in_db.external_id} to status: {new_status}")
 
+            # Order entered or left the counted set: rebuild that customer's features
+            if order_in_db.customer_id and was_counted != (new_status in CLASSIFIED_ORDER_STATUSES):
+                refresh_customer_features_data(db, customer_ids=[order_in_db.customer_id])
+
             if customer.phone:
                 try:
                     full_name = f"{customer.first_name} {customer.last_name}".strip()
@@ -190,6 +193,7 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
         created_at=isoparse(data["date_created"]),
         payment_method=data.get("payment_method_title"),
         attribution_referrer=meta_dict.get("_wc_order_attribution_referrer"),
+        attribution_channel=classify_referrer(meta_dict.get("_wc_order_attribution_referrer")),
         session_pages=int(meta_dict.get("_wc_order_attribution_session_pages", 0)),
         session_count=int(meta_dict.get("_wc_order_attribution_session_count", 0)),
         device_type=meta_dict.get("_wc_order_attribution_device_type")
@@ -198,18 +202,19 @@ def process_order_data(db: Session, data: dict, client_id: int) -> None:
     db.flush()
 
     for item in data.get("line_items", []):
-        product = db.query(Product).filter_by(external_id=item["product_id"]).first()
-        product_id = product.external_id if product else None
-
+        # Stored as-is (0 = custom line item); products are matched per client on external_id
         order_item = OrderItem(
             order_id=order.id,
             product_name=item["name"],
-            product_id=product_id,
+            product_id=item.get("product_id") or None,
             quantity=item["quantity"],
             price=float(item["price"])
         )
         db.add(order_item)
 
+    if order.status in CLASSIFIED_ORDER_STATUSES:
+        record_customer_order_features(db, customer.id, customer.client_id, order.created_at, order.total_amount)
+
     if customer.phone:
         try:
             full_name = f"{customer.first_name} {customer.last_name}".strip()
@@ -282,6 +287,8 @@ def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
         total_orders_fetched = 0
         total_new_orders = 0
         total_updated_orders = 0
+        # Earliest order day seen this run; the cohort stats are rebuilt from its month once, after the last page
+        sync_min_day = None
 
         # Fetch orders
         while True:
@@ -319,8 +326,16 @@ def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
                         total_new_orders += 1
                     
                     process_order_data(db, order, client_id=client.id)
+
+                # Rebuild the channel and product rollups for the days this page touched
+                page_days = [isoparse(order["date_created"]).date() for order in orders]
+                refresh_channel_rollup_data(db, client.id, min(page_days), max(page_days))
+                refresh_product_rollup_data(db, client.id, min(page_days), max(page_days))
+                sync_min_day = min(page_days) if sync_min_day is None else min(sync_min_day, min(page_days))
                 
                 db.commit()
+                # New data is visible, drop this client's cached analytics
+                bump_data_version(client.id)
                 total_orders_fetched += len(orders)
             except Exception as e:
                 db.rollback()
@@ -329,6 +344,11 @@ def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
 
             page += 1
 
+        # Cumulative revenue runs forward from each cohort's first month, so one rebuild
+        # from the earliest touched month covers every page
+        if sync_min_day is not None:
+            refresh_cohort_stats_data(db, client.id, since=sync_min_day)
+
         # Update last sync timestamp
         latest_time = datetime.utcnow().isoformat() + "Z"
         if sync_state:
@@ -339,6 +359,12 @@ def fetch_orders_task(self, client_id: int = None, full_fetch: bool = False):
         # Update client's last_synced_at
         client.last_synced_at = datetime.utcnow()
         db.commit()
+        if sync_min_day is not None:
+            bump_data_version(client.id)
+
+        # Fold the new orders into the client's bought-together index
+        if total_new_orders:
+            update_product_affinity_task.apply_async(kwargs={"client_id": client.id}, priority=9)
 
         print(f"✅ Sync complete for {client.email}")
         print(f"   📊 Total processed: {total_orders_fetched} | New: {total_new_orders} | Updated: {total_updated_orders}")
@@ -6,6 +6,7 @@ from cryptography.fernet import Fernet
 from datetime import datetime
 from models import Product
 from database import SessionLocal
+from utils.response_cache import bump_data_version
 
 db: Session = SessionLocal()
 
@@ -71,7 +72,7 @@ def fetch_products_task(self, client_id: int = None):
 
             try:
                 for data in products:
-                    existing = db.query(Product).filter_by(external_id=data["id"]).first()
+                    existing = db.query(Product).filter_by(client_id=client_id, external_id=data["id"]).first()
 
                     date_created = data.get("date_created")
                     date_modified = data.get("date_modified")
@@ -97,6 +98,7 @@ def fetch_products_task(self, client_id: int = None):
                             existing.date_modified = date_modified 
                     else:
                         product = Product(
+                            client_id=client_id,
                             external_id=data["id"],
                             name=data["name"],
                             short_description=data.get("short_description"),
@@ -111,6 +113,8 @@ def fetch_products_task(self, client_id: int = None):
                         )
                         db.add(product)
                 db.commit()
+                # New data is visible, drop this client's cached analytics
+                bump_data_version(client_id)
                 print(f"✅ [{client.email}] Committed page {page}")
             except Exception as e:
                 db.rollback()
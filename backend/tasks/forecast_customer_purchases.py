@@ -0,0 +1,38 @@
+from celery import shared_task
+from database import SessionLocal
+from models import Client
+from customers.operation_helper import function_refresh_customer_forecasts
+
+
+@shared_task(name="forecast_customer_purchases_task")
+def forecast_customer_purchases_task(client_id: int):
+    """
+    Recompute the next-purchase forecasts of all customers of one client in a single batch.
+    """
+    db = SessionLocal()
+
+    try:
+        count = function_refresh_customer_forecasts(db, client_id)
+        db.commit()
+        print(f"✅ Forecasted next purchases of {count} customers for client {client_id}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Purchase forecast failed for client {client_id}: {e}")
+    finally:
+        db.close()
+
+
+@shared_task(name="forecast_all_clients_purchases_task")
+def forecast_all_clients_purchases_task():
+    """
+    Scheduled forecast: enqueue one batch per client so clients are forecast in parallel across workers.
+    """
+    db = SessionLocal()
+    try:
+        client_ids = [row.id for row in db.query(Client.id).all()]
+    finally:
+        db.close()
+
+    for client_id in client_ids:
+        forecast_customer_purchases_task.apply_async(kwargs={"client_id": client_id}, priority=9)
+    print(f"🔄 Enqueued purchase forecasts for {len(client_ids)} client(s)")
@@ -0,0 +1,46 @@
+from celery import shared_task
+from database import SessionLocal
+from models import Client
+from products.operation_helper import function_update_product_affinity
+from utils.response_cache import bump_data_version
+
+
+@shared_task(name="update_product_affinity_task")
+def update_product_affinity_task(client_id: int, full: bool = False):
+    """
+    Fold a client's new orders into its product co-occurrence matrix and refresh the
+    bought-together neighbours of their products (full=True rebuilds from all orders).
+
+    No sync lock needed: a client's orders are synced one page per transaction by a single
+    sync at a time, so uncommitted orders always have higher ids than the last_order_id
+    high-water mark can reach.
+    """
+    db = SessionLocal()
+
+    try:
+        added = function_update_product_affinity(db, client_id, full=full)
+        db.commit()
+        if added:
+            bump_data_version(client_id)
+        print(f"✅ Folded {added} order(s) into product affinity for client {client_id}{' (full rebuild)' if full else ''}")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Product affinity update failed for client {client_id}: {e}")
+    finally:
+        db.close()
+
+
+@shared_task(name="rebuild_all_product_affinity_task")
+def rebuild_all_product_affinity_task():
+    """
+    Scheduled full rebuild: enqueue one per client, dropping orders cancelled since they were counted.
+    """
+    db = SessionLocal()
+    try:
+        client_ids = [row.id for row in db.query(Client.id).all()]
+    finally:
+        db.close()
+
+    for client_id in client_ids:
+        update_product_affinity_task.apply_async(kwargs={"client_id": client_id, "full": True}, priority=9)
+    print(f"🔄 Enqueued product affinity rebuilds for {len(client_ids)} client(s)")
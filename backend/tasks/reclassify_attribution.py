@@ -0,0 +1,29 @@
+from celery import shared_task
+from database import SessionLocal
+from orders.db_helper import reclassify_attribution_channels_data
+from utils.referrer_channels import classify_referrer
+from utils.response_cache import bump_data_version
+
+
+@shared_task(name="reclassify_attribution_channels_task")
+def reclassify_attribution_channels_task(client_id: int = None):
+    """
+    Re-apply REFERRER_MAPPINGS to stored orders (all clients, or one) and rebuild
+    the daily channel rollup of every client whose channels changed.
+    """
+    db = SessionLocal()
+    # Mappings may have changed in this process too
+    classify_referrer.cache_clear()
+
+    try:
+        affected_clients = reclassify_attribution_channels_data(db, client_id=client_id)
+        db.commit()
+        for cid in affected_clients:
+            bump_data_version(cid)
+        print(f"✅ Reclassified attribution channels for {len(affected_clients)} client(s)")
+        return affected_clients
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Attribution reclassification failed: {e}")
+    finally:
+        db.close()
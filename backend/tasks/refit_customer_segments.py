@@ -0,0 +1,53 @@
+from celery import shared_task
+from datetime import datetime
+import pandas as pd
+from database import SessionLocal
+from models import CustomerSegmentModel
+from customers.db_helper import get_segment_features_data, save_segment_model_data
+from customers.operation_helper import fit_segment_model, recency_in_days
+from utils.response_cache import bump_data_version
+
+
+@shared_task(name="refit_customer_segments_task")
+def refit_customer_segments_task(client_id: int):
+    """
+    Refit a client's segment model on its current customer_features and drop its
+    cached classification so the new segments are served.
+    """
+    db = SessionLocal()
+
+    try:
+        rows = get_segment_features_data(db, client_id)
+        features = pd.DataFrame.from_records(rows, columns=["order_count", "last_order_date"])
+        features["recency_days"] = recency_in_days(pd.to_datetime(features["last_order_date"]), datetime.now())
+
+        fitted = fit_segment_model(features)
+        if fitted is None:
+            print(f"⚠️ Not enough customers to segment client {client_id}. Skipping refit.")
+            return
+
+        save_segment_model_data(db, client_id, fitted)
+        db.commit()
+        bump_data_version(client_id)
+        print(f"✅ Refitted customer segments for client {client_id} on {fitted['n_samples']} customers")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Segment refit failed for client {client_id}: {e}")
+    finally:
+        db.close()
+
+
+@shared_task(name="refit_all_customer_segments_task")
+def refit_all_customer_segments_task():
+    """
+    Scheduled refit: enqueue a refit for every client that has a segment model.
+    """
+    db = SessionLocal()
+    try:
+        client_ids = [row.client_id for row in db.query(CustomerSegmentModel.client_id).all()]
+    finally:
+        db.close()
+
+    for client_id in client_ids:
+        refit_customer_segments_task.apply_async(kwargs={"client_id": client_id}, priority=9)
+    print(f"🔄 Enqueued segment refits for {len(client_ids)} client(s)")
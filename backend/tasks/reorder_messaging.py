@@ -1,13 +1,16 @@
 import requests
 from dotenv import load_dotenv
 from database import SessionLocal
-from models import Customer
+from models import Customer, ReorderReminder
 # from tasks.reorder_messaging import send_whatsapp_reorder_reminder
 from sqlalchemy.orm import sessionmaker
-from prophet import Prophet
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from celery import shared_task
 from collections import defaultdict
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from customers.db_helper import CLASSIFIED_ORDER_STATUSES, stream_customer_class_data
+from customers.operation_helper import calculate_churn_risk, recency_in_days
+import numpy as np
 import pandas as pd
 import os
 import re
@@ -110,57 +113,38 @@ def get_customer_info(customer_id):
     finally:
         session.close()
 
-#using prophet
-
-# def predict_customers_to_remind(period_days: int = 30):
-#     """
-#     Predicts which customers are likely to reorder today.
-#     Returns a list of customer IDs.
-#     """
-#     orders_df = pd.read_sql("SELECT customer_id, created_at FROM orders", engine)
-#     print("orders_df:", orders_df)
-#     orders_df["created_at"] = pd.to_datetime(orders_df["created_at"])
-
-#     customer_forecasts = defaultdict(list)
-#     today = date.today()
-
-#     for customer_id, group in orders_df.groupby("customer_id"):
-#         order_dates = group["created_at"].sort_values()
-
-#         if len(order_dates) < 3:
-#             continue
-
-#         df = pd.DataFrame({
-#             "ds": order_dates,
-#             "y": [1] * len(order_dates)
-#         })
-#         print("df in predict:",df)
-#         model = Prophet()
-#         model.fit(df)
-
-#         future = model.make_future_dataframe(periods=period_days)
-#         forecast = model.predict(future)
-
-#         future_forecast = forecast[forecast["ds"] > order_dates.max()]
-
-#         likely_reorder = future_forecast[future_forecast["yhat"] > 0.5]
-
-#         for _, row in likely_reorder.iterrows():
-#             if row["ds"].date() == today:
-#                 customer_forecasts[customer_id].append(today)
-
-#         # # Get the most likely reorder date (highest prediction)
-#         # best_day = future_forecast.loc[future_forecast['yhat'].idxmax()]
-#         # predicted_date = best_day["ds"].date()
+#using Avearage gap prediction(AGP)
 
-#         # Remind only if that predicted date is exactly today
-#         if predicted_date == today:
-#             customer_forecasts[customer_id].append(today)
+# Classification-based cooldown periods (days between two reminders to the same customer)
+REORDER_COOLDOWN_DAYS = {
+    "Loyal": 14,
+    "Frequent": 10,
+}
+DEFAULT_REORDER_COOLDOWN_DAYS = 7
 
-#     print(f"🔮 Predicted {len(customer_forecasts)} customers to remind today.")
-#     return list(customer_forecasts.keys())
+def predict_next_order_dates(orders_df):
+    """
+    Predict each customer's next order date as last order + round(mean gap in whole days),
+    in one sort + groupby pass over all orders. Customers with fewer than 2 orders are omitted.
 
-#using Avearage gap prediction(AGP)
+    Returns:
+        Series: Predicted next order date (midnight Timestamp) indexed by customer_id.
+    """
+    orders = orders_df[["customer_id", "created_at"]].sort_values(["customer_id", "created_at"], kind="stable")
+    created_at = pd.to_datetime(orders["created_at"])
+    same_customer = orders["customer_id"].eq(orders["customer_id"].shift())
+
+    stats = (
+        pd.DataFrame({
+            "customer_id": orders["customer_id"],
+            "created_at": created_at,
+            "gap": created_at.diff().dt.days.where(same_customer),
+        })
+        .groupby("customer_id")
+        .agg(orders=("created_at", "size"), avg_gap=("gap", "mean"), last_order=("created_at", "max"))
+    )
+    stats = stats[stats["orders"] >= 2]
+    return stats["last_order"].dt.normalize() + pd.to_timedelta(np.round(stats["avg_gap"]), unit="D")
 
 def predict_customers_to_remind(df, orders_df, target_date=None, last_reminded=None):
     """
@@ -168,53 +152,76 @@ def predict_customers_to_remind(df, orders_df, target_date=None, last_reminded=N
     - Classification
     - Churn risk
     - Classification-based cooldown periods
-    """
-    today = target_date or date.today()
-    reminders = []
-    last_reminded = last_reminded or {}
 
-    # Define cooldown days for each classification
-    cooldown_days_map = {
-        "Loyal": 14,
-        "Frequent": 10,
-    }
+    Args:
+        df (DataFrame): Classified customers ('customer_id', 'classification', 'churn_risk').
+        orders_df (DataFrame): Their orders ('customer_id', 'created_at').
+        target_date (date): Day to predict for; defaults to today.
+        last_reminded (dict): customer_id -> date of the last reminder; updated in place.
 
-    for _, row in df.iterrows():
-        customer_id = row["customer_id"]
-        classification = row["classification"]
-        churn_risk = row["churn_risk"]
-        last_order_date = pd.to_datetime(row["last_order_date"]) if row["last_order_date"] else None
+    Returns:
+        tuple: (customer ids to remind, updated last_reminded)
+    """
+    today = target_date or date.today()
+    last_reminded = last_reminded if last_reminded is not None else {}
 
-        # Skip high churn or dead/no orders
-        if churn_risk == "High" or classification in ["Dead", "No Orders"]:
-            continue
+    # Only Loyal / Frequent customers that aren't at high churn risk
+    candidates = df[df["classification"].isin(list(REORDER_COOLDOWN_DAYS)) & (df["churn_risk"] != "High")]
 
-        # Loyal / Frequent → average reorder interval
-        if classification in ["Loyal", "Frequent"]:
-            # Check cooldown
-            cooldown_days = cooldown_days_map.get(classification, 7)  # default 7 if not listed
-            if customer_id in last_reminded:
-                if (today - last_reminded[customer_id]).days < cooldown_days:
-                    continue
+    # Cooldown
+    if last_reminded and not candidates.empty:
+        reminded_on = pd.to_datetime(candidates["customer_id"].map(last_reminded))
+        days_since = (pd.Timestamp(today) - reminded_on).dt.days
+        cooldown = candidates["classification"].map(REORDER_COOLDOWN_DAYS).fillna(DEFAULT_REORDER_COOLDOWN_DAYS)
+        candidates = candidates[~(days_since < cooldown)]
 
-            customer_orders = orders_df[orders_df["customer_id"] == customer_id]["created_at"].sort_values()
-            if len(customer_orders) < 2:
-                continue
-            gaps = customer_orders.diff().dropna().dt.days
-            avg_gap = gaps.mean()
-            predicted_next = customer_orders.max().date() + timedelta(days=round(avg_gap))
-            if predicted_next == today:
-                reminders.append(customer_id)
-        else:
-            continue
+    # Loyal / Frequent → average reorder interval
+    next_orders = predict_next_order_dates(orders_df[orders_df["customer_id"].isin(candidates["customer_id"])])
+    due = set(next_orders.index[next_orders == pd.Timestamp(today)])
+    reminders = [customer_id for customer_id in candidates["customer_id"].tolist() if customer_id in due]
 
     # Update last reminder date
-    for cid in reminders:
-        last_reminded[cid] = today
+    last_reminded.update(dict.fromkeys(reminders, today))
 
     print(f"📣 {len(reminders)} customers to remind on {today}")
     return reminders, last_reminded
 
+def load_customer_orders(db, customer_ids):
+    rows = db.execute(
+        text("""
+            SELECT customer_id, created_at FROM orders
+            WHERE customer_id = ANY(:customer_ids) AND status = ANY(:statuses)
+        """),
+        {"customer_ids": list(customer_ids), "statuses": list(CLASSIFIED_ORDER_STATUSES)}
+    ).all()
+    return pd.DataFrame.from_records(rows, columns=["customer_id", "created_at"])
+
+def load_last_reminded(db, customer_ids):
+    """customer_id -> date of the last reorder reminder, from reorder_reminders"""
+    rows = (
+        db.query(ReorderReminder.customer_id, ReorderReminder.last_reminded_on)
+        .filter(ReorderReminder.customer_id.in_(list(customer_ids)))
+        .all()
+    )
+    return dict(rows)
+
+def record_reminders(db, reminded, today):
+    """
+    Upsert the cooldown state of reminded customers ([(customer_id, client_id), ...]). Does not commit.
+    """
+    if not reminded:
+        return
+    db.execute(
+        text("""
+            INSERT INTO reorder_reminders (customer_id, client_id, last_reminded_on, reminders_sent)
+            VALUES (:customer_id, :client_id, :today, 1)
+            ON CONFLICT (customer_id) DO UPDATE SET
+                last_reminded_on = EXCLUDED.last_reminded_on,
+                reminders_sent = reorder_reminders.reminders_sent + 1
+        """),
+        [{"customer_id": customer_id, "client_id": client_id, "today": today} for customer_id, client_id in reminded]
+    )
+
 def send_reorder_reminders_to_customers(customer_ids: list):
     """
     Sends both English and Arabic WhatsApp reorder reminders to the given customer IDs.
@@ -256,14 +263,45 @@ def send_reorder_reminders_to_customers(customer_ids: list):
         except Exception as e:
             print(f"❌ Failed to send message(s) to {customer_id}: {e}")
 
-def run_reorder_prediction_task():
+@shared_task(name="predict_customers_task")
+def run_reorder_prediction_task(target_date=None):
     
     """
-    Combines prediction and message sending.
+    Combines prediction and message sending, for every client in one pass.
+    Loyal / Frequent customers are streamed in chunks; cooldowns are read from and
+    written to reorder_reminders.
     """
-    
-    customer_ids = predict_customers_to_remind()
-    send_reorder_reminders_to_customers(customer_ids)
-    
-    print(f"✅ Processed reorder prediction for {len(customer_ids)} customers.")
-    return f"Processed reorder prediction for {len(customer_ids)} customers."
\ No newline at end of file
+    today = target_date or date.today()
+    now = datetime.now()
+    db = SessionLocal()
+    total = 0
+
+    try:
+        for classification, customer_class in (("Loyal", "loyal"), ("Frequent", "frequent")):
+            for chunk in stream_customer_class_data(db, customer_class):
+                df = pd.DataFrame(chunk)
+                df["classification"] = classification
+                df["churn_risk"] = calculate_churn_risk(recency_in_days(pd.to_datetime(df["last_order_date"]), now))
+
+                customer_ids = df["customer_id"].tolist()
+                customer_ids_to_remind, _ = predict_customers_to_remind(
+                    df,
+                    load_customer_orders(db, customer_ids),
+                    target_date=today,
+                    last_reminded=load_last_reminded(db, customer_ids),
+                )
+                if not customer_ids_to_remind:
+                    continue
+
+                # Record the cooldown first so a crash mid-send never reminds twice
+                reminded = df[df["customer_id"].isin(customer_ids_to_remind)]
+                record_reminders(db, list(zip(reminded["customer_id"].tolist(), reminded["client_id"].tolist())), today)
+                db.commit()
+
+                send_reorder_reminders_to_customers(customer_ids_to_remind)
+                total += len(customer_ids_to_remind)
+    finally:
+        db.close()
+
+    print(f"✅ Processed reorder prediction for {total} customers.")
+    return f"Processed reorder prediction for {total} customers."
@@ -6,7 +6,7 @@ import re
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from database import get_db
-from customers.operation_helper import function_get_dead_customers
+from customers.db_helper import stream_customer_class_data
 from datetime import datetime
 
 load_dotenv()
@@ -98,60 +98,61 @@ def send_whatsapp_dead_customer_message(phone_number: str, customer_name: str, l
     response = requests.post(WHATSAPP_API_URL, headers=headers, json=payload)
     return response.status_code, response.json()
 
-def helper_function_to_sending_message_to_dead_customers(db: Session, language: str = "en"):
+def helper_function_to_sending_message_to_dead_customers(db: Session, language: str = "en", client_id: int = None):
     """
-    Fetch dead customers and send them WhatsApp messages.
+    Fetch dead customers (of one client, or of all clients) and send them WhatsApp messages.
+    Customers are streamed from the database in chunks.
     Ensures phone numbers are formatted to Kuwait standard before sending.
     Skips customers with invalid or missing numbers.
     """
-    dead_customers = function_get_dead_customers(db)
     results = []
 
-    print(f"🚀 Starting dead customer messaging at {datetime.now()} | Found {len(dead_customers)} customers")
-
-    for customer in dead_customers:
-        raw_phone = customer.get("phone")
-
-        if not raw_phone:
-            status = "Failed - No phone"
-            print(f"❌ Customer {customer['customer_id']} ({customer.get('customer_name')}) → {status}")
-            results.append({
-                "customer_id": customer["customer_id"],
-                "status": "Failed - No phone"
-            })
-            continue
-
-        # Format and validate phone
-        phone = format_kuwait_number(raw_phone)
-        if not phone or len(phone) != 11 or not phone.startswith("965"):
-            results.append({
-                "customer_id": customer["customer_id"],
-                "status": f"Failed - Invalid phone '{raw_phone}' → '{phone}'"
-            })
-            continue
-
-        try:
-            status_code, resp = send_whatsapp_dead_customer_message(
-                phone_number=phone,
-                customer_name=customer["customer_name"],
-                language=language,
-            )
-
-            if status_code == 200:
-                status = "✅ Success"
-            else:
-                status = f"Failed - {resp}"
-            print(f"📩 Sent to {customer['customer_id']} ({customer['customer_name']}) | {phone} → {status}")   
-            results.append({
-                "customer_id": customer["customer_id"],
-                "status": "Success" if status_code == 200 else f"Failed - {resp}"
-            })
-        except Exception as e:
-            status = f"❌ Failed - {str(e)}"
-            print(f"⚠️ Error sending to {customer['customer_id']} ({customer.get('customer_name')}) → {status}")
-            results.append({
-                "customer_id": customer["customer_id"],
-                "status": f"Failed - {str(e)}"
-            })
-    print(f"🏁 Finished messaging {len(dead_customers)} customers at {datetime.now()}")
-    return results
\ No newline at end of file
+    print(f"🚀 Starting dead customer messaging at {datetime.now()}")
+
+    for dead_customers in stream_customer_class_data(db, "dead", client_id=client_id):
+        for customer in dead_customers:
+            raw_phone = customer.get("phone")
+
+            if not raw_phone:
+                status = "Failed - No phone"
+                print(f"❌ Customer {customer['customer_id']} ({customer.get('customer_name')}) → {status}")
+                results.append({
+                    "customer_id": customer["customer_id"],
+                    "status": "Failed - No phone"
+                })
+                continue
+
+            # Format and validate phone
+            phone = format_kuwait_number(raw_phone)
+            if not phone or len(phone) != 11 or not phone.startswith("965"):
+                results.append({
+                    "customer_id": customer["customer_id"],
+                    "status": f"Failed - Invalid phone '{raw_phone}' → '{phone}'"
+                })
+                continue
+
+            try:
+                status_code, resp = send_whatsapp_dead_customer_message(
+                    phone_number=phone,
+                    customer_name=customer["customer_name"],
+                    language=language,
+                )
+
+                if status_code == 200:
+                    status = "✅ Success"
+                else:
+                    status = f"Failed - {resp}"
+                print(f"📩 Sent to {customer['customer_id']} ({customer['customer_name']}) | {phone} → {status}")
+                results.append({
+                    "customer_id": customer["customer_id"],
+                    "status": "Success" if status_code == 200 else f"Failed - {resp}"
+                })
+            except Exception as e:
+                status = f"❌ Failed - {str(e)}"
+                print(f"⚠️ Error sending to {customer['customer_id']} ({customer.get('customer_name')}) → {status}")
+                results.append({
+                    "customer_id": customer["customer_id"],
+                    "status": f"Failed - {str(e)}"
+                })
+    print(f"🏁 Finished messaging {len(results)} customers at {datetime.now()}")
+    return results
@@ -5,9 +5,8 @@ import requests
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from database import get_db
-from customers.operation_helper import function_get_customers_with_low_churnRisk
-# from AI.db_helper import fetch_order_data
-# from AI.operation_helper import forecast_customer_purchases
+from customers.db_helper import stream_customer_class_data, get_forecasts_due_data
+from products.db_helper import get_cross_sell_suggestions_data
 
 load_dotenv()
 
@@ -19,28 +18,37 @@ WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{PHONE_NUMBER_ID}/messages
 # LANGUAGE_CODE = "en_US"
 
 def helper_function_to_sending_message_to_low_churn_risk_customers(db: Session):
-    low_churn_customers = function_get_customers_with_low_churnRisk(db)
-    all_forecasts = []
-
-    for customer in low_churn_customers:
-        customer_id = customer["customer_id"]
-        df_orders = fetch_order_data(db, customer_id)
-
-        forecast_df = forecast_customer_purchases(df_orders, customer_id)
-        if forecast_df is not None:
-            # Merge customer info so we can send later without re-fetching
-            forecast_df["customer_name"] = customer["customer_name"]
-            forecast_df["phone"] = customer["phone"]
-            all_forecasts.append(forecast_df)
+    """
+    Low-churn customers whose forecast next purchase (customer_forecasts, computed by
+    forecast_all_clients_purchases_task) falls on today, with a bought-together product
+    to offer when one is known.
+    """
+    today = datetime.date.today()
+    todays_forecasts = []
 
-    if not all_forecasts:
-        return pd.DataFrame()  # Empty DataFrame
+    # Low-churn customers of every client, streamed in chunks
+    for low_churn_customers in stream_customer_class_data(db, "low_churn"):
+        customers = {customer["customer_id"]: customer for customer in low_churn_customers}
+        due = get_forecasts_due_data(db, customers.keys(), today)
+        if not due:
+            continue
 
-    all_forecasts_df = pd.concat(all_forecasts, ignore_index=True)
-    today = datetime.date.today()
-    todays_forecasts = all_forecasts_df[all_forecasts_df['date'] == today]
+        # Cross-sell offer: best bought-together product for what each customer ordered last
+        suggestions = get_cross_sell_suggestions_data(db, [forecast["customer_id"] for forecast in due])
+        for forecast in due:
+            customer = customers[forecast["customer_id"]]
+            suggestion = suggestions.get(forecast["customer_id"], {})
+            todays_forecasts.append({
+                "date": forecast["next_purchase_on"],
+                "customer_id": customer["customer_id"],
+                "customer_name": customer["customer_name"],
+                "phone": customer["phone"],
+                "purchase_probability": forecast["purchase_probability"],
+                "suggested_product_id": suggestion.get("external_id"),
+                "suggested_product": suggestion.get("product_name"),
+            })
 
-    return todays_forecasts
+    return pd.DataFrame(todays_forecasts)
 
 def send_whatsapp_forecast_message(phone_number: str, customer_name: str, language: str = "en"):
     
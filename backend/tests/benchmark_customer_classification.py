@@ -0,0 +1,172 @@
+"""
+Benchmark for customers/operation_helper.function_get_full_customer_classification on synthetic tenants.
+
+    python tests/benchmark_customer_classification.py [--sizes 100000 1000000]
+
+Compares the vectorized classification against the previous row-wise implementation (df.apply /
+iterrows, kept below as `baseline_classification`) and checks both return identical records. The old
+path could emit NaN instead of None for missing values (last_order_date of customers without orders,
+and phone on pandas >= 3); that difference is not counted.
+Segmentation (KMeans in the baseline, the persisted per-client model in the current code) is
+replaced by a constant so only the classification rules and response building are timed.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from customers import operation_helper
+
+
+def synthetic_tenant(size: int, today: datetime, seed: int = 7) -> list:
+    """Rows shaped like get_full_customer_classification_data: (id, name, phone, orders, spent, last order)"""
+    rng = np.random.default_rng(seed)
+    order_count = rng.choice([0, 1, 1, 1, 2, 3, 4, 7, 12, 20], size=size)
+    total_spent = np.where(order_count > 0, np.round(order_count * rng.gamma(2.0, 40.0, size=size), 3), 0.0)
+    seconds_ago = rng.integers(0, 3 * 365 * 86400, size=size)
+    last_order = [
+        (today - timedelta(seconds=int(s))).replace(microsecond=0) if n else None
+        for n, s in zip(order_count, seconds_ago)
+    ]
+    return [
+        (i + 1, f"Customer {i + 1}", None if i % 10 == 0 else f"+965{50000000 + i}", int(n), float(t), d)
+        for i, (n, t, d) in enumerate(zip(order_count, total_spent, last_order))
+    ]
+
+
+# --------------------------
+# Previous row-wise implementation
+# --------------------------
+
+def _classify_behavior(order_count, last_order_date, cutoff_date=datetime(2025, 1, 1)):
+    if order_count == 1 and pd.notnull(last_order_date) and last_order_date < cutoff_date:
+        return "Dead"
+    elif order_count == 1:
+        return "New"
+    elif 2 <= order_count <= 5:
+        return "Occasional"
+    elif 6 <= order_count <= 15:
+        return "Frequent"
+    elif order_count >= 16:
+        return "Loyal"
+    else:
+        return "No Orders"
+
+
+def _calculate_churn_risk(last_order_date, today):
+    if pd.isnull(last_order_date):
+        return "High"
+    days_since = (today - last_order_date).days
+    if days_since < 30:
+        return "Low"
+    elif days_since < 90:
+        return "Medium"
+    else:
+        return "High"
+
+
+def _classify_spending(total_spent):
+    if total_spent < 50:
+        return "Low Spender"
+    elif 50 <= total_spent < 200:
+        return "Medium Spender"
+    elif 200 <= total_spent < 1000:
+        return "High Spender"
+    else:
+        return "VIP"
+
+
+def baseline_classification(rows: list, today: datetime, segment) -> list:
+    df = pd.DataFrame(rows, columns=["customer_id", "customer_name", "phone", "order_count", "total_spent", "last_order_date"])
+    df["order_count"] = df["order_count"].fillna(0).astype(int)
+    df["total_spent"] = df["total_spent"].fillna(0).astype(float)
+    df["last_order_date"] = pd.to_datetime(df["last_order_date"], errors='coerce')
+
+    df["classification"] = df.apply(
+        lambda row: _classify_behavior(row["order_count"], row["last_order_date"]), axis=1
+    )
+    df["churn_risk"] = df["last_order_date"].apply(lambda x: _calculate_churn_risk(x, today))
+    df["spending_classification"] = df["total_spent"].apply(_classify_spending)
+
+    df["recency_days"] = df["last_order_date"].apply(
+        lambda d: (today - d).days if pd.notnull(d) else 999
+    )
+    df = segment(df)
+
+    df["last_order_date"] = df["last_order_date"].apply(
+        lambda x: x.isoformat() if pd.notnull(x) else None
+    )
+    return [
+        {
+            "customer_id": int(row["customer_id"]),
+            "customer_name": str(row["customer_name"]),
+            "phone": row["phone"],
+            "order_count": int(row["order_count"]),
+            "total_spent": float(row["total_spent"]),
+            "last_order_date": row["last_order_date"],
+            "classification": row["classification"],
+            "churn_risk": row["churn_risk"],
+            "segment": row["segment"],
+            "spending_classification": row["spending_classification"]
+        }
+        for _, row in df.iterrows()
+    ]
+
+
+def same_record(old: dict, new: dict) -> bool:
+    old = {key: None if value != value else value for key, value in old.items()}  # NaN -> None
+    return old == new
+
+
+def constant_segment(df):
+    df["segment"] = "Unsegmented"
+    return df
+
+
+class _FrozenDatetime(datetime):
+    """datetime.now() pinned so both implementations see the same reference date"""
+    frozen = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.frozen
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    today = datetime.now().replace(microsecond=0)
+    _FrozenDatetime.frozen = today
+    operation_helper.datetime = _FrozenDatetime
+
+    operation_helper.assign_customer_segments = lambda db, client_id, df: constant_segment(df)
+
+    for size in args.sizes:
+        rows = synthetic_tenant(size, today)
+        operation_helper.get_full_customer_classification_data = lambda db, client_id: rows
+
+        start = time.perf_counter()
+        vectorized = operation_helper.function_get_full_customer_classification(None, 1)
+        vectorized_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        baseline = baseline_classification(rows, today, constant_segment)
+        baseline_seconds = time.perf_counter() - start
+
+        mismatches = sum(1 for old, new in zip(baseline, vectorized) if not same_record(old, new))
+        print(
+            f"{size:>9} customers  row-wise {baseline_seconds:8.2f}s  vectorized {vectorized_seconds:6.2f}s  "
+            f"speedup {baseline_seconds / vectorized_seconds:6.1f}x  mismatches {mismatches}"
+        )
+
+
+if __name__ == "__main__":
+    main()
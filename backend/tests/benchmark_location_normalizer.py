@@ -0,0 +1,111 @@
+"""
+Benchmark for utils/location_normalizer on a synthetic Kuwaiti address corpus.
+
+    python tests/benchmark_location_normalizer.py [--size 100000] [--distinct 25000] [--baseline path/to/old_location_normalizer.py]
+
+--baseline loads another version of the module (e.g. from `git show <rev>:backend/utils/location_normalizer.py`)
+to compare throughput and results against the current one.
+"""
+import argparse
+import importlib.util
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils import location_normalizer
+from utils.location_normalizer import KUWAIT_CITY_NAMES, KUWAIT_LOCATIONS
+
+STREETS = ["Block {b}, Street {s}", "Blk {b} St {s} House {h}", "قطعة {b} شارع {s} منزل {h}", "Street {s}, Building {h}"]
+
+
+def misspell(text: str, rng: random.Random) -> str:
+    if len(text) < 5:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:] if rng.random() < 0.5 else text[:i] + text[i] + text[i:]
+
+
+def synthetic_corpus(size: int, distinct: int, seed: int = 7) -> list:
+    """size addresses drawn from `distinct` generated ones (returning customers repeat their address)"""
+    rng = random.Random(seed)
+    cities = list(KUWAIT_CITY_NAMES.keys())
+    governorates = [name for info in KUWAIT_LOCATIONS.values() for name in info["arabic"] + info["variations"]]
+    areas = [area for info in KUWAIT_LOCATIONS.values() for area in info["areas"]]
+
+    pool = []
+    for _ in range(distinct):
+        street = rng.choice(STREETS).format(b=rng.randint(1, 12), s=rng.randint(1, 300), h=rng.randint(1, 90))
+        roll = rng.random()
+        if roll < 0.45:    # city field filled with a known name
+            address = {"address_1": street, "city": rng.choice(cities), "state": rng.choice(["", "KW", "Kuwait"])}
+        elif roll < 0.65:  # misspelled city
+            address = {"address_1": street, "city": misspell(rng.choice(cities), rng)}
+        elif roll < 0.8:   # governorate in state only
+            address = {"address_1": street, "city": "", "state": rng.choice(governorates)}
+        elif roll < 0.95:  # area mentioned in the street line
+            address = {"address_1": f"منطقة {rng.choice(areas)}، {street}", "city": ""}
+        else:              # nothing usable
+            address = {"address_1": street, "city": rng.choice(["", "-", "N/A"])}
+        pool.append(address)
+    return [rng.choice(pool) for _ in range(size)]
+
+
+def load_module(path: str):
+    spec = importlib.util.spec_from_file_location("baseline_location_normalizer", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_uncached(module, corpus: list):
+    normalize = getattr(module, "_normalize_address_uncached", None) or module.normalize_address
+    if hasattr(normalize, "cache_clear"):
+        normalize.cache_clear()
+    start = time.perf_counter()
+    results = [normalize(**address) for address in corpus]
+    return results, time.perf_counter() - start
+
+
+def report(label: str, count: int, seconds: float):
+    print(f"{label:<28} {count:>9} addresses  {seconds:8.2f}s  {count / seconds:>12,.0f} addr/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, help="distinct addresses in the corpus (default: size / 4)")
+    parser.add_argument("--baseline", help="path to another location_normalizer.py to compare against")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.size, args.distinct or max(1, args.size // 4))
+    unique = len({tuple(sorted(a.items())) for a in corpus})
+    print(f"Corpus: {len(corpus)} addresses ({unique} distinct)\n")
+
+    results, seconds = run_uncached(location_normalizer, corpus)
+    report("current, uncached", len(corpus), seconds)
+
+    location_normalizer._normalize_address_memo.cache_clear()
+    start = time.perf_counter()
+    location_normalizer.normalize_addresses(corpus)
+    report("current, normalize_addresses", len(corpus), time.perf_counter() - start)
+
+    resolved = sum(1 for r in results if r["governorate"])
+    print(f"\nResolved governorate: {resolved}/{len(corpus)} ({resolved / len(corpus):.1%})")
+
+    if args.baseline:
+        baseline = load_module(args.baseline)
+        baseline_results, baseline_seconds = run_uncached(baseline, corpus)
+        print()
+        report("baseline, uncached", len(corpus), baseline_seconds)
+        print(f"Speedup (uncached): {baseline_seconds / seconds:.1f}x")
+
+        baseline_resolved = sum(1 for r in baseline_results if r["governorate"])
+        differing = sum(1 for a, b in zip(results, baseline_results) if a["governorate"] != b["governorate"])
+        print(f"Baseline resolved: {baseline_resolved}/{len(corpus)}, governorate differs on {differing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Tests for the header-signature cache of utils/ai_column_mapper.AIColumnMapper.auto_map_file.
+
+    python -m pytest tests/test_column_mapping_cache.py
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import utils.ai_column_mapper as ai_column_mapper
+from utils.ai_column_mapper import AIColumnMapper
+
+HEADERS = ["Order ID", "Customer Name", "Phone", "Amount", "Date"]
+
+
+def sheet_rows(offset):
+    return [
+        {"Order ID": str(1000 + offset + i), "Customer Name": f"Customer {offset + i}", "Phone": f"9988{offset + i:04d}",
+         "Amount": f"{10 + i}.500", "Date": f"2024-03-{i + 1:02d}"}
+        for i in range(5)
+    ]
+
+
+class FakeQuery:
+    def __init__(self, rows_by_file):
+        self.rows_by_file = rows_by_file
+        self.rows = []
+
+    def filter(self, criterion):
+        file_id = criterion.right.value
+        self.rows = [SimpleNamespace(data=row) for row in self.rows_by_file.get(file_id, [])]
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def limit(self, n):
+        self.rows = self.rows[:n]
+        return self
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Serves FileRow/UploadedFile lookups by file id from in-memory rows"""
+
+    def __init__(self, rows_by_file):
+        self.rows_by_file = rows_by_file
+
+    def query(self, *entities):
+        return FakeQuery(self.rows_by_file)
+
+
+class FakeRedis(dict):
+    def get(self, key):
+        return dict.get(self, key)
+
+    def set(self, key, value, ex=None):
+        self[key] = value
+
+
+def test_second_file_with_same_headers_is_served_from_cache(monkeypatch):
+    monkeypatch.setattr(ai_column_mapper, "redis_client", FakeRedis())
+    mapper = AIColumnMapper.__new__(AIColumnMapper)
+    llm_calls = []
+    monkeypatch.setattr(mapper, "infer_all_mappings", lambda *args, **kwargs: llm_calls.append(args) or {})
+    extracted = []
+    extract_column_info = mapper.extract_column_info
+    monkeypatch.setattr(mapper, "extract_column_info", lambda db, file_id: extracted.append(file_id) or extract_column_info(db, file_id))
+
+    # No FileColumn rows exist right after upload; only the stored rows
+    db = FakeSession({1: sheet_rows(0), 2: sheet_rows(50)})
+
+    first = mapper.auto_map_file(db, 1, ["order"])
+    second = mapper.auto_map_file(db, 2, ["order"])
+
+    assert first and second == first
+    assert extracted == [1]
+    assert len(ai_column_mapper.redis_client) == 1
@@ -0,0 +1,137 @@
+"""
+Tests for excel_chat/query_plan: pandas execution and SQL pushdown must agree.
+
+    python -m pytest tests/test_excel_chat_plan.py
+    TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_excel_chat_plan.py
+
+The SQL comparisons need a PostgreSQL database; they run inside a rolled-back transaction
+against a temporary file_rows table, which shadows the real one.
+"""
+import json
+import math
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from excel_chat.query_plan import execute_plan_pandas, execute_plan_sql, validate_plan
+
+ROWS = [
+    {"City": "Hawalli", "Amount": "12.500", "Refund": None, "Customer": "Noura", "Qty": 5},
+    {"City": "Hawalli", "Amount": "1,250", "Refund": None, "Customer": "Yousef", "Qty": 2},
+    {"City": "Salmiya", "Amount": "7", "Refund": "2", "Customer": "Noura", "Qty": None},
+    {"City": "Salmiya", "Amount": "n/a", "Refund": None, "Customer": "Fatma_1%", "Qty": 5},
+    {"City": None, "Amount": "3.25", "Refund": None, "Customer": "Ali", "Qty": 1},
+]
+COLUMNS = ["City", "Amount", "Refund", "Customer", "Qty"]
+
+PLANS = [
+    {"group_by": ["City"], "aggregations": [
+        {"column": "Amount", "func": "sum", "alias": "revenue"},
+        {"column": "Refund", "func": "sum", "alias": "refunds"},
+        {"column": "Refund", "func": "max", "alias": "largest_refund"},
+        {"column": "Customer", "func": "nunique", "alias": "customers"},
+        {"column": "*", "func": "count", "alias": "orders"},
+    ], "sort": [{"column": "City", "direction": "asc"}]},
+    {"aggregations": [
+        {"column": "Refund", "func": "sum", "alias": "refunds"},
+        {"column": "Amount", "func": "mean", "alias": "average"},
+    ], "filters": [{"column": "City", "op": "eq", "value": "Hawalli"}]},
+    {"select": ["Customer"], "filters": [{"column": "City", "op": "ne", "value": "Hawalli"}]},
+    {"select": ["Customer"], "filters": [{"column": "City", "op": "not_in", "value": ["Hawalli"]}]},
+    {"select": ["Customer"], "filters": [{"column": "Qty", "op": "in", "value": [5, 1]}]},
+    {"select": ["Customer"], "filters": [{"column": "Qty", "op": "eq", "value": "5"}]},
+    {"select": ["Customer"], "filters": [{"column": "Qty", "op": "ne", "value": 5}]},
+    {"select": ["Customer"], "filters": [{"column": "Customer", "op": "contains", "value": "_1%"}]},
+    {"group_by": ["Qty"], "aggregations": [{"column": "*", "func": "count", "alias": "orders"}]},
+]
+
+
+def file_frame() -> pd.DataFrame:
+    """ROWS as load_file_frame builds them: object dtype, JSON values untouched"""
+    return pd.DataFrame(ROWS, dtype=object)
+
+
+def customers(raw_plan) -> list:
+    return sorted(execute_plan_pandas(file_frame(), validate_plan(raw_plan, COLUMNS))["Customer"])
+
+
+def normalize(df: pd.DataFrame):
+    """Records with NaN/None unified and numbers rounded, ordered for comparison"""
+    records = []
+    for record in df.astype(object).where(pd.notnull(df), None).to_dict(orient="records"):
+        records.append({
+            key: round(float(value), 6) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+            for key, value in record.items()
+        })
+    return sorted(records, key=lambda r: json.dumps(r, sort_keys=True, default=str))
+
+
+def test_sum_without_numeric_values_is_null_in_pandas():
+    plan = validate_plan(PLANS[0], COLUMNS)
+    result = execute_plan_pandas(file_frame(), plan).set_index("City")
+
+    assert math.isnan(result.loc["Hawalli", "refunds"])
+    assert result.loc["Salmiya", "refunds"] == 2
+    assert result.loc["Hawalli", "revenue"] == 1262.5
+    assert list(result.columns) == ["revenue", "refunds", "largest_refund", "customers", "orders"]
+
+    totals = execute_plan_pandas(file_frame(), validate_plan(PLANS[1], COLUMNS))
+    assert math.isnan(totals.loc[0, "refunds"])
+
+
+def test_negative_filters_drop_nulls_like_sql():
+    # NULL <> 'Hawalli' and NOT (NULL = ANY(...)) are unknown in SQL, so Ali's row is dropped
+    assert customers(PLANS[2]) == ["Fatma_1%", "Noura"]
+    assert customers(PLANS[3]) == ["Fatma_1%", "Noura"]
+    assert customers(PLANS[6]) == ["Ali", "Yousef"]
+
+
+def test_numeric_cells_compare_on_their_json_text():
+    # ->> renders 5 as '5', so both a number and its text match it
+    assert customers(PLANS[4]) == ["Ali", "Fatma_1%", "Noura"]
+    assert customers(PLANS[5]) == ["Fatma_1%", "Noura"]
+
+    counts = execute_plan_pandas(file_frame(), validate_plan(PLANS[8], COLUMNS))
+    assert normalize(counts) == normalize(pd.DataFrame(
+        [{"Qty": "5", "orders": 2}, {"Qty": "2", "orders": 1}, {"Qty": "1", "orders": 1}, {"Qty": None, "orders": 1}]
+    ))
+
+
+def test_contains_matches_wildcards_literally():
+    assert customers(PLANS[7]) == ["Fatma_1%"]
+
+
+@pytest.fixture
+def pg_session():
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+
+    engine = create_engine(url)
+    with Session(engine) as session:
+        session.execute(text("CREATE TEMP TABLE file_rows (id serial, file_id integer, data jsonb NOT NULL)"))
+        for row in ROWS:
+            session.execute(
+                text("INSERT INTO file_rows (file_id, data) VALUES (1, CAST(:data AS jsonb))"),
+                {"data": json.dumps(row)},
+            )
+        yield session
+        session.rollback()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("raw_plan", PLANS)
+def test_pandas_and_sql_agree(pg_session, raw_plan):
+    plan = validate_plan(raw_plan, COLUMNS)
+
+    pandas_result = execute_plan_pandas(file_frame(), plan)
+    sql_result = execute_plan_sql(pg_session, 1, plan)
+
+    assert normalize(pandas_result) == normalize(sql_result)
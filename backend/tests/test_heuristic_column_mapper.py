@@ -0,0 +1,94 @@
+"""
+Tests for the heuristic-first column mapping and its LLM fallback.
+
+    python -m pytest tests/test_heuristic_column_mapper.py
+"""
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from utils.heuristic_column_mapper import low_confidence_fields, match_fields, open_columns
+from utils.ai_column_mapper import AIColumnMapper
+import dashboard_excel.llm_helper as llm_helper
+
+# Headers no synonym covers: English variants, German and a free-form mobile column
+UNUSUAL_COLUMNS = ["Net Sales", "Shopper", "Order Ref", "Mobile No.", "Datum"]
+UNUSUAL_SAMPLES = {
+    "Net Sales": ["12.500", "7.250", "30.000"],
+    "Shopper": ["Fatma Al-Sabah", "Yousef Kareem", "Noura Ali"],
+    "Order Ref": ["A-1001", "A-1002", "A-1003"],
+    "Mobile No.": ["99887766", "55443322", "66778899"],
+    "Datum": ["2024-03-01", "2024-03-02", "2024-03-05"],
+}
+
+# A clean order export: every header is a known synonym
+CLEAN_COLUMNS = ["Order ID", "Customer Name", "Phone", "Amount", "Date", "Product", "Qty", "Status"]
+CLEAN_SAMPLES = {
+    "Order ID": ["1001", "1002", "1003"],
+    "Customer Name": ["Fatma Al-Sabah", "Yousef Kareem", "Noura Ali"],
+    "Phone": ["99887766", "55443322", "66778899"],
+    "Amount": ["12.500", "7.250", "30.000"],
+    "Date": ["2024-03-01", "2024-03-02", "2024-03-05"],
+    "Product": ["Oud Oil", "Musk", "Bakhoor"],
+    "Qty": ["1", "2", "1"],
+    "Status": ["completed", "processing", "completed"],
+}
+
+
+class FakeOpenAI:
+    """Stands in for openai.OpenAI and records the prompts it receives"""
+    calls = []
+
+    def __init__(self, api_key=None):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        FakeOpenAI.calls.append(kwargs)
+        content = json.dumps({"customer_column": "Shopper", "amount_column": "Net Sales"})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_fields_without_any_candidate_are_sent_to_the_llm():
+    matches = match_fields(UNUSUAL_COLUMNS, UNUSUAL_SAMPLES, ["customer_name", "total_amount"])
+    unassigned = open_columns(UNUSUAL_COLUMNS, UNUSUAL_SAMPLES)
+
+    assert "Shopper" in unassigned
+    assert "customer_name" in low_confidence_fields(matches, unassigned)
+
+
+def test_missing_fields_are_not_asked_about_when_every_column_is_matched():
+    assert open_columns(CLEAN_COLUMNS, CLEAN_SAMPLES) == []
+
+    matches = match_fields(CLEAN_COLUMNS, CLEAN_SAMPLES, ["customer_name", "email", "civil_id", "City"])
+    assert matches["email"] == (None, 0.0)
+    assert low_confidence_fields(matches, []) == []
+    assert low_confidence_fields(matches, [], required=("email",)) == ["email"]
+
+
+def test_obvious_headers_make_no_llm_calls(monkeypatch):
+    FakeOpenAI.calls = []
+    monkeypatch.setattr(llm_helper, "OpenAI", FakeOpenAI)
+
+    order_fields = llm_helper.infer_order_fields_with_llm(CLEAN_COLUMNS, CLEAN_SAMPLES)
+    customer_fields = llm_helper.infer_customer_fields_with_llm(CLEAN_COLUMNS, CLEAN_SAMPLES)
+
+    column_info = {"columns": {name: {"samples": samples} for name, samples in CLEAN_SAMPLES.items()}}
+    _, pending = AIColumnMapper.__new__(AIColumnMapper).heuristic_mappings(column_info, ["customer", "order", "product"])
+
+    assert FakeOpenAI.calls == []
+    assert pending == {}
+    assert order_fields["amount"] == "Amount" and order_fields["date"] == "Date"
+    assert customer_fields["phone"] == "Phone" and customer_fields["email"] is None
+
+
+def test_infer_columns_with_llm_handles_unusual_headers(monkeypatch):
+    FakeOpenAI.calls = []
+    monkeypatch.setattr(llm_helper, "OpenAI", FakeOpenAI)
+
+    customer_col, amount_col = llm_helper.infer_columns_with_llm(UNUSUAL_COLUMNS, UNUSUAL_SAMPLES)
+
+    assert len(FakeOpenAI.calls) == 1
+    assert (customer_col, amount_col) == ("Shopper", "Net Sales")
@@ -0,0 +1,68 @@
+"""
+Tests for sql_chat/sql_guard.validate_read_only_sql, the parser-based check on NL2SQL output.
+
+    python -m pytest tests/test_nl2sql_guard.py
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sql_chat.sql_guard import UnsafeQueryError, validate_read_only_sql
+
+VIEWS = ["customers", "addresses", "orders", "order_items", "products"]
+
+
+@pytest.mark.parametrize("sql", [
+    # Quoted / schema-qualified base tables
+    'SELECT * FROM "public"."clients"',
+    'SELECT o.id, c.email FROM orders o, "public".clients c',
+    'SELECT * FROM public.customers',
+    'SELECT * FROM "orders"',
+    # Comma join to a catalog view
+    "SELECT * FROM orders o, pg_stat_activity",
+    "SELECT * FROM orders o, pg_catalog.pg_user",
+    # Scalar subquery reading another tenant's secrets
+    "SELECT (SELECT string_agg(consumer_secret, ',') FROM \"public\".clients) FROM orders LIMIT 1",
+    "SELECT id FROM orders WHERE EXISTS (SELECT 1 FROM clients)",
+    "SELECT id FROM orders UNION ALL SELECT id FROM clients",
+    # A CTE is only visible in its own query, not to a sibling subquery
+    "SELECT (WITH clients AS (SELECT 1 AS id) SELECT id FROM clients), (SELECT id FROM clients LIMIT 1) FROM orders",
+    "WITH clients AS (SELECT id FROM orders) SELECT * FROM public.clients",
+    # Session and file access functions
+    "SELECT set_config('nl2sql.client_id', '2', true)",
+    "SELECT current_setting('nl2sql.client_id')",
+    "SELECT query_to_xml('select * from public.clients', true, true, '')",
+    "SELECT pg_sleep(10)",
+    "SELECT pg_read_file('/etc/passwd')",
+    # Anything that is not a single SELECT
+    "SELECT * INTO stolen FROM orders",
+    "SELECT * FROM orders FOR UPDATE",
+    "SELECT 1; SELECT * FROM clients",
+    "DELETE FROM orders",
+    "SET ROLE postgres",
+    "WITH gone AS (DELETE FROM orders RETURNING id) SELECT * FROM gone",
+    "",
+])
+def test_rejects_queries_outside_the_curated_views(sql):
+    with pytest.raises(UnsafeQueryError):
+        validate_read_only_sql(sql, VIEWS)
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*) AS orders_count FROM orders WHERE status = 'completed'",
+    "SELECT c.first_name, SUM(o.total_amount) AS revenue FROM customers c JOIN orders o ON o.customer_id = c.id "
+    "GROUP BY c.first_name ORDER BY revenue DESC LIMIT 10",
+    "WITH monthly AS (SELECT date_trunc('month', created_at) AS month, SUM(total_amount) AS revenue FROM orders "
+    "GROUP BY 1) SELECT * FROM monthly ORDER BY month",
+    "SELECT EXTRACT(DOW FROM created_at) AS weekday, COUNT(*) FROM orders GROUP BY 1",
+    "SELECT d::date AS day, COUNT(o.id) FROM generate_series(now() - interval '7 days', now(), interval '1 day') d "
+    "LEFT JOIN orders o ON o.created_at::date = d::date GROUP BY 1",
+    "SELECT p.name FROM products p WHERE p.external_id IN (SELECT product_id FROM order_items)",
+    "WITH a AS (SELECT id FROM orders), b AS (SELECT * FROM a) SELECT * FROM b, (SELECT * FROM a) s",
+    "SELECT age(now(), MIN(created_at)) FROM Orders;",
+])
+def test_accepts_read_only_queries_over_views(sql):
+    assert validate_read_only_sql(sql, VIEWS) == sql.strip().rstrip(";").strip()
@@ -0,0 +1,44 @@
+"""
+Tests for customers/operation_helper.forecast_customer_purchases.
+
+    python -m pytest tests/test_purchase_forecast.py
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from customers.operation_helper import forecast_customer_purchases
+
+NOW = datetime(2026, 10, 19)
+
+
+def regular_customers(days_since_last_order):
+    """Customers ordering every ~30 days, identical except for their last order"""
+    return pd.DataFrame({
+        "customer_id": range(len(days_since_last_order)),
+        "frequency": [6] * len(days_since_last_order),
+        "avg_gap_days": [30.0] * len(days_since_last_order),
+        "gap_variance": [36.0] * len(days_since_last_order),
+        "last_order_at": [NOW - timedelta(days=days) for days in days_since_last_order],
+    })
+
+
+def test_long_lapsed_customer_scores_below_recent_one():
+    forecasts = forecast_customer_purchases(regular_customers([25, 365]), now=NOW)
+    recent, lapsed = forecasts["purchase_probability"]
+
+    assert recent > 0.5
+    assert lapsed < 0.01
+    assert lapsed < recent
+
+
+def test_probability_falls_once_customer_is_overdue():
+    forecasts = forecast_customer_purchases(regular_customers([30, 60, 90, 180]), now=NOW)
+    probabilities = forecasts["purchase_probability"].tolist()
+
+    assert probabilities == sorted(probabilities, reverse=True)
+    assert all(0 <= p <= 1 for p in probabilities)
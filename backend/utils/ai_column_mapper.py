@@ -4,11 +4,37 @@ Automatically maps Excel columns to canonical fields using LLM
 """
 import os
 import json
+import hashlib
 import pandas as pd
 from typing import Dict, List, Optional, Tuple
 from openai import OpenAI
 from sqlalchemy.orm import Session
-from models import UploadedFile, FileRow, FileColumn
+from models import UploadedFile, FileRow
+from utils.redis_lock import redis_client
+from utils.heuristic_column_mapper import (
+    load_confirmed_headers,
+    low_confidence_fields,
+    match_fields,
+    open_columns,
+)
+
+# Mappings only depend on the headers (and a few samples), so identically-shaped
+# re-uploads reuse the previous result instead of calling the LLM again
+MAPPING_CACHE_TTL = int(os.getenv("COLUMN_MAPPING_CACHE_TTL", str(60 * 60 * 24 * 30)))
+SAMPLE_ROWS = 100
+
+
+def header_signature(columns: List[str], analysis_types: List[str], client_id: Optional[int] = None) -> str:
+    """
+    Stable hash of a file's header set and the requested analysis types.
+    Scoped by client because client-confirmed headers influence the result.
+    """
+    normalized = sorted({str(c).strip() for c in columns})
+    payload = json.dumps(
+        {"columns": normalized, "types": sorted(analysis_types), "client_id": client_id},
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 class AIColumnMapper:
     """AI-powered column mapper for Excel files"""
@@ -27,8 +53,14 @@ class AIColumnMapper:
         if not file:
             return {}
         
-        # Get rows
-        rows = db.query(FileRow).filter(FileRow.file_id == file_id).limit(100).all()
+        # Only the JSON payload of the first SAMPLE_ROWS rows is needed
+        rows = (
+            db.query(FileRow.data)
+            .filter(FileRow.file_id == file_id)
+            .order_by(FileRow.id)
+            .limit(SAMPLE_ROWS)
+            .all()
+        )
         if not rows:
             return {}
         
@@ -112,11 +144,27 @@ class AIColumnMapper:
         Infer column mappings for a specific analysis type.
         Returns mapping with confidence scores.
         """
+        return self.infer_all_mappings(column_info, [analysis_type]).get(analysis_type, {})
+    
+    def infer_all_mappings(
+        self,
+        column_info: Dict,
+        analysis_types: List[str],
+        fields_by_type: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Infer column mappings for several analysis types with a single LLM call.
+        fields_by_type restricts the prompt to specific canonical fields per type.
+        Returns {analysis_type: {canonical_field: mapping with confidence}}.
+        """
         if not column_info or "columns" not in column_info:
             return {}
         
-        # Get canonical fields based on analysis type
-        canonical_fields = self._get_canonical_fields(analysis_type)
+        if fields_by_type is None:
+            fields_by_type = {t: self._get_canonical_fields(t) for t in analysis_types}
+        fields_by_type = {t: f for t, f in fields_by_type.items() if f}
+        if not fields_by_type:
+            return {}
         
         # Prepare data for LLM
         columns_data = []
@@ -130,8 +178,8 @@ class AIColumnMapper:
             })
         
         # Build prompt
-        system_prompt = self._build_system_prompt(analysis_type, canonical_fields)
-        user_prompt = self._build_user_prompt(columns_data, canonical_fields)
+        system_prompt = self._build_system_prompt(fields_by_type)
+        user_prompt = self._build_user_prompt(columns_data, fields_by_type)
         
         try:
             response = self.client.chat.completions.create(
@@ -142,37 +190,80 @@ class AIColumnMapper:
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=0.1,
-                max_tokens=1000
+                max_tokens=600 * len(fields_by_type)
             )
             
             result = json.loads(response.choices[0].message.content)
             
-            # Validate and build response with confidence
-            validated_mapping = {}
-            for canonical_field in canonical_fields:
-                suggested_col = result.get(canonical_field)
-                confidence = result.get(f"{canonical_field}_confidence", 0.5)
-                
-                # Validate column exists
-                if suggested_col and suggested_col in column_info["columns"]:
-                    validated_mapping[canonical_field] = {
-                        "excel_column": suggested_col,
-                        "confidence": float(confidence) if isinstance(confidence, (int, float)) else 0.5,
-                        "suggested_by": "ai"
-                    }
-                else:
-                    validated_mapping[canonical_field] = {
-                        "excel_column": None,
-                        "confidence": 0.0,
-                        "suggested_by": "ai"
-                    }
-            
-            return validated_mapping
+            return {
+                analysis_type: self._validate_mapping(result.get(analysis_type) or {}, canonical_fields, column_info)
+                for analysis_type, canonical_fields in fields_by_type.items()
+            }
             
         except Exception as e:
             print(f"Error in AI mapping inference: {str(e)}")
             return {}
     
+    def heuristic_mappings(
+        self,
+        column_info: Dict,
+        analysis_types: List[str],
+        confirmed: Optional[Dict] = None
+    ) -> Tuple[Dict[str, Dict], Dict[str, List[str]]]:
+        """
+        Map columns locally. Returns (mappings, pending) where pending lists the
+        canonical fields per analysis type whose best match is below the confidence threshold.
+        """
+        column_names = list(column_info["columns"])
+        sample_values = {name: data["samples"] for name, data in column_info["columns"].items()}
+        
+        mappings = {}
+        pending = {}
+        # Columns no field of any type claims; only they can give the LLM something to do
+        unassigned = open_columns(column_names, sample_values, confirmed)
+        for analysis_type in analysis_types:
+            canonical_fields = self._get_canonical_fields(analysis_type)
+            if not canonical_fields:
+                continue
+            
+            matches = match_fields(column_names, sample_values, canonical_fields, confirmed)
+            mappings[analysis_type] = {
+                field: {
+                    "excel_column": column,
+                    "confidence": confidence,
+                    "suggested_by": "heuristic"
+                }
+                for field, (column, confidence) in matches.items()
+            }
+            low = low_confidence_fields(matches, unassigned)
+            if low:
+                pending[analysis_type] = low
+        
+        return mappings, pending
+    
+    def _validate_mapping(self, result: Dict, canonical_fields: List[str], column_info: Dict) -> Dict[str, Dict]:
+        """Keep only suggestions that point at real columns and attach confidence"""
+        validated_mapping = {}
+        for canonical_field in canonical_fields:
+            suggested_col = result.get(canonical_field)
+            confidence = result.get(f"{canonical_field}_confidence", 0.5)
+            
+            # Validate column exists
+            if suggested_col and suggested_col in column_info["columns"]:
+                validated_mapping[canonical_field] = {
+                    "excel_column": suggested_col,
+                    "confidence": float(confidence) if isinstance(confidence, (int, float)) else 0.5,
+                    "suggested_by": "ai"
+                }
+            else:
+                validated_mapping[canonical_field] = {
+                    "excel_column": None,
+                    "confidence": 0.0,
+                    "suggested_by": "ai"
+                }
+        
+        return validated_mapping
+    
     def _get_canonical_fields(self, analysis_type: str) -> List[str]:
         """Get canonical fields for a specific analysis type"""
         if analysis_type == "customer":
@@ -193,14 +284,14 @@ class AIColumnMapper:
         else:
             return []
     
-    def _build_system_prompt(self, analysis_type: str, canonical_fields: List[str]) -> str:
+    def _build_system_prompt(self, fields_by_type: Dict[str, List[str]]) -> str:
         """Build system prompt for LLM"""
         return f"""You are an expert data analyst specializing in mapping Excel column names to standardized canonical fields.
 
-Your task is to map user-provided Excel columns to canonical {analysis_type} fields.
+Your task is to map user-provided Excel columns to canonical fields for each analysis type below.
 
-Canonical fields to map to:
-{json.dumps(canonical_fields, indent=2)}
+Canonical fields to map to, per analysis type:
+{json.dumps(fields_by_type, indent=2)}
 
 Rules:
 1. Analyze column names, data types, sample values, and patterns
@@ -211,51 +302,119 @@ Rules:
    - Data types (numeric → amount/price fields)
    - Context clues
 4. Provide confidence scores (0.0 to 1.0) for each mapping
-5. Return JSON with keys: each canonical field name, and each field name + "_confidence"
+5. The same Excel column may be used by several analysis types
+6. Return JSON with one key per analysis type; each value has keys: each canonical
+   field name, and each field name + "_confidence"
 
 Example response format:
 {{
-  "customer_name": "اسم العميل",
-  "customer_name_confidence": 0.95,
-  "phone": "رقم الهاتف",
-  "phone_confidence": 0.98,
-  "customer_id": null,
-  "customer_id_confidence": 0.0
+  "customer": {{
+    "customer_name": "اسم العميل",
+    "customer_name_confidence": 0.95,
+    "phone": "رقم الهاتف",
+    "phone_confidence": 0.98,
+    "customer_id": null,
+    "customer_id_confidence": 0.0
+  }},
+  "order": {{
+    "customer_name": "اسم العميل",
+    "customer_name_confidence": 0.9
+  }}
 }}
 
 Be precise and consider multilingual column names."""
     
-    def _build_user_prompt(self, columns_data: List[Dict], canonical_fields: List[str]) -> str:
+    def _build_user_prompt(self, columns_data: List[Dict], fields_by_type: Dict[str, List[str]]) -> str:
         """Build user prompt with column information"""
-        return f"""Map the following Excel columns to canonical {canonical_fields[0].split('_')[0]} fields:
+        return f"""Map the following Excel columns to the canonical fields of: {', '.join(fields_by_type)}
 
 Available Excel Columns:
 {json.dumps(columns_data, indent=2, ensure_ascii=False)}
 
-Return a JSON object mapping each canonical field to an Excel column name (or null), 
-along with confidence scores for each mapping."""
+Return a JSON object keyed by analysis type, mapping each canonical field to an
+Excel column name (or null), along with confidence scores for each mapping."""
+    
+    def _get_file_headers(self, db: Session, file_id: int) -> List[str]:
+        """
+        Header names of a file, from the keys of its first stored row (every row is
+        stored with all of the sheet's columns). FileColumn is not used: it is only
+        filled, lowercased, once a mapping has been saved.
+        """
+        first_row = (
+            db.query(FileRow.data)
+            .filter(FileRow.file_id == file_id)
+            .order_by(FileRow.id)
+            .first()
+        )
+        if not first_row or not isinstance(first_row.data, dict):
+            return []
+        return [str(c).strip() for c in first_row.data]
+    
+    def get_cached_mappings(self, signature: str) -> Optional[Dict[str, Dict]]:
+        try:
+            cached = redis_client.get(f"column_mapping:{signature}")
+            return json.loads(cached) if cached else None
+        except Exception as e:
+            print(f"⚠️ Column mapping cache read failed: {e}")
+            return None
+    
+    def cache_mappings(self, signature: str, mappings: Dict[str, Dict]) -> None:
+        try:
+            redis_client.set(f"column_mapping:{signature}", json.dumps(mappings, ensure_ascii=False), ex=MAPPING_CACHE_TTL)
+        except Exception as e:
+            print(f"⚠️ Column mapping cache write failed: {e}")
     
     def auto_map_file(
         self,
         db: Session,
         file_id: int,
-        analysis_types: List[str] = ["customer", "order", "product"]
+        analysis_types: List[str] = ["customer", "order", "product"],
+        client_id: Optional[int] = None
     ) -> Dict[str, Dict]:
         """
         Automatically map all analysis types for a file.
         Returns mappings for each analysis type with confidence scores.
+        Headers are matched locally first (synonyms, value patterns and headers
+        client_id confirmed before); the LLM only handles low-confidence fields.
         """
+        # Identically-shaped files map the same way; skip sampling and the LLM
+        headers = self._get_file_headers(db, file_id)
+        signature = header_signature(headers, analysis_types, client_id) if headers else None
+        if signature:
+            cached = self.get_cached_mappings(signature)
+            if cached is not None:
+                print(f"⚡ Column mapping cache hit for file {file_id}")
+                return cached
+        
         # Extract column information
         column_info = self.extract_column_info(db, file_id)
         if not column_info:
             return {}
         
-        # Infer mappings for each analysis type
-        all_mappings = {}
-        for analysis_type in analysis_types:
-            mappings = self.infer_mappings(column_info, analysis_type)
-            if mappings:
-                all_mappings[analysis_type] = mappings
+        # Local matching first; the LLM only sees the fields it could not settle
+        confirmed = load_confirmed_headers(db, client_id) if client_id else None
+        all_mappings, pending = self.heuristic_mappings(column_info, analysis_types, confirmed)
+        
+        if pending:
+            print(f"🤖 Asking LLM for low-confidence fields: {pending}")
+            ai_mappings = self.infer_all_mappings(column_info, list(pending), fields_by_type=pending)
+            for analysis_type, mappings in ai_mappings.items():
+                current = all_mappings[analysis_type]
+                used_columns = {m["excel_column"] for m in current.values() if m["excel_column"]}
+                for field, suggestion in mappings.items():
+                    column = suggestion["excel_column"]
+                    if not column or suggestion["confidence"] <= current[field]["confidence"]:
+                        continue
+                    if column in used_columns and column != current[field]["excel_column"]:
+                        continue
+                    used_columns.discard(current[field]["excel_column"])
+                    used_columns.add(column)
+                    current[field] = suggestion
+        
+        all_mappings = {t: m for t, m in all_mappings.items() if m}
+        
+        if all_mappings and signature:
+            self.cache_mappings(signature, all_mappings)
         
         return all_mappings
     
@@ -280,7 +439,7 @@ along with confidence scores for each mapping."""
                         "canonical_field": canonical_field,
                         "excel_column": mapping_data["excel_column"],
                         "confidence": mapping_data.get("confidence", 0.5),
-                        "suggested_by": "ai"
+                        "suggested_by": mapping_data.get("suggested_by", "ai")
                     })
         
         return formatted
@@ -0,0 +1,223 @@
+"""
+Heuristic Column Mapping Module
+Maps Excel columns to canonical fields locally, using Arabic/English header
+synonyms, sample-value patterns and headers the client has confirmed before.
+The LLM is only needed for columns no field claims with CONFIDENCE_THRESHOLD or more (see open_columns).
+"""
+import os
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from models import ColumnMapping
+
+CONFIDENCE_THRESHOLD = float(os.getenv("COLUMN_MAPPING_CONFIDENCE_THRESHOLD", "0.75"))
+
+# Canonical field -> header synonyms (normalized with normalize_header at import)
+FIELD_SYNONYMS: Dict[str, List[str]] = {
+    "customer_name": ["customer name", "customer", "client name", "client", "full name", "name", "buyer",
+                      "اسم العميل", "العميل", "اسم الزبون", "الزبون", "الاسم", "اسم"],
+    "customer_id": ["customer id", "customer number", "customer no", "client id", "customer code",
+                    "رقم العميل", "كود العميل", "معرف العميل"],
+    "first_name": ["first name", "firstname", "given name", "الاسم الاول"],
+    "last_name": ["last name", "lastname", "surname", "family name", "اسم العائلة", "الاسم الاخير"],
+    "phone": ["phone", "phone number", "mobile", "mobile number", "telephone", "tel", "contact number", "whatsapp",
+              "الهاتف", "رقم الهاتف", "هاتف", "جوال", "رقم الجوال", "موبايل", "تلفون", "رقم التلفون", "واتساب"],
+    "email": ["email", "e mail", "email address", "mail", "البريد الالكتروني", "البريد", "ايميل"],
+    "City": ["city", "town", "area", "المدينة", "مدينة", "المنطقة", "منطقة"],
+    "State": ["state", "governorate", "province", "region", "المحافظة", "محافظة", "الولاية"],
+    "Country": ["country", "الدولة", "البلد", "دولة"],
+    "address": ["address", "street", "full address", "العنوان", "عنوان", "الشارع"],
+    "order_id": ["order id", "order number", "order no", "order", "invoice", "invoice number", "invoice no",
+                 "رقم الطلب", "الطلب", "رقم الفاتورة", "الفاتورة"],
+    "total_amount": ["total amount", "total", "amount", "grand total", "order total", "net total", "value",
+                     "المبلغ", "الاجمالي", "المجموع", "القيمة", "المبلغ الاجمالي", "اجمالي المبلغ"],
+    "created_at": ["created at", "date", "order date", "created", "invoice date", "purchase date", "datetime",
+                   "التاريخ", "تاريخ الطلب", "تاريخ", "تاريخ الفاتورة"],
+    "status": ["status", "order status", "state of order", "الحالة", "حالة الطلب"],
+    "payment_method": ["payment method", "payment", "payment type", "pay method", "طريقة الدفع", "الدفع"],
+    "shipping_address": ["shipping address", "delivery address", "ship to", "عنوان الشحن", "عنوان التوصيل"],
+    "product_name": ["product name", "product", "item", "item name", "product title", "description",
+                     "المنتج", "اسم المنتج", "الصنف", "اسم الصنف"],
+    "product_id": ["product id", "product number", "item id", "product code", "item code",
+                   "رقم المنتج", "كود المنتج", "رقم الصنف"],
+    "quantity": ["quantity", "qty", "units", "count", "الكمية", "العدد"],
+    "sales_price": ["sales price", "sale price", "selling price", "unit price", "سعر البيع"],
+    "price": ["price", "regular price", "list price", "السعر", "سعر"],
+    "category": ["category", "type", "product category", "group", "الفئة", "التصنيف", "القسم"],
+    "sku": ["sku", "barcode", "product sku", "رمز المنتج", "الباركود"],
+    "civil_id": ["civil id", "national id", "id number", "الرقم المدني", "البطاقة المدنية", "رقم مدني"],
+    "weight": ["weight", "الوزن"],
+}
+
+# Canonical field -> expected sample-value kind
+FIELD_VALUE_KINDS: Dict[str, str] = {
+    "phone": "phone",
+    "email": "email",
+    "created_at": "date",
+    "total_amount": "numeric",
+    "sales_price": "numeric",
+    "price": "numeric",
+    "quantity": "numeric",
+    "weight": "numeric",
+    "civil_id": "civil_id",
+}
+
+VALUE_PATTERNS = {
+    "email": re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$"),
+    "phone": re.compile(r"^(?=(?:\D*\d){7,15}\D*$)\+?[\d\s\-()]+$"),
+    "date": re.compile(r"^(\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4})([ T]\d{1,2}:\d{2}(:\d{2})?)?"),
+    "numeric": re.compile(r"^(kwd|kd|د\.ك|\$)?\s*-?[\d,]*\.?\d+\s*(kwd|kd|د\.ك)?$", re.IGNORECASE),
+    "civil_id": re.compile(r"^\d{12}$"),
+}
+
+_ARABIC_DIACRITICS = re.compile(r"[ً-ْـ]")
+_ARABIC_LETTERS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ة": "ه", "ى": "ي"})
+
+
+def normalize_header(header: str) -> str:
+    """Lowercase, split camelCase/snake_case and fold Arabic letter variants and the ال prefix"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(header).strip())
+    text = _ARABIC_DIACRITICS.sub("", text.lower()).translate(_ARABIC_LETTERS)
+    text = re.sub(r"[_\-./#:()\[\]]+", " ", text)
+    tokens = [t[2:] if t.startswith("ال") and len(t) > 3 else t for t in text.split()]
+    return " ".join(tokens)
+
+
+_NORMALIZED_SYNONYMS: Dict[str, Set[str]] = {
+    field: {normalize_header(s) for s in synonyms} for field, synonyms in FIELD_SYNONYMS.items()
+}
+
+
+def value_kind_ratio(kind: str, samples: List[str]) -> Optional[float]:
+    """Fraction of samples that look like the given kind, or None without samples"""
+    values = [str(v).strip() for v in samples if str(v).strip()]
+    if not values:
+        return None
+    pattern = VALUE_PATTERNS[kind]
+    return sum(1 for v in values if pattern.match(v)) / len(values)
+
+
+def _longest_contained(field: str, header: str) -> int:
+    """Length of the longest synonym of field appearing as whole words in header"""
+    padded = f" {header} "
+    return max((len(s) for s in _NORMALIZED_SYNONYMS.get(field, ()) if len(s) > 2 and f" {s} " in padded), default=0)
+
+
+def header_score(field: str, header: str, confirmed: Set[str]) -> float:
+    """How well a (normalized) header names the field, 0.0 - 1.0"""
+    if header in confirmed:
+        return 1.0
+
+    synonyms = _NORMALIZED_SYNONYMS.get(field, set())
+    if header in synonyms:
+        return 0.95
+
+    contained = _longest_contained(field, header)
+    if contained:
+        # "name" inside "product name" is weak evidence when another field owns the longer phrase
+        longest_other = max((_longest_contained(f, header) for f in _NORMALIZED_SYNONYMS if f != field), default=0)
+        return 0.8 if contained >= longest_other else 0.5
+
+    best = max((SequenceMatcher(None, header, s).ratio() for s in synonyms), default=0.0)
+    return best * 0.8 if best >= 0.75 else 0.0
+
+
+def score_column(field: str, header: str, samples: List[str], confirmed: Set[str]) -> float:
+    """Combine header evidence with sample-value evidence"""
+    score = header_score(field, normalize_header(header), confirmed)
+    kind = FIELD_VALUE_KINDS.get(field)
+    ratio = value_kind_ratio(kind, samples) if kind else None
+
+    if ratio is None or score == 1.0:
+        return score
+    if score == 0.0:
+        # Distinctive values alone are a hint, never enough to skip the LLM
+        return 0.6 if kind in ("email", "phone", "civil_id") and ratio >= 0.9 else 0.0
+    return round(score * 0.75 + ratio * 0.25, 3)
+
+
+def load_confirmed_headers(db: Session, client_id: int) -> Dict[str, Set[str]]:
+    """
+    Headers the client has mapped before, from saved ColumnMapping rows.
+    Returns {canonical_field: {normalized headers}}.
+    """
+    confirmed: Dict[str, Set[str]] = {}
+    mappings = db.query(ColumnMapping.mapping).filter(ColumnMapping.client_id == client_id).all()
+    for (mapping,) in mappings:
+        for field, column in (mapping or {}).items():
+            if column:
+                confirmed.setdefault(field, set()).add(normalize_header(column))
+    return confirmed
+
+
+def match_fields(
+    column_names: List[str],
+    sample_values: Dict[str, List[str]],
+    canonical_fields: List[str],
+    confirmed: Optional[Dict[str, Set[str]]] = None
+) -> Dict[str, Tuple[Optional[str], float]]:
+    """
+    Assign each canonical field its best column, each column used at most once.
+    Returns {canonical_field: (column or None, confidence)}.
+    """
+    confirmed = confirmed or {}
+    candidates = []
+    for field in canonical_fields:
+        for column in column_names:
+            score = score_column(field, column, sample_values.get(column, []), confirmed.get(field, set()))
+            if score > 0:
+                candidates.append((score, field, column))
+
+    # Greedy: strongest evidence first
+    result: Dict[str, Tuple[Optional[str], float]] = {field: (None, 0.0) for field in canonical_fields}
+    used_columns = set()
+    for score, field, column in sorted(candidates, key=lambda c: -c[0]):
+        if result[field][0] is None and column not in used_columns:
+            result[field] = (column, score)
+            used_columns.add(column)
+    return result
+
+
+def open_columns(
+    column_names: List[str],
+    sample_values: Dict[str, List[str]],
+    confirmed: Optional[Dict[str, Set[str]]] = None,
+    threshold: float = CONFIDENCE_THRESHOLD
+) -> List[str]:
+    """
+    Columns no canonical field (of any analysis type) matches with confidence, i.e. the
+    columns an LLM could still assign. "Order ID" is not open for customer fields just
+    because it belongs to the order fields.
+    """
+    confirmed = confirmed or {}
+    fields = set(FIELD_SYNONYMS) | set(confirmed)
+    return [
+        column for column in column_names
+        if all(
+            score_column(field, column, sample_values.get(column, []), confirmed.get(field, set())) < threshold
+            for field in fields
+        )
+    ]
+
+
+def low_confidence_fields(
+    matches: Dict[str, Tuple[Optional[str], float]],
+    unassigned_columns: List[str],
+    required: Tuple[str, ...] = (),
+    threshold: float = CONFIDENCE_THRESHOLD
+) -> List[str]:
+    """
+    Fields an LLM should settle, driven by the columns left to assign (see open_columns):
+    a field whose weak candidate is an open column, any unmatched field while some column
+    is open (headers like "Shopper" or "Datum"), and required fields without a confident match.
+    Fields the file simply does not have are not asked about when every column is accounted for.
+    """
+    unassigned = set(unassigned_columns)
+    unsure = []
+    for field, (column, confidence) in matches.items():
+        if confidence >= threshold:
+            continue
+        if field in required or (column in unassigned if column else bool(unassigned)):
+            unsure.append(field)
+    return unsure
@@ -0,0 +1,60 @@
+"""
+Normalized customer identities (phone, email) used to match WooCommerce billing
+details to existing customers of a client.
+
+Customers are matched through the customer_identities table, which stores these
+normalized values. After changing the rules below, run dedupe_all_clients_customers_task
+to rebuild the identities and merge customers that now share one.
+"""
+import re
+from typing import Iterator, Optional, Tuple
+
+DEFAULT_COUNTRY_CODE = "965"   # Kuwait
+LOCAL_NUMBER_LENGTH = 8        # Kuwaiti numbers have no trunk prefix: 8 digits after +965
+E164_MIN_DIGITS = 8
+E164_MAX_DIGITS = 15
+
+PHONE_IDENTITY = "phone"
+EMAIL_IDENTITY = "email"
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def to_e164_phone(phone: Optional[str], default_country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """
+    E.164 form (+<country code><number>) of a phone number; None when it is empty or implausible.
+    '+965 5000 1234', '00965 50001234', '96550001234' and '50001234' all give '+96550001234'.
+    """
+    if not phone:
+        return None
+
+    phone = phone.strip()
+    digits = _NON_DIGITS.sub("", phone)
+    if phone.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif len(digits) == LOCAL_NUMBER_LENGTH:
+        digits = default_country_code + digits
+
+    if not E164_MIN_DIGITS <= len(digits) <= E164_MAX_DIGITS:
+        return None
+    return "+" + digits
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Trimmed, lowercased email; None when empty"""
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email or None
+
+
+def customer_identities(phone: Optional[str], email: Optional[str]) -> Iterator[Tuple[str, str]]:
+    """(kind, value) identities of a customer's raw phone and email, phone first"""
+    phone = to_e164_phone(phone)
+    if phone:
+        yield PHONE_IDENTITY, phone
+    email = normalize_email(email)
+    if email:
+        yield EMAIL_IDENTITY, email
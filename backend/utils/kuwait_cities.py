@@ -0,0 +1,41 @@
+"""
+kuwait_cities dimension table helpers.
+
+The table is seeded from the dictionaries in utils.location_normalizer (see the
+migration that creates it); Address.city_id points at it and is set at write time.
+"""
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from models import KuwaitCity
+from utils.location_normalizer import KUWAIT_CITY_NAMES, KUWAIT_CITY_COORDS, KUWAIT_CITY_GOVERNORATES
+
+# canonical name -> kuwait_cities.id, loaded once per process
+_city_ids: Dict[str, int] = {}
+
+
+def kuwait_city_rows() -> List[dict]:
+    """One row per canonical city, with every raw spelling mapped to it as aliases"""
+    aliases: Dict[str, List[str]] = {}
+    for raw, canonical in KUWAIT_CITY_NAMES.items():
+        aliases.setdefault(canonical, []).append(raw)
+
+    rows = []
+    for name in sorted(aliases):
+        coords = KUWAIT_CITY_COORDS.get(name)
+        rows.append({
+            "name": name,
+            "governorate": KUWAIT_CITY_GOVERNORATES.get(name),
+            "longitude": coords[0] if coords else None,
+            "latitude": coords[1] if coords else None,
+            "aliases": sorted(set(aliases[name]) | {name.lower()}),
+        })
+    return rows
+
+
+def get_city_id(db: Session, name: Optional[str]) -> Optional[int]:
+    """kuwait_cities.id of a canonical city name (e.g. resolve_city(...)["area"])"""
+    if not name:
+        return None
+    if name not in _city_ids:
+        _city_ids.update(dict(db.query(KuwaitCity.name, KuwaitCity.id).all()))
+    return _city_ids.get(name)
@@ -2,11 +2,14 @@
 Location Normalization Utility for Kuwait
 
 Extracts governorate information from address fields (city, state, address_1, address_2)
-handling Arabic and English text with spelling variations.
+handling Arabic and English text with spelling variations. The location
+dictionary is compiled once at import (see _compile_location_index).
 """
 
 import re
-from typing import Optional, Dict
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 
 # Kuwait Governorates and their areas
 KUWAIT_LOCATIONS = {
@@ -59,6 +62,188 @@ KUWAIT_LOCATIONS = {
 }
 
 
+# Raw (lowercased) city names seen in WooCommerce addresses -> canonical city
+KUWAIT_CITY_NAMES = {
+    "كبد": "Kabad", "القصور": "Al Qusour", "al-qosour": "Al Qusour",
+    "مزارع الوفرة": "Wafra Farms", "جواخيرالوفرة": "Wafra Farms",
+    "صباح السالم": "Sabah Al Salem", "sabah al-salem": "Sabah Al Salem",
+    "مبارك الكبير": "Mubarak Al Kabeer", "العدان": "Al Adan",
+    "العبدلي": "Al Abdali", "al-abdilee": "Al Abdali",
+    "الرميثية": "Rumaithiya", "al-rumaithiya": "Rumaithiya",
+    "القرين": "Al Qurain", "مدينة الأحمدي": "Ahmadi City",
+    "سلوى": "Salwa", "salwa": "Salwa",
+    "مدينة صباح الأحمد": "Sabah Al Ahmad City", "الرقة": "Al Riqqa",
+    "السالمية": "Salmiya", "مدينة سعد العبدالله": "Saad Al Abdullah City",
+    "الصباحية": "Sabahiya", "ضاحية عبدالله المبارك": "Abdullah Al Mubarak",
+    "abdulla al-mubarak": "Abdullah Al Mubarak", "حطين": "Hateen",
+    "جابر العلي": "Jaber Al Ali", "جابر الأحمد": "Jaber Al Ahmad",
+    "al-sulaibia traditional accommodations": "Sulaibiya", "الري": "Al Rai",
+    "الجهراء": "Jahra", "الاندلس": "Andalus", "الدوحة": "Doha",
+    "al-doha": "Doha", "مشرف": "Mishref", "أبو فطيرة": "Abu Fatira",
+    "abu fatera": "Abu Fatira", "الفروانية": "Farwaniya",
+    "al-farwaniya": "Farwaniya", "الدسمة": "Dasma", "الزهراء": "Zahra",
+    "المنقف": "Mangaf", "الفردوس": "Firdous",
+    "علي صباح السالم (ام الهيمان)": "Ali Sabah Al Salem",
+    "علي صباح السالم   (ام الهيمان)": "Ali Sabah Al Salem",
+    "بيان": "Bayan", "الروضة": "Rawda",
+    "ضاحية عبدالله السالم": "Abdullah Al Salem", "هدية": "Hadiya",
+    "حولي": "Hawally", "الظهر": "Dhaher",
+    "مدينة الخيران الجديدة": "New Khairan City",
+    "al-kheeran and al-kheeran pearl": "New Khairan City",
+    "فهد الأحمد": "Fahad Al Ahmad", "الجابرية": "Jabriya",
+    "al-jabriya": "Jabriya", "السرة": "Surra", "القصر": "Al Qasr",
+    "سباق الهجن وسباق الفروسية": "Camel & Horse Racing", "العارضية": "Ardiya",
+    "الصليبخات": "Sulaibikhat", "اليرموك": "Yarmouk",
+    "جنوب الدوحة  - القيروان": "South Doha - Qairawan",
+    "الشامية": "Shamiya", "الصليبية الزراعية 1": "Sulaibiya Agriculture",
+    "العديلية": "Adailiya", "النهضة - شرق الصليبخات": "Nahda - East Sulaibikhat",
+    "الفحيحيل": "Fahaheel", "الشهداء": "Shuhada", "الفنيطيس": "Fnaitees",
+    "الرحاب": "Rehab", "الرابية": "Rabiya", "قرطبة": "Qurtuba",
+    "السلام": "Salam", "abdulla port and industrial shuaiba": "Shuaiba Industrial",
+    "north of al-shuaiba -al-ahmadi port": "North Shuaiba",
+    "المنصورية": "Mansouriya", "النزهة": "Nuzha", "أشبيلية": "Ishbiliya",
+    "بر محافظة الأحمدي": "Ahmadi Desert", "المهبولة": "Mahboula",
+    "جليب الشيوخ": "Jleeb Al Shuyoukh", "كيفان": "Keifan",
+    "الفنطاس": "Fintas", "الصديق": "Siddiq", "العقيلة": "Eqaila",
+    "النسيم": "Naseem", "صبحان الصناعية": "Sabhan Industrial",
+    "الواحة": "Waha", "خيطان": "Khaitan", "تيماء": "Tayma",
+    "القادسية": "Qadsiya",
+}
+
+
+# [lon, lat] of canonical city names
+KUWAIT_CITY_COORDS = {
+    "Hawally": [48.02861, 29.33278],
+    "Salmiya": [48.08333, 29.33333],
+    "Farwaniya": [47.95861, 29.27750],
+    "Mahboula": [48.13028, 29.14500],
+    "Sabah Al Salem": [48.05722, 29.25722],
+    "Mangaf": [48.13278, 29.09611],
+    "Bayan": [48.04881, 29.30320],
+    "Wafra Farms": [47.93056, 28.63917],
+    "Abdullah Al Salem": [47.97806, 29.26917],
+    "Mubarak Al Kabeer": [47.65806, 29.33750],
+    "Fintas": [48.12111, 29.17389],
+    "Doha": [47.93306, 29.29500],
+    "Dasma": [48.00139, 29.36500],
+    "Shuwaikh Commercial": [47.95000, 29.35000],
+    "Jahra": [47.65806, 29.33750],
+    "Fahaheel": [48.12361, 29.09889],
+    "Sabhan Industrial": [47.90000, 29.25000],
+    "Jaber Al Ahmad": [47.90000, 29.30000],
+    "Jleeb Al Shuyoukh": [47.90000, 29.25000],
+    "Keifan": [47.95000, 29.30000],
+    "Mishref": [47.95000, 29.30000],
+    "Qurtuba": [47.95000, 29.30000],
+    "Fahad Al Ahmad": [47.95000, 29.30000],
+    "Abdullah Al Mubarak": [47.95000, 29.30000],
+    "Umm Al Haiman": [47.95000, 29.30000],
+    "Kabad": [47.95000, 29.30000],
+    "Hateen": [47.95000, 29.30000],
+    "Nuzha": [47.95000, 29.30000],
+    "Sulaibikhat": [47.95000, 29.30000],
+    "Siddiq": [47.95000, 29.30000],
+    "Sabahiya": [47.95000, 29.30000],
+    "Dasman": [47.95000, 29.30000],
+    "Surra": [47.95000, 29.30000],
+    "Al Rai": [47.95000, 29.30000],
+    "Rawda": [47.95000, 29.30000],
+    "Al Riqqa": [47.95000, 29.30000],
+    "Shamiya": [47.95000, 29.30000],
+    "Shuhada": [47.95000, 29.30000],
+    "Nahda - East Sulaibikhat": [47.95000, 29.30000],
+    "Zahra": [47.95000, 29.30000],
+    "Al Qusour": [47.95000, 29.30000],
+    "Al Qasr": [47.95000, 29.30000],
+    "Eqaila": [47.95000, 29.30000],
+    "Ardiya": [47.95000, 29.30000],
+    "Adailiya": [47.95000, 29.30000],
+    "Al Adan": [47.95000, 29.30000],
+    "Omariya": [47.95000, 29.30000],
+    "Oyoun": [47.95000, 29.30000],
+    "Naseem": [47.95000, 29.30000],
+    "Naeem": [47.95000, 29.30000],
+    "Nuwaiseeb": [47.95000, 29.30000],
+    "Waha": [47.95000, 29.30000],
+    "Firdous": [47.95000, 29.30000],
+    "Rumaithiya": [47.95000, 29.30000],
+    "Reqaee": [47.95000, 29.30000],
+    "Al Qurain": [47.95000, 29.30000],
+    "Faiha": [47.95000, 29.30000],
+    "Fnaitees": [47.95000, 29.30000],
+    "Bneid Al Gar": [47.95000, 29.30000],
+    "Ishbiliya": [47.95000, 29.30000],
+    "Andalus": [47.95000, 29.30000],
+    "Jabriya": [47.95000, 29.30000],
+    "Jaber Al Ali": [47.95000, 29.30000],
+    "Tayma": [47.95000, 29.30000],
+    "Sabah Al Nasser": [47.95000, 29.30000],
+    "Central Sabhan": [47.90000, 29.25000],
+    # Approximate area centroids
+    "Abu Fatira": [48.08000, 29.20000],
+    "Ahmadi City": [48.08380, 29.07690],
+    "Ahmadi Desert": [47.90000, 28.90000],
+    "Al Abdali": [47.73000, 30.00000],
+    "Ali Sabah Al Salem": [48.07000, 28.97000],
+    "Camel & Horse Racing": [47.75000, 29.15000],
+    "Dhaher": [48.03000, 29.15000],
+    "Hadiya": [48.09000, 29.14000],
+    "Khaitan": [47.97000, 29.29000],
+    "Mansouriya": [47.99300, 29.35700],
+    "New Khairan City": [48.25000, 28.66000],
+    "North Shuaiba": [48.15000, 29.05000],
+    "Qadsiya": [48.00000, 29.35000],
+    "Rabiya": [47.93000, 29.29500],
+    "Rehab": [47.93000, 29.28000],
+    "Saad Al Abdullah City": [47.70000, 29.32000],
+    "Sabah Al Ahmad City": [48.15000, 28.75000],
+    "Salam": [48.02000, 29.29000],
+    "Salwa": [48.08000, 29.29500],
+    "Shuaiba Industrial": [48.15000, 29.03000],
+    "South Doha - Qairawan": [47.87000, 29.30000],
+    "Sulaibiya": [47.82000, 29.27000],
+    "Sulaibiya Agriculture": [47.78000, 29.23000],
+    "Yarmouk": [47.97000, 29.31000],
+}
+
+
+# Governorate of each canonical city (KUWAIT_LOCATIONS governorate names)
+KUWAIT_CITY_GOVERNORATES = {
+    # Capital
+    "Abdullah Al Salem": "Capital", "Adailiya": "Capital", "Dasma": "Capital", "Doha": "Capital",
+    "Keifan": "Capital", "Mansouriya": "Capital", "Nuzha": "Capital", "Qadsiya": "Capital",
+    "Qurtuba": "Capital", "Rawda": "Capital", "Shamiya": "Capital", "Sulaibikhat": "Capital",
+    "Surra": "Capital", "Yarmouk": "Capital", "Nahda - East Sulaibikhat": "Capital",
+    "South Doha - Qairawan": "Capital",
+    # Hawalli
+    "Hawally": "Hawalli", "Salmiya": "Hawalli", "Rumaithiya": "Hawalli", "Salwa": "Hawalli",
+    "Bayan": "Hawalli", "Mishref": "Hawalli", "Jabriya": "Hawalli", "Hateen": "Hawalli",
+    "Shuhada": "Hawalli", "Salam": "Hawalli", "Siddiq": "Hawalli", "Zahra": "Hawalli",
+    # Farwaniya
+    "Farwaniya": "Farwaniya", "Abdullah Al Mubarak": "Farwaniya", "Andalus": "Farwaniya",
+    "Ardiya": "Farwaniya", "Firdous": "Farwaniya", "Ishbiliya": "Farwaniya",
+    "Jleeb Al Shuyoukh": "Farwaniya", "Khaitan": "Farwaniya", "Rabiya": "Farwaniya",
+    "Rehab": "Farwaniya", "Al Rai": "Farwaniya",
+    # Ahmadi
+    "Ahmadi City": "Ahmadi", "Ahmadi Desert": "Ahmadi", "Ali Sabah Al Salem": "Ahmadi",
+    "Dhaher": "Ahmadi", "Eqaila": "Ahmadi", "Fahad Al Ahmad": "Ahmadi", "Fahaheel": "Ahmadi",
+    "Fintas": "Ahmadi", "Hadiya": "Ahmadi", "Jaber Al Ali": "Ahmadi", "Mahboula": "Ahmadi",
+    "Mangaf": "Ahmadi", "New Khairan City": "Ahmadi", "North Shuaiba": "Ahmadi",
+    "Al Riqqa": "Ahmadi", "Sabah Al Ahmad City": "Ahmadi", "Sabahiya": "Ahmadi",
+    "Shuaiba Industrial": "Ahmadi", "Wafra Farms": "Ahmadi",
+    # Jahra
+    "Jahra": "Jahra", "Al Abdali": "Jahra", "Al Qasr": "Jahra", "Jaber Al Ahmad": "Jahra",
+    "Kabad": "Jahra", "Naseem": "Jahra", "Saad Al Abdullah City": "Jahra", "Sulaibiya": "Jahra",
+    "Sulaibiya Agriculture": "Jahra", "Tayma": "Jahra", "Waha": "Jahra",
+    "Camel & Horse Racing": "Jahra",
+    # Mubarak Al-Kabeer
+    "Mubarak Al Kabeer": "Mubarak Al-Kabeer", "Abu Fatira": "Mubarak Al-Kabeer",
+    "Al Adan": "Mubarak Al-Kabeer", "Al Qurain": "Mubarak Al-Kabeer", "Al Qusour": "Mubarak Al-Kabeer",
+    "Sabah Al Salem": "Mubarak Al-Kabeer", "Fnaitees": "Mubarak Al-Kabeer",
+    "Sabhan Industrial": "Mubarak Al-Kabeer",
+}
+
+
 def normalize_arabic_text(text: str) -> str:
     """Normalize Arabic text by removing diacritics and standardizing characters."""
     if not text:
@@ -94,100 +279,181 @@ def normalize_english_text(text: str) -> str:
     return text
 
 
-def similarity_ratio(str1: str, str2: str) -> float:
-    """Calculate similarity ratio between two strings."""
+# Compiled matcher: every location term is normalized once at import. A lookup is
+# an exact dict hit, one Aho-Corasick pass for terms contained in the input, a
+# substring index for inputs contained in a term, and a trigram index for misspellings.
+
+_AREA_SCORE = 0.95  # input contains / is contained in an area name
+_NAME_SCORE = 0.9   # input contains / is contained in a governorate name
+_MIN_PARTIAL_LENGTH = 3  # shorter inputs only match exactly
+
+
+def _is_arabic(text: str) -> bool:
+    return any('\u0600' <= c <= '\u06FF' for c in text)
+
+
+def _normalize_input(text: str) -> str:
+    return normalize_arabic_text(text) if _is_arabic(text) else normalize_english_text(text)
+
+
+def _trigrams(text: str) -> frozenset:
+    padded = f" {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class _AhoCorasick:
+    """Aho-Corasick automaton; find() returns the payloads of every key occurring in a text in one pass"""
+
+    def __init__(self, keys: Dict[str, list]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[list] = [[]]
+
+        for key, payload in keys.items():
+            node = 0
+            for ch in key:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node] = self._out[node] + payload
+
+        # Breadth-first fail links; outputs inherit the outputs of their fail state
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> list:
+        goto, fail, out = self._goto, self._fail, self._out
+        found = []
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.extend(out[node])
+        return found
+
+
+def _compile_location_index():
+    """
+    Build the lookup structures from KUWAIT_LOCATIONS.
+    Each normalized term maps to a list of (location_rank, kind) entries, kind being
+    "area" (areas / variations_areas), "arabic" or "variation" (governorate names).
+    """
+    terms: Dict[str, List[Tuple[int, str]]] = {}
+
+    def add(term: str, rank: int, kind: str):
+        if term and (rank, kind) not in terms.setdefault(term, []):
+            terms[term].append((rank, kind))
+
+    for rank, info in enumerate(KUWAIT_LOCATIONS.values()):
+        for area in info.get("areas", []):
+            add(normalize_arabic_text(area), rank, "area")
+        for area_var in info.get("variations_areas", []):
+            add(normalize_english_text(area_var), rank, "area")
+        for arabic_name in info.get("arabic", []):
+            add(normalize_arabic_text(arabic_name), rank, "arabic")
+        for variation in info.get("variations", []):
+            add(normalize_english_text(variation), rank, "variation")
+
+    substrings: Dict[str, List[Tuple[int, str]]] = {}
+    for term, entries in terms.items():
+        for start in range(len(term)):
+            for end in range(start + _MIN_PARTIAL_LENGTH, len(term) + 1):
+                bucket = substrings.setdefault(term[start:end], [])
+                bucket.extend(e for e in entries if e not in bucket)
+
+    trigram_index: Dict[str, List[int]] = {}
+    term_list = list(terms.items())
+    term_trigrams = [_trigrams(term) for term, _ in term_list]
+    for term_id, grams in enumerate(term_trigrams):
+        for gram in grams:
+            trigram_index.setdefault(gram, []).append(term_id)
+
+    return terms, _AhoCorasick(terms), substrings, term_list, term_trigrams, trigram_index
+
+
+_LOCATION_NAMES = list(KUWAIT_LOCATIONS.keys())
+(_TERMS, _TERM_AUTOMATON, _TERM_SUBSTRINGS,
+ _TERM_LIST, _TERM_TRIGRAMS, _TRIGRAM_INDEX) = _compile_location_index()
+
+
+def _term_hits(normalized: str) -> List[Tuple[int, str]]:
+    """Entries of every term contained in the input, or containing it"""
+    hits = _TERM_AUTOMATON.find(normalized)
+    if len(normalized) >= _MIN_PARTIAL_LENGTH:
+        hits.extend(_TERM_SUBSTRINGS.get(normalized, ()))
+    return hits
+
+
+def trigram_similarity(str1: str, str2: str) -> float:
+    """Jaccard similarity of the padded character trigrams of two strings."""
     if not str1 or not str2:
         return 0.0
-    
-    if str1 == str2:
-        return 1.0
-    
-    # Simple substring check
-    if str1 in str2 or str2 in str1:
-        return 0.8
-    
-    # Calculate character overlap
-    set1 = set(str1.lower())
-    set2 = set(str2.lower())
-    if not set1 or not set2:
-        return 0.0
-    
-    intersection = len(set1 & set2)
-    union = len(set1 | set2)
-    
-    return intersection / union if union > 0 else 0.0
+    grams1, grams2 = _trigrams(str1), _trigrams(str2)
+    return len(grams1 & grams2) / len(grams1 | grams2)
+
+
+def _fuzzy_location_scores(normalized: str) -> Dict[int, float]:
+    """Best trigram similarity per location rank, via the trigram index"""
+    grams = _trigrams(normalized)
+    shared: Dict[int, int] = {}
+    for gram in grams:
+        for term_id in _TRIGRAM_INDEX.get(gram, ()):
+            shared[term_id] = shared.get(term_id, 0) + 1
+
+    scores: Dict[int, float] = {}
+    for term_id, common in shared.items():
+        score = common / (len(grams) + len(_TERM_TRIGRAMS[term_id]) - common)
+        for rank, _ in _TERM_LIST[term_id][1]:
+            if score > scores.get(rank, 0.0):
+                scores[rank] = score
+    return scores
 
 
 def find_best_location_match(input_text: str, threshold: float = 0.6) -> Optional[str]:
     """Find the best matching location from KUWAIT_LOCATIONS."""
     if not input_text or not input_text.strip():
         return None
-    
-    input_text = str(input_text).strip()
-    normalized_input = normalize_arabic_text(input_text) if any('\u0600' <= c <= '\u06FF' for c in input_text) else normalize_english_text(input_text)
-    
-    # First pass: Check for exact area matches (highest priority)
-    for location_name, location_info in KUWAIT_LOCATIONS.items():
-        # Check Arabic areas
-        for area in location_info.get("areas", []):
-            norm_area = normalize_arabic_text(area)
-            if norm_area == normalized_input:
-                return location_name  # Exact area match - return immediately
-        
-        # Check English area variations
-        for area_var in location_info.get("variations_areas", []):
-            norm_area_var = normalize_english_text(area_var)
-            if norm_area_var == normalized_input:
-                return location_name  # Exact area variation match - return immediately
-    
-    best_match = None
-    best_score = 0.0
-    
-    # Second pass: Check all matches and score them
-    for location_name, location_info in KUWAIT_LOCATIONS.items():
-        scores = []
-        
-        # Check areas first (high priority)
-        for area in location_info.get("areas", []):
-            norm_area = normalize_arabic_text(area)
-            if norm_area == normalized_input:
-                return location_name  # Exact area match
-            if norm_area in normalized_input or normalized_input in norm_area:
-                scores.append(0.95)  # High score for area match
-        
-        # Check English variations for areas (like "mahboula", "al-mahboola")
-        for area_var in location_info.get("variations_areas", []):
-            norm_area_var = normalize_english_text(area_var)
-            if norm_area_var == normalized_input:
-                return location_name  # Exact area variation match
-            if norm_area_var in normalized_input or normalized_input in norm_area_var:
-                scores.append(0.95)  # High score for area variation match
-        
-        # Check Arabic names
-        for arabic_name in location_info.get("arabic", []):
-            norm_ar = normalize_arabic_text(arabic_name)
-            if norm_ar == normalized_input:
-                return location_name  # Exact match
-            if norm_ar in normalized_input or normalized_input in norm_ar:
-                scores.append(0.9)  # Substring match
-            scores.append(similarity_ratio(normalized_input, norm_ar))
-        
-        # Check English variations
-        for variation in location_info.get("variations", []):
-            norm_var = normalize_english_text(variation)
-            if norm_var == normalized_input:
-                return location_name  # Exact match
-            if norm_var in normalized_input or normalized_input in norm_var:
-                scores.append(0.9)  # Substring match
-            scores.append(similarity_ratio(normalized_input, norm_var))
-        
-        # Get max score for this location
-        max_score = max(scores) if scores else 0.0
-        if max_score > best_score and max_score >= threshold:
-            best_score = max_score
-            best_match = location_name
-    
-    return best_match
+
+    normalized_input = _normalize_input(str(input_text).strip())
+    if not normalized_input:
+        return None
+
+    # Exact matches: areas first, then governorate names; earlier locations win ties
+    exact = _TERMS.get(normalized_input)
+    if exact:
+        rank = min(exact, key=lambda entry: (entry[1] != "area", entry[0]))[0]
+        return _LOCATION_NAMES[rank]
+
+    # Partial matches (input contains a term or is contained in one)
+    scores: Dict[int, float] = {}
+    for rank, kind in _term_hits(normalized_input):
+        score = _AREA_SCORE if kind == "area" else _NAME_SCORE
+        if score > scores.get(rank, 0.0):
+            scores[rank] = score
+
+    # Misspellings: trigram similarity
+    if not scores:
+        scores = _fuzzy_location_scores(normalized_input)
+
+    if not scores:
+        return None
+    rank, score = max(scores.items(), key=lambda item: (item[1], -item[0]))
+    return _LOCATION_NAMES[rank] if score >= threshold else None
 
 
 def extract_location_from_address(address_text: str) -> Optional[str]:
@@ -239,7 +505,7 @@ def get_governorate_from_location(location_name: Optional[str]) -> Optional[str]
     return KUWAIT_LOCATIONS.get(location_name, {}).get("governorate")
 
 
-def normalize_address(
+def _normalize_address_uncached(
     address_1: Optional[str] = None,
     address_2: Optional[str] = None,
     city: Optional[str] = None,
@@ -308,34 +574,97 @@ def normalize_address(
     
     # Priority 5: Try direct match on address_1 (for cases like "Block 7 street 12" with city in another field)
     if not result['governorate'] and address_1:
-        # Normalize address_1 for matching
-        normalized_addr1 = normalize_arabic_text(address_1) if any('\u0600' <= c <= '\u06FF' for c in address_1) else normalize_english_text(address_1)
-        
-        # Try matching any known location name (governorate names) in address_1
-        for location_name in KUWAIT_LOCATIONS.keys():
-            for arabic_name in KUWAIT_LOCATIONS[location_name].get("arabic", []):
-                norm_ar = normalize_arabic_text(arabic_name)
-                if norm_ar in normalized_addr1 or normalized_addr1 in norm_ar:
-                    result['governorate'] = get_governorate_from_location(location_name)
-                    result['standardized_city'] = location_name
-                    return result
-        
-        # Try matching areas in address_1 (check all areas for all governorates)
-        for location_name in KUWAIT_LOCATIONS.keys():
-            # Check Arabic areas
-            for area in KUWAIT_LOCATIONS[location_name].get("areas", []):
-                norm_area = normalize_arabic_text(area)
-                if norm_area in normalized_addr1 or normalized_addr1 in norm_area:
-                    result['governorate'] = get_governorate_from_location(location_name)
-                    result['standardized_city'] = location_name
-                    return result
-            
-            # Check English area variations
-            for area_var in KUWAIT_LOCATIONS[location_name].get("variations_areas", []):
-                norm_area_var = normalize_english_text(area_var)
-                if norm_area_var in normalized_addr1 or normalized_addr1 in norm_area_var:
-                    result['governorate'] = get_governorate_from_location(location_name)
-                    result['standardized_city'] = location_name
-                    return result
-    
+        hits = _term_hits(_normalize_input(address_1))
+
+        # Governorate names (Arabic) first, then areas; earlier locations win ties
+        for kind in ("arabic", "area"):
+            ranks = [rank for rank, hit_kind in hits if hit_kind == kind]
+            if ranks:
+                location_name = _LOCATION_NAMES[min(ranks)]
+                result['governorate'] = get_governorate_from_location(location_name)
+                result['standardized_city'] = location_name
+                return result
+
     return result
+
+
+def _clean_field(value: Optional[str]) -> Optional[str]:
+    """Collapse whitespace so trivially different raw strings share a memo entry"""
+    if value is None:
+        return None
+    value = re.sub(r'\s+', ' ', str(value)).strip()
+    return value or None
+
+
+@lru_cache(maxsize=65536)
+def _normalize_address_memo(address_1, address_2, city, state, postcode, country) -> tuple:
+    return tuple(_normalize_address_uncached(address_1, address_2, city, state, postcode, country).items())
+
+
+def normalize_address(
+    address_1: Optional[str] = None,
+    address_2: Optional[str] = None,
+    city: Optional[str] = None,
+    state: Optional[str] = None,
+    postcode: Optional[str] = None,
+    country: Optional[str] = None
+) -> Dict[str, Optional[str]]:
+    """
+    Memoized normalize (see _normalize_address_uncached for the returned fields).
+    Addresses repeat heavily across orders, so most calls are cache hits.
+    """
+    key = tuple(_clean_field(v) for v in (address_1, address_2, city, state, postcode, country))
+    return dict(_normalize_address_memo(*key))
+
+
+def normalize_addresses(addresses: Iterable[Mapping[str, Optional[str]]]) -> List[Dict[str, Optional[str]]]:
+    """
+    Batch normalize: one result per input mapping (keys as in normalize_address), in order.
+    Repeated addresses within and across batches are served from the memo.
+    """
+    return [
+        normalize_address(
+            address_1=address.get("address_1"),
+            address_2=address.get("address_2"),
+            city=address.get("city"),
+            state=address.get("state"),
+            postcode=address.get("postcode"),
+            country=address.get("country"),
+        )
+        for address in addresses
+    ]
+
+
+def resolve_city(city: Optional[str]) -> Dict[str, Optional[object]]:
+    """Canonical city name and coordinates for a raw city string, if known"""
+    canonical = None
+    if city and str(city).strip():
+        canonical = (
+            KUWAIT_CITY_NAMES.get(str(city).strip().lower())
+            or KUWAIT_CITY_NAMES.get(_clean_field(city).lower())
+        )
+    coords = KUWAIT_CITY_COORDS.get(canonical) if canonical else None
+    return {
+        "area": canonical,
+        "longitude": coords[0] if coords else None,
+        "latitude": coords[1] if coords else None,
+    }
+
+
+def resolve_location(
+    address_1: Optional[str] = None,
+    address_2: Optional[str] = None,
+    city: Optional[str] = None,
+    state: Optional[str] = None
+) -> Dict[str, Optional[object]]:
+    """
+    Location fields stored on Address at write time:
+    {"governorate", "area", "latitude", "longitude"}
+    A known city decides the governorate; otherwise all fields go through the normalizer.
+    """
+    resolved_city = resolve_city(city)
+    governorate = KUWAIT_CITY_GOVERNORATES.get(resolved_city["area"])
+    if not governorate:
+        normalized = normalize_address(address_1=address_1, address_2=address_2, city=city, state=state)
+        governorate = normalized.get("governorate")
+    return {"governorate": governorate, **resolved_city}
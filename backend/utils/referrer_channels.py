@@ -0,0 +1,44 @@
+"""
+Referrer -> attribution channel classification.
+
+Orders store the channel in Order.attribution_channel when they are ingested.
+After changing REFERRER_MAPPINGS, run reclassify_attribution_channels_task to
+update existing orders and rebuild the daily channel rollup.
+"""
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlparse
+
+UNKNOWN_CHANNEL = "Unknown"
+
+# Mapping of domains to labels
+REFERRER_MAPPINGS = {
+    'google.com': 'google',
+    'instagram.com': 'instagram',
+    'l.instagram.com': 'instagram',
+    'souqalsultan.com': 'souqalsultan',
+    'linktr.ee': 'linktree',
+    'kpay.com.kw': 'knet',
+    'facebook.com': 'facebook',
+    'l.facebook.com': 'facebook',
+    'fbclid=': 'facebook',
+}
+
+
+@lru_cache(maxsize=16384)
+def classify_referrer(ref: Optional[str]) -> str:
+    """Channel label of a referrer URL; unmapped referrers are labelled by their domain"""
+    if not ref or ref.lower() == "unknown":
+        return UNKNOWN_CHANNEL
+
+    # Check query param pattern
+    if 'fbclid=' in ref:
+        return 'facebook'
+
+    domain = urlparse(ref).netloc.lower()
+
+    for key, label in REFERRER_MAPPINGS.items():
+        if key in domain:
+            return label
+
+    return domain or UNKNOWN_CHANNEL
@@ -0,0 +1,77 @@
+"""
+Tenant-aware response cache for the analytics routers.
+
+Entries are keyed by client, endpoint and normalized params, plus the client's
+data version. Sync tasks call bump_data_version() after committing, which makes
+every older entry of that client unreachable (they then expire via TTL).
+If Redis is unavailable, results are simply computed every time.
+"""
+import os
+import json
+import hashlib
+from typing import Any, Callable, Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from utils.redis_lock import redis_client
+
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(60 * 60 * 6)))
+
+
+def _version_key(client_id: int) -> str:
+    return f"data_version:client_{client_id}"
+
+
+def get_data_version(client_id: int) -> str:
+    try:
+        return redis_client.get(_version_key(client_id)) or "0"
+    except Exception as e:
+        print(f"⚠️ Failed to read data version for client {client_id}: {e}")
+        return "0"
+
+
+def bump_data_version(client_id: int) -> None:
+    """Invalidate all cached responses of a client (call after a sync commits)"""
+    try:
+        redis_client.incr(_version_key(client_id))
+    except Exception as e:
+        print(f"⚠️ Failed to bump data version for client {client_id}: {e}")
+
+
+def response_cache_key(client_id: int, endpoint: str, params: Optional[Dict[str, Any]] = None) -> str:
+    normalized = json.dumps(
+        {k: v for k, v in (params or {}).items() if v is not None},
+        sort_keys=True,
+        default=str,
+    )
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+    return f"resp:client_{client_id}:v{get_data_version(client_id)}:{endpoint}:{digest}"
+
+
+def cached_response(
+    client_id: int,
+    endpoint: str,
+    params: Optional[Dict[str, Any]],
+    compute: Callable[[], Any],
+    ttl: int = RESPONSE_CACHE_TTL
+) -> Any:
+    """
+    Return the cached result for (client, endpoint, params) or compute and store it.
+    The result is stored and returned in its JSON-encoded form, so hits and misses
+    serialize identically.
+    """
+    key = response_cache_key(client_id, endpoint, params)
+
+    try:
+        cached = redis_client.get(key)
+        if cached is not None:
+            return json.loads(cached)
+    except Exception as e:
+        print(f"⚠️ Response cache read failed for {endpoint}: {e}")
+
+    result = jsonable_encoder(compute())
+
+    try:
+        redis_client.set(key, json.dumps(result), ex=ttl)
+    except Exception as e:
+        print(f"⚠️ Response cache write failed for {endpoint}: {e}")
+
+    return result
@@ -0,0 +1,80 @@
+"""
+Streaming helpers for large query results.
+
+Results are sent as a sequence of events, either as NDJSON (one JSON object
+per line) or as Server-Sent Events:
+
+    {"type": "meta", ...}          interpreted query / code, sent first
+    {"type": "rows", "rows": [..]} one event per row batch
+    {"type": "end", "row_count": N}
+    {"type": "error", "error": ".."}
+
+Encoding uses orjson, which serializes NumPy scalars/arrays, datetimes and
+NaN (as null) natively, so rows don't need a recursive to_python/clean_json pass.
+"""
+import decimal
+from typing import Any, Dict, Iterable, Iterator, Optional
+import orjson
+from fastapi.responses import StreamingResponse
+
+STREAM_FORMATS = ("ndjson", "sse")
+DEFAULT_BATCH_SIZE = 500
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any):
+    """Fallback for types orjson does not handle natively"""
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "item"):  # NumPy scalars orjson doesn't cover (e.g. float16)
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+
+def encode_event(event: Dict[str, Any], fmt: str) -> bytes:
+    payload = dumps(event)
+    if fmt == "sse":
+        return b"event: " + event.get("type", "message").encode() + b"\ndata: " + payload + b"\n\n"
+    return payload + b"\n"
+
+
+def batched(rows: Iterable[Any], batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_response(events: Iterable[Dict[str, Any]], fmt: str, on_close: Optional[callable] = None) -> StreamingResponse:
+    """
+    Wrap an event generator in a StreamingResponse.
+    Exceptions raised mid-stream become a final "error" event; on_close always runs.
+    """
+    def body():
+        try:
+            for event in events:
+                yield encode_event(event, fmt)
+        except Exception as e:
+            yield encode_event({"type": "error", "error": str(e)}, fmt)
+        finally:
+            if on_close:
+                on_close()
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}  # disable nginx buffering
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
@@ -45,42 +45,49 @@ const OrderTable = () => {
   }
 }
 
-  const fetchOrders = async () => {
+  const [nextCursor, setNextCursor] = useState(null)
+  const [totalOrders, setTotalOrders] = useState(null)
+
+  const toApiDate = (date) =>
+    date
+      ? `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}-${String(date.getDate()).padStart(2, '0')}`
+      : undefined
+
+  // Orders are paginated server-side (newest first); cursor = null loads the first page
+  const fetchOrders = async (cursor = null) => {
     try {
-      const res = await api.get("/orders-data")
+      const res = await api.get("/orders-data", {
+        params: {
+          limit: 200,
+          cursor: cursor || undefined,
+          start_date: toApiDate(startDate),
+          end_date: toApiDate(endDate),
+          include_total: !cursor,
+        },
+      })
 
        // Preprocess attribution_referrer
-    const enrichedData = res.data.map((order) => ({
+    const enrichedData = res.data.orders.map((order) => ({
       ...order,
       attribution_referrer: simplifyReferrer(order.attribution_referrer),
     }))
 
-      setOrders(enrichedData)
-      setFilteredOrders(enrichedData)
+      const merged = cursor ? [...filteredOrders, ...enrichedData] : enrichedData
+      setOrders(merged)
+      setFilteredOrders(merged)
+      setNextCursor(res.data.next_cursor)
+      if (!cursor) setTotalOrders(res.data.total)
     } catch (err) {
       console.error('Error fetching orders:', err)
     }
   }
 
+  // Date filtering happens on the server; refetch when the range is complete or cleared
   useEffect(() => {
-    fetchOrders()
-  }, [])
-
-  const filterByDateRange = () => {
-    if (startDate && endDate) {
-      const filtered = orders.filter((order) => {
-        const orderDate = new Date(order.date)
-        return orderDate >= startDate && orderDate <= endDate
-      })
-      setFilteredOrders(filtered)
-    } else {
-      setFilteredOrders(orders)
+    if ((startDate && endDate) || (!startDate && !endDate)) {
+      fetchOrders()
     }
-  }
-
-  useEffect(() => {
-    filterByDateRange()
-  }, [startDate, endDate, orders])
+  }, [startDate, endDate])
 
   const headData = ['orderId', 'customer', 'date', 'amount', 'status', 'attributionReferrer']
 
@@ -141,7 +148,8 @@ const OrderTable = () => {
           <div className="card__header">
             <h3>{t("tableTitle")}</h3>
             <p className="text-sm text-gray-600 mt-2">
-                {t("showing")} <span className="font-semibold">{filteredOrders.length}</span> {t("order")}
+                {t("showing")} <span className="font-semibold">{filteredOrders.length}</span>
+                {totalOrders !== null ? ` ${t("of")} ${totalOrders}` : ''} {t("order")}
                 {filteredOrders.length !== 1 ? 's' : ''} {t("inSelectedDateRange")}
             </p>
           </div>
@@ -154,7 +162,16 @@ const OrderTable = () => {
               renderBody={renderBody}
             />
           </div>
-          <div className="card__footer">{/* Optional footer */}</div>
+          <div className="card__footer">
+            {nextCursor && (
+              <button
+                className="border px-3 py-2 rounded"
+                onClick={() => fetchOrders(nextCursor)}
+              >
+                {t("loadMore")}
+              </button>
+            )}
+          </div>
         </div>
       </div>
     </div>
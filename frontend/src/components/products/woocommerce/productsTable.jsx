@@ -1,25 +1,39 @@
 import React, { useState, useEffect } from 'react'
-import axios from 'axios'
-import Table from '../table/Table'
-import API_BASE_URL from '../../../api_config'
+import Table from '../../table/Table'
+import api from '../../../../api_config'
 import { useTranslation } from 'react-i18next';
 
 const ProductTable = () => {
   const [products, setProducts] = useState([])
+  const [search, setSearch] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
+  const [totalProducts, setTotalProducts] = useState(null)
   const { t } = useTranslation("productAnalysis");
 
-  const fetchProducts = async () => {
+  // Products are paginated and searched server-side; cursor = null loads the first page
+  const fetchProducts = async (cursor = null) => {
     try {
-      const res = await axios.get(`${API_BASE_URL}/products-table`)
-      setProducts(res.data)
+      const res = await api.get("/products-table", {
+        params: {
+          limit: 200,
+          cursor: cursor || undefined,
+          search: search.trim() || undefined,
+          include_total: !cursor,
+        },
+      })
+      setProducts(cursor ? [...products, ...res.data.products] : res.data.products)
+      setNextCursor(res.data.next_cursor)
+      if (!cursor) setTotalProducts(res.data.total)
     } catch (err) {
       console.error('Error fetching products:', err)
     }
   }
 
+  // Debounce type-ahead search
   useEffect(() => {
-    fetchProducts()
-  }, [])
+    const timer = setTimeout(() => fetchProducts(), 300)
+    return () => clearTimeout(timer)
+  }, [search])
 
   const headData = [
     'id',
@@ -57,10 +71,25 @@ const ProductTable = () => {
     <div className="p-4">
       <h2 className="text-xl font-bold mb-4">{t('all_products')}</h2>
 
+      <div className="mb-4">
+        <input
+          type="text"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          className="border px-3 py-2 rounded"
+          placeholder={t('search_products')}
+        />
+      </div>
+
       <div className="col-12">
         <div className="card">
           <div className="card__header">
             <h3>{t('product_table')}</h3>
+            {totalProducts !== null && (
+              <p className="text-sm text-gray-600 mt-2">
+                {products.length} / {totalProducts}
+              </p>
+            )}
           </div>
           <div className="card__body">
             <Table
@@ -72,7 +101,14 @@ const ProductTable = () => {
             />
           </div>
           <div className="card__footer">
-            {/* <Link to='/products'>View all products</Link> */}
+            {nextCursor && (
+              <button
+                className="border px-3 py-2 rounded"
+                onClick={() => fetchProducts(nextCursor)}
+              >
+                {t('load_more')}
+              </button>
+            )}
           </div>
         </div>
       </div>
@@ -7,6 +7,8 @@ import { useNavigate, useParams } from 'react-router-dom';
 import CustomerForecast from '../components/customers/woocommerce/CustomerProductSuggesion';
 import { useTranslation } from 'react-i18next';
 
+const ORDERS_PAGE_SIZE = 50;
+
 const CustomerDetails = () => {
   const { id } = useParams();
   const [data, setData] = useState({
@@ -35,7 +37,8 @@ const CustomerDetails = () => {
           endpoint = `/customer-details/${id}`;
         }
         
-        const res = await api.get(endpoint);
+        // WooCommerce orders are paginated server-side (newest first)
+        const res = await api.get(endpoint, dataSource === "excel" ? {} : { params: { limit: ORDERS_PAGE_SIZE } });
         setData(res.data);
         console.log("Fetched customer data:", res.data);
       } catch (err) {
@@ -47,6 +50,22 @@ const CustomerDetails = () => {
     fetchData();
   }, [id]);
 
+  const loadMoreOrders = async () => {
+    try {
+      const res = await api.get(`/customer-details/${id}`, {
+        params: { limit: ORDERS_PAGE_SIZE, cursor: data.next_cursor },
+      });
+      setData(prev => ({
+        ...prev,
+        orders: [...prev.orders, ...res.data.orders],
+        next_cursor: res.data.next_cursor,
+        has_more: res.data.has_more,
+      }));
+    } catch (err) {
+      console.error("Error fetching more orders", err);
+    }
+  };
+
   if (loading) return <div>Loading...</div>;
   if (!data.customer) return <div>No data available.</div>;
 
@@ -139,7 +158,7 @@ const CustomerDetails = () => {
 
       <div className="card" style={{ marginTop: '2rem' }}>
         <div className="card__header">
-          <h3>Order History ({orders.length})</h3>
+          <h3>Order History ({data.total_orders ?? orders.length})</h3>
         </div>
         <div className="card__body">
           <Table
@@ -180,6 +199,13 @@ const CustomerDetails = () => {
             }}
           />
         </div>
+        {data.next_cursor && (
+          <div className="card__footer">
+            <button className="border px-3 py-2 rounded" onClick={loadMoreOrders}>
+              Load more orders
+            </button>
+          </div>
+        )}
       </div>
 
       {/* <div className="card" style={{ marginTop: '2rem' }}>